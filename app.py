@@ -3,44 +3,111 @@ CFB Pickem ETL
 Author: Gabe Baduqui
 
 Scrape, transform and load fall sports schedule data from various web pages
+
+Usage examples:
+    python app.py                                   full run of every league
+    python app.py --league NFL --weeks 5            refresh NFL week 5
+    python app.py --league NBA --today              refresh today's NBA games
+    python app.py --league MLB --dates 2024-09-01:2024-09-07
+    python app.py --league CFB --game-ids 401635525,401643697
+    python app.py --retry-dead-letters              re-fetch only previously failed pages
+    python app.py --load-mode bulk                  bulk load the CSV outputs with LOAD DATA
+    python app.py --load-mode swap                  reload the database tables through atomically swapped shadow tables
+    python app.py --db-backend sqlite               load a local SQLite database instead of MySQL
+    python app.py --prune-league                    also delete the league's database rows outside the run window
 """
+import argparse
 import pandas as pd
 import etl.etl as x
+import etl.scheduler as scheduler
+import etl.load.load as load
+import etl.publish.schedule as publish
+from datetime import date
 
 prod = False
+leagues = ['CFB', 'NFL', 'MLB', 'NBA']
+
+def parse_week_range(weeks_arg: str):
+    """Function that parses a week or week range argument such as `5` or `3-5`
+       Accepts `weeks_arg`: String
+       Returns `weeks`: Tuple of (first week, last week)"""
+    first_week, _, last_week = weeks_arg.partition('-')
+    return int(first_week), int(last_week or first_week)
+
+def parse_date_range(dates_arg: str):
+    """Function that parses a date or date range argument such as `2024-10-01` or `2024-10-01:2024-10-07`
+       Accepts `dates_arg`: String
+       Returns `dates`: Tuple of (first date, last date)"""
+    first_date, _, last_date = dates_arg.partition(':')
+    return date.fromisoformat(first_date), date.fromisoformat(last_date or first_date)
+
+def parse_args(argv=None):
+    """Function that parses the command line arguments of a (partial) ETL run
+       Accepts `argv`: List
+       Returns `args`: Namespace Object"""
+    parser = argparse.ArgumentParser(description='Scrape, transform and load pickem schedule data.')
+    parser.add_argument('--league', nargs='+', default=leagues, type=str.upper, choices=leagues, help='League(s) to run, defaults to all')
+    parser.add_argument('--season', type=int, help='Season year, defaults to the current configured season')
+    parser.add_argument('--weeks', type=parse_week_range, help='Football week or week range, e.g. 5 or 3-5')
+    parser.add_argument('--dates', type=parse_date_range, help='Date or date range for MLB/NBA, e.g. 2024-10-01 or 2024-10-01:2024-10-07')
+    parser.add_argument('--today', action='store_true', help='Shorthand for --dates set to today')
+    parser.add_argument('--game-ids', type=lambda ids: [game_id.strip() for game_id in ids.split(',') if game_id.strip()], help='Comma separated Game IDs (single league only)')
+    parser.add_argument('--retry-dead-letters', action='store_true', help='Only re-run the games of pending dead-lettered pages')
+    parser.add_argument('--load-mode', default='upsert', choices=load.load_modes, help='Load the database with batched upserts, bulk load the CSV outputs, or fully reload them through swapped shadow tables')
+    parser.add_argument('--prune-league', action='store_true', help='Delete every game, team and location of a league the run did not produce, not only the games within the run window')
+    parser.add_argument('--db-backend', default=load.db_backend, choices=list(load.db_backends), help='Database to load, MySQL or a local SQLite file (PICKEM_SQLITE_PATH)')
+    parser.add_argument('--prod', action='store_true', default=prod, help='Run against production')
+    args = parser.parse_args(argv)
+
+    if args.today:
+        args.dates = (date.today(), date.today())
+    if args.weeks is not None and not any(league in x.football_leagues for league in args.league):
+        parser.error(f'--weeks only applies to the football leagues {x.football_leagues}, use --dates or --today')
+    if args.dates is not None and all(league in x.football_leagues for league in args.league):
+        parser.error('--dates and --today only apply to MLB and NBA, use --weeks for football leagues')
+    if args.game_ids is not None and len(args.league) != 1:
+        parser.error('--game-ids requires exactly one --league')
+    if args.game_ids is not None and args.retry_dead_letters:
+        parser.error('--game-ids cannot be combined with --retry-dead-letters')
+    return args
 
-def main():
+def main(argv=None):
     global all_games
     global all_teams
     global all_locations
     global all_schedule
 
-    cfb_games, cfb_teams, cfb_locations = x.full_etl(prod, 'CFB')
-    nfl_games, nfl_teams, nfl_locations = x.full_etl(prod, 'NFL')
-    mlb_games, mlb_teams, mlb_locations = x.full_etl(prod, 'MLB')
-    nba_games, nba_teams, nba_locations = x.full_etl(prod, 'NBA')
+    args = parse_args(argv)
+    load.set_db_backend(args.db_backend)
+    game_ids = {args.league[0]: args.game_ids} if args.game_ids is not None else None
+    if args.retry_dead_letters:
+        game_ids = {league: x.get_dead_letter_game_ids(league) for league in args.league}
+        args.league = [league for league in args.league if len(game_ids[league]) > 0]
+        if len(args.league) == 0:
+            print('~~ No pending dead letters to retry')
+            return
 
-    all_games = pd.concat([cfb_games, nfl_games, mlb_games, nba_games], axis=0, ignore_index=True)
-    all_teams = pd.concat([cfb_teams, nfl_teams, mlb_teams, nba_teams], axis=0, ignore_index=True)
-    all_locations = pd.concat([cfb_locations, nfl_locations, mlb_locations, nba_locations], axis=0, ignore_index=True)
+    # Run each league's pipeline concurrently; the schedule build below starts once all of them finish
+    results = scheduler.run_leagues(args.prod, args.league, season=args.season, weeks=args.weeks, dates=args.dates, game_ids=game_ids, load_mode=args.load_mode, prune_league=args.prune_league)
 
-    all_schedule = pd.merge(all_games, all_teams, left_on=['league', 'away_team'], right_on=['league', 'team_id'], how='left')
-    all_schedule = all_schedule.rename(columns={'name': 'away_team_name', 'mascot': 'away_team_mascot', 'logo_url': 'away_team_logo', 'conference_name': 'away_team_conference', 
-                                                'conference_wins': 'away_team_conference_wins', 'conference_losses': 'away_team_conference_losses', 'conference_ties': 'away_team_conference_ties', 
-                                                'overall_wins': 'away_team_overall_wins', 'overall_losses': 'away_team_overall_losses', 'overall_ties': 'away_team_overall_ties'})
-    all_schedule = pd.merge(all_schedule, all_teams, left_on=['league', 'home_team'], right_on=['league', 'team_id'], how='left')
-    all_schedule = all_schedule.rename(columns={'name': 'home_team_name', 'mascot': 'home_team_mascot', 'logo_url': 'home_team_logo', 'conference_name': 'home_team_conference', 
-                                                'conference_wins': 'home_team_conference_wins', 'conference_losses': 'home_team_conference_losses', 'conference_ties': 'home_team_conference_ties', 
-                                                'overall_wins': 'home_team_overall_wins', 'overall_losses': 'home_team_overall_losses', 'overall_ties': 'home_team_overall_ties'})
-    all_schedule = pd.merge(all_schedule, all_locations, left_on=['league', 'location'], right_on=['league', 'location_id'], how='left')
-    all_schedule.drop(['team_id_x', 'team_id_y'], axis=1, inplace=True)
+    # Partial runs only hold the refreshed rows, so publish from the merged per-league outputs instead
+    frames = {}
+    for league in leagues:
+        if league in results and not x.is_partial_run(league, args.weeks, args.dates, (game_ids or {}).get(league)):
+            frames[league] = results[league]
+        else:
+            frames[league] = tuple(load.read_output(f'{league.lower()}_{table_name}') for table_name in ['games', 'teams', 'locations'])
+    frames = {league: league_frames for league, league_frames in frames.items() if all(df is not None for df in league_frames)}
 
+    all_games = pd.concat([frames[league][0] for league in frames], axis=0, ignore_index=True)
+    all_teams = pd.concat([frames[league][1] for league in frames], axis=0, ignore_index=True)
+    all_locations = pd.concat([frames[league][2] for league in frames], axis=0, ignore_index=True)
 
-    all_schedule.to_csv('./pickem_data/all_schedule.csv', index=False)
-    all_schedule.to_json('./pickem_data/all_schedule.json', orient='records')
+    all_schedule = publish.publish_schedule(all_games, all_teams, all_locations)
 
 
-main()
+if __name__ == '__main__':
+    main()
 
 #import etl.load.load as l
 #logfile = open('./pickem_logs/manual_load.log', 'a')
@@ -0,0 +1,169 @@
+"""
+Pickem ETL
+Author: Gabe Baduqui
+
+Seed benchmark users and picks and report the latency of the original CFB_GET_ALL_DATA_VW query against the current view,
+optionally applying `migrate_indexes.sql` in between. Run from the repository root against a loaded database:
+    python -m db_scripts.benchmark_view --users 1000 --migrate
+    python -m db_scripts.benchmark_view --db-backend sqlite
+"""
+import argparse, os, statistics, time
+import etl.load.load as load
+
+benchmark_prefix = 'benchmark_user_'
+seed_batch_size = 1000
+db_scripts_dir = os.path.dirname(os.path.abspath(__file__))
+
+view_columns = """P.USER_ID, U.USERNAME, P.GAME_ID, P.TEAM_ID AS TEAM_PICKED,
+    G.AWAY_TEAM, AWAY.NAME AS AWAY_TEAM_NAME, AWAY.MASCOT AS AWAY_TEAM_MASCOT, AWAY.LOGO_URL AS AWAY_LOGO_URL,
+    AWAY.CONFERENCE_NAME AS AWAY_CONFERENCE, AWAY.CONFERENCE_WINS AS AWAY_CONFERENCE_WINS, AWAY.CONFERENCE_LOSSES AS AWAY_CONFERENCE_LOSSES,
+    AWAY.CONFERENCE_TIES AS AWAY_CONFERENCE_TIES, AWAY.OVERALL_WINS AS AWAY_OVERALL_WINS, AWAY.OVERALL_LOSSES AS AWAY_OVERALL_LOSSES,
+    AWAY.OVERALL_TIES AS AWAY_OVERALL_TIES,
+    G.HOME_TEAM, HOME.NAME AS HOME_TEAM_NAME, HOME.MASCOT AS HOME_TEAM_MASCOT, HOME.LOGO_URL AS HOME_LOGO_URL,
+    HOME.CONFERENCE_NAME AS HOME_CONFERENCE, HOME.CONFERENCE_WINS AS HOME_CONFERENCE_WINS, HOME.CONFERENCE_LOSSES AS HOME_CONFERENCE_LOSSES,
+    HOME.CONFERENCE_TIES AS HOME_CONFERENCE_TIES, HOME.OVERALL_WINS AS HOME_OVERALL_WINS, HOME.OVERALL_LOSSES AS HOME_OVERALL_LOSSES,
+    HOME.OVERALL_TIES AS HOME_OVERALL_TIES,
+    L.STADIUM, L.STADIUM_CAPACITY, L.CITY, L.STATE, G.TV_COVERAGE, G.BETTING_LINE, G.BETTING_LINE_OVER_UNDER,
+    G.ATTENDANCE, G.AWAY_WIN_PCT, G.HOME_WIN_PCT,
+    G.AWAY_QUARTER1, G.AWAY_QUARTER2, G.AWAY_QUARTER3, G.AWAY_QUARTER4, G.AWAY_OVERTIME, G.AWAY_TOTAL,
+    G.HOME_QUARTER1, G.HOME_QUARTER2, G.HOME_QUARTER3, G.HOME_QUARTER4, G.HOME_OVERTIME, G.HOME_TOTAL,
+    G.GAME_TIME, G.GAME_DATE, G.GAME_MONTH, G.GAME_DAY, G.GAME_YEAR"""
+
+# The view as originally defined: a LOWER() league filter no index can serve, and TEAMS joined on TEAM_ID alone
+legacy_view_query = f"""SELECT {view_columns}
+FROM PICKS AS P
+    INNER JOIN USERS AS U ON P.USER_ID = U.USER_ID
+    LEFT JOIN GAMES AS G ON P.GAME_ID = G.GAME_ID
+    LEFT JOIN TEAMS AS AWAY ON G.AWAY_TEAM = AWAY.TEAM_ID
+    LEFT JOIN TEAMS AS HOME ON G.HOME_TEAM = HOME.TEAM_ID
+    LEFT JOIN LOCATIONS AS L ON G.LOCATION = L.LOCATION_ID AND G.LEAGUE = L.LEAGUE
+WHERE LOWER(P.LEAGUE) = 'cfb'"""
+
+view_query = 'SELECT * FROM CFB_GET_ALL_DATA_VW'
+
+def clear_benchmark_data(db: object, conn: object):
+    """Function that deletes the benchmark users and their picks
+       Accepts `db`: Database backend Module, `conn`: Connection Object
+       Returns: n/a"""
+    cursor = conn.cursor()
+    db.execute_statement(cursor, f"DELETE FROM PICKS WHERE USER_ID IN (SELECT USER_ID FROM USERS WHERE USERNAME LIKE '{benchmark_prefix}%')")
+    db.execute_statement(cursor, f"DELETE FROM USERS WHERE USERNAME LIKE '{benchmark_prefix}%'")
+    db.commit(conn)
+    cursor.close()
+
+def seed_benchmark_data(db: object, conn: object, users: int):
+    """Function that seeds benchmark users with a pick row for every game of every league, a third of them still unpicked,
+       the way user sign-up provisions picks
+       Accepts `db`: Database backend Module, `conn`: Connection Object, `users`: Number
+       Returns `picks`: Number of seeded picks"""
+    cursor = conn.cursor()
+    for batch_start in range(0, users, seed_batch_size):
+        user_rows = [f"('{benchmark_prefix}{user}', '', '')" for user in range(batch_start, min(batch_start + seed_batch_size, users))]
+        db.execute_statement(cursor, f"INSERT INTO USERS (USERNAME, PW, EMAIL_ADDRESS) VALUES {', '.join(user_rows)}")
+    db.execute_statement(cursor, f"""INSERT INTO PICKS (USER_ID, GAME_ID, LEAGUE, TEAM_ID)
+        SELECT U.USER_ID, G.GAME_ID, G.LEAGUE,
+            CASE (U.USER_ID + G.GAME_ID) % 3 WHEN 0 THEN NULL WHEN 1 THEN G.AWAY_TEAM ELSE G.HOME_TEAM END
+        FROM USERS AS U CROSS JOIN GAMES AS G
+        WHERE U.USERNAME LIKE '{benchmark_prefix}%'""")
+    picks = cursor.rowcount
+    db.commit(conn)
+    cursor.close()
+    return picks
+
+def time_query(db: object, conn: object, query: str, runs: int):
+    """Function that runs a query `runs` times, fetching every row, after one warm-up run
+       Accepts `db`: Database backend Module, `conn`: Connection Object, `query`: String, `runs`: Number
+       Returns `latency`: Dictionary of the median and fastest seconds and the returned row count"""
+    cursor = conn.cursor()
+    timings = []
+    for run in range(runs + 1):
+        start = time.perf_counter()
+        db.execute_statement(cursor, query)
+        rows = cursor.fetchall()
+        if run > 0:
+            timings.append(time.perf_counter() - start)
+    cursor.close()
+    return {'median_seconds': round(statistics.median(timings), 4), 'fastest_seconds': round(min(timings), 4), 'rows': len(rows)}
+
+def explain_query(db: object, conn: object, query: str):
+    """Function that prints the query plan of a query
+       Accepts `db`: Database backend Module, `conn`: Connection Object, `query`: String
+       Returns: n/a"""
+    cursor = conn.cursor()
+    db.execute_statement(cursor, f"{'EXPLAIN QUERY PLAN' if load.db_backend == 'sqlite' else 'EXPLAIN'} {query}")
+    for plan_row in cursor.fetchall():
+        print(f'      {plan_row}')
+    cursor.close()
+
+def get_benchmark_user_id(db: object, conn: object):
+    """Function that returns the ID of a seeded benchmark user, for timing a single user's picks
+       Accepts `db`: Database backend Module, `conn`: Connection Object
+       Returns `user_id`: Number"""
+    cursor = conn.cursor()
+    db.execute_statement(cursor, f"SELECT MAX(USER_ID) FROM USERS WHERE USERNAME LIKE '{benchmark_prefix}%'")
+    user_id = cursor.fetchone()[0]
+    cursor.close()
+    return user_id
+
+def migrate_indexes(db: object, conn: object):
+    """Function that applies `migrate_indexes.sql` and re-creates the view from `cfb_get_all_data_vw.sql`, which reads the SCHEDULE table of
+       `migrate_schedule.sql`. Both procedures must already have been run or defined in the MySQL database; SQLite databases are created with the indexes and view
+       Accepts `db`: Database backend Module, `conn`: Connection Object
+       Returns: n/a"""
+    if load.db_backend == 'sqlite':
+        return
+    cursor = conn.cursor()
+    db.execute_statement(cursor, 'CALL MIGRATE_INDEXES()')
+    with open(f'{db_scripts_dir}/cfb_get_all_data_vw.sql', 'r') as view_file:
+        db.execute_statement(cursor, view_file.read().strip().rstrip(';'))
+    db.commit(conn)
+    cursor.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark CFB_GET_ALL_DATA_VW before and after the index migration.')
+    parser.add_argument('--users', type=int, default=1000, help='Benchmark users to seed, each with a pick row for every game')
+    parser.add_argument('--runs', type=int, default=5, help='Timed runs of each query')
+    parser.add_argument('--db-backend', default=load.db_backend, choices=list(load.db_backends), help='Database to benchmark')
+    parser.add_argument('--migrate', action='store_true', help='Call MIGRATE_INDEXES and re-create the view between the two measurements')
+    parser.add_argument('--keep', action='store_true', help='Keep the seeded users and picks')
+    args = parser.parse_args(argv)
+
+    load.set_db_backend(args.db_backend)
+    db = load.get_db()
+    conn = db.instantiate_connection()
+    try:
+        clear_benchmark_data(db, conn)
+        picks = seed_benchmark_data(db, conn, args.users)
+        print(f'~~ Seeded {args.users} benchmark users with {picks} picks into {db.db_name} ~~')
+
+        # The whole view, and one user's picks as the app reads them
+        user_id = get_benchmark_user_id(db, conn)
+        queries = {
+            'all picks': (legacy_view_query, view_query),
+            'one user': (f'{legacy_view_query} AND P.USER_ID = {user_id}', f'{view_query} WHERE USER_ID = {user_id}')
+        }
+
+        before = {}
+        for query_name, (legacy_query, _) in queries.items():
+            before[query_name] = time_query(db, conn, legacy_query, args.runs)
+            print(f'~~~~ Original view query, {query_name}: {before[query_name]}')
+            explain_query(db, conn, legacy_query)
+
+        if args.migrate:
+            migrate_indexes(db, conn)
+            print('~~~~ Applied MIGRATE_INDEXES and re-created CFB_GET_ALL_DATA_VW')
+
+        for query_name, (_, query) in queries.items():
+            after = time_query(db, conn, query, args.runs)
+            print(f'~~~~ CFB_GET_ALL_DATA_VW, {query_name}: {after}')
+            explain_query(db, conn, query)
+            speedup = f"{before[query_name]['median_seconds'] / after['median_seconds']:.1f}x" if after['median_seconds'] > 0 else 'n/a'
+            print(f"~~ {query_name} median latency {before[query_name]['median_seconds']}s -> {after['median_seconds']}s ({speedup}) ~~")
+    finally:
+        if not args.keep:
+            clear_benchmark_data(db, conn)
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
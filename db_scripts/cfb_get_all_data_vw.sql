@@ -1,5 +1,5 @@
 
-CREATE VIEW CFB_GET_ALL_DATA_VW AS  
+CREATE OR REPLACE VIEW CFB_GET_ALL_DATA_VW AS  
 
 SELECT  
 	P.USER_ID,  
@@ -7,76 +7,71 @@ SELECT
     P.GAME_ID,     
     P.TEAM_ID AS TEAM_PICKED,          
     
-    G.AWAY_TEAM,     
-    AWAY.NAME AS AWAY_TEAM_NAME,     
-    AWAY.MASCOT AS AWAY_TEAM_MASCOT,     
-    AWAY.LOGO_URL AS AWAY_LOGO_URL,     
-    AWAY.CONFERENCE_NAME AS AWAY_CONFERENCE,     
-    AWAY.CONFERENCE_WINS AS AWAY_CONFERENCE_WINS,     
-    AWAY.CONFERENCE_LOSSES AS AWAY_CONFERENCE_LOSSES,     
-    AWAY.CONFERENCE_TIES AS AWAY_CONFERENCE_TIES,     
-    AWAY.OVERALL_WINS AS AWAY_OVERALL_WINS,     
-    AWAY.OVERALL_LOSSES AS AWAY_OVERALL_LOSSES,     
-    AWAY.OVERALL_TIES AS AWAY_OVERALL_TIES,          
+    S.AWAY_TEAM,     
+    S.AWAY_TEAM_NAME,     
+    S.AWAY_TEAM_MASCOT,     
+    S.AWAY_LOGO_URL,     
+    S.AWAY_CONFERENCE,     
+    S.AWAY_CONFERENCE_WINS,     
+    S.AWAY_CONFERENCE_LOSSES,     
+    S.AWAY_CONFERENCE_TIES,     
+    S.AWAY_OVERALL_WINS,     
+    S.AWAY_OVERALL_LOSSES,     
+    S.AWAY_OVERALL_TIES,          
     
-    G.HOME_TEAM,     
-    HOME.NAME AS HOME_TEAM_NAME,     
-    HOME.MASCOT AS HOME_TEAM_MASCOT,     
-    HOME.LOGO_URL AS HOME_LOGO_URL,     
-    HOME.CONFERENCE_NAME AS HOME_CONFERENCE,     
-    HOME.CONFERENCE_WINS AS HOME_CONFERENCE_WINS,     
-    HOME.CONFERENCE_LOSSES AS HOME_CONFERENCE_LOSSES,     
-    HOME.CONFERENCE_TIES AS HOME_CONFERENCE_TIES,     
-    HOME.OVERALL_WINS AS HOME_OVERALL_WINS,     
-    HOME.OVERALL_LOSSES AS HOME_OVERALL_LOSSES,     
-    HOME.OVERALL_TIES AS HOME_OVERALL_TIES,          
+    S.HOME_TEAM,     
+    S.HOME_TEAM_NAME,     
+    S.HOME_TEAM_MASCOT,     
+    S.HOME_LOGO_URL,     
+    S.HOME_CONFERENCE,     
+    S.HOME_CONFERENCE_WINS,     
+    S.HOME_CONFERENCE_LOSSES,     
+    S.HOME_CONFERENCE_TIES,     
+    S.HOME_OVERALL_WINS,     
+    S.HOME_OVERALL_LOSSES,     
+    S.HOME_OVERALL_TIES,          
     
-    L.STADIUM,     
-    L.STADIUM_CAPACITY,     
-    L.CITY,     
-    L.STATE,          
-    G.TV_COVERAGE,     
-    G.BETTING_LINE,     
-    G.BETTING_LINE_OVER_UNDER,     
+    S.STADIUM,     
+    S.STADIUM_CAPACITY,     
+    S.CITY,     
+    S.STATE,          
+    S.TV_COVERAGE,     
+    S.BETTING_LINE,     
+    S.BETTING_LINE_OVER_UNDER,     
     
-    G.ATTENDANCE,     
-    G.AWAY_WIN_PCT,     
-    G.HOME_WIN_PCT,     
+    S.ATTENDANCE,     
+    S.AWAY_WIN_PCT,     
+    S.HOME_WIN_PCT,     
     
-    G.AWAY_QUARTER1,     
-    G.AWAY_QUARTER2,     
-    G.AWAY_QUARTER3,     
-    G.AWAY_QUARTER4,     
-    G.AWAY_OVERTIME,     
-    G.AWAY_TOTAL,     
+    S.AWAY_QUARTER1,     
+    S.AWAY_QUARTER2,     
+    S.AWAY_QUARTER3,     
+    S.AWAY_QUARTER4,     
+    S.AWAY_OVERTIME,     
+    S.AWAY_TOTAL,     
     
-    G.HOME_QUARTER1,     
-    G.HOME_QUARTER2,     
-    G.HOME_QUARTER3,     
-    G.HOME_QUARTER4,     
-    G.HOME_OVERTIME,     
-    G.HOME_TOTAL,          
+    S.HOME_QUARTER1,     
+    S.HOME_QUARTER2,     
+    S.HOME_QUARTER3,     
+    S.HOME_QUARTER4,     
+    S.HOME_OVERTIME,     
+    S.HOME_TOTAL,          
     
-    G.GAME_TIME,     
-    G.GAME_DATE,     
-    G.GAME_MONTH,     
-    G.GAME_DAY,     
-    G.GAME_YEAR 
+    S.GAME_TIME,     
+    S.GAME_DATE,     
+    S.GAME_MONTH,     
+    S.GAME_DAY,     
+    S.GAME_YEAR,
+    S.REFRESHED_AT 
     
 FROM  
 	PICKS AS P   
 		INNER JOIN USERS AS U    
 			ON P.USER_ID = U.USER_ID   
-		LEFT JOIN GAMES AS G    
-			ON P.GAME_ID = G.GAME_ID   
-		LEFT JOIN TEAMS AS AWAY    
-			ON G.AWAY_TEAM = AWAY.TEAM_ID   
-		LEFT JOIN TEAMS AS HOME    
-			ON G.HOME_TEAM = HOME.TEAM_ID   
-		LEFT JOIN LOCATIONS AS L    
-			ON G.LOCATION = L.LOCATION_ID             
-            AND G.LEAGUE = L.LEAGUE 
+		LEFT JOIN SCHEDULE AS S    
+			ON P.LEAGUE = S.LEAGUE   
+			AND P.GAME_ID = S.GAME_ID 
 WHERE  
-	LOWER(P.LEAGUE) = 'cfb';
+	P.LEAGUE = 'CFB';
     
     
\ No newline at end of file
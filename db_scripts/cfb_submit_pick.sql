@@ -1,5 +1,7 @@
 DELIMITER //
 
+DROP PROCEDURE IF EXISTS CFB_SUBMIT_PICK//
+
 CREATE PROCEDURE CFB_SUBMIT_PICK (
 	IN USR INT,
     IN GM INT,
@@ -11,7 +13,7 @@ BEGIN
     SET P.TEAM_ID = SELECTED_TEAM
     WHERE P.USER_ID = USR
     AND P.GAME_ID = GM
-    AND LOWER(P.LEAGUE) = 'cfb';
+    AND P.LEAGUE = 'CFB';
 END//
 
 DELIMITER ;
\ No newline at end of file
@@ -10,7 +10,7 @@ BEGIN
 		LEAGUE						VARCHAR(5)		NOT NULL,
 		AWAY_TEAM					VARCHAR(25)		NULL,
 		HOME_TEAM					VARCHAR(25)		NULL,
-		LOCATION					SMALLINT		NULL,
+		LOCATION					INT				NULL,
 		TV_COVERAGE					VARCHAR(25)		NULL,
 		BETTING_LINE				VARCHAR(25)		NULL,
 		BETTING_LINE_OVER_UNDER		VARCHAR(25)		NULL,
@@ -53,7 +53,7 @@ BEGIN
 
 	CREATE TABLE IF NOT EXISTS LOCATIONS (
 		LEAGUE						VARCHAR(5)		NOT NULL,
-		LOCATION_ID					SMALLINT		NOT NULL,
+		LOCATION_ID					INT				NOT NULL,
 		STADIUM						VARCHAR(5)		NOT NULL,
 		STADIUM_CAPACITY			VARCHAR(5)		NULL,
 		CITY						VARCHAR(5)		NULL,
@@ -77,6 +77,90 @@ BEGIN
 		TEAM_ID						VARCHAR(25)		NULL
 	);
 
+	CREATE TABLE IF NOT EXISTS SCHEDULE (
+		GAME_ID						INT				NOT NULL,
+		LEAGUE						VARCHAR(5)		NOT NULL,
+		AWAY_TEAM					VARCHAR(25)		NULL,
+		AWAY_TEAM_NAME				VARCHAR(50)		NULL,
+		AWAY_TEAM_MASCOT			VARCHAR(50)		NULL,
+		AWAY_LOGO_URL				VARCHAR(75)		NULL,
+		AWAY_CONFERENCE				VARCHAR(50)		NULL,
+		AWAY_CONFERENCE_WINS		TINYINT			NULL,
+		AWAY_CONFERENCE_LOSSES		TINYINT			NULL,
+		AWAY_CONFERENCE_TIES		TINYINT			NULL,
+		AWAY_OVERALL_WINS			TINYINT			NULL,
+		AWAY_OVERALL_LOSSES			TINYINT			NULL,
+		AWAY_OVERALL_TIES			TINYINT			NULL,
+		HOME_TEAM					VARCHAR(25)		NULL,
+		HOME_TEAM_NAME				VARCHAR(50)		NULL,
+		HOME_TEAM_MASCOT			VARCHAR(50)		NULL,
+		HOME_LOGO_URL				VARCHAR(75)		NULL,
+		HOME_CONFERENCE				VARCHAR(50)		NULL,
+		HOME_CONFERENCE_WINS		TINYINT			NULL,
+		HOME_CONFERENCE_LOSSES		TINYINT			NULL,
+		HOME_CONFERENCE_TIES		TINYINT			NULL,
+		HOME_OVERALL_WINS			TINYINT			NULL,
+		HOME_OVERALL_LOSSES			TINYINT			NULL,
+		HOME_OVERALL_TIES			TINYINT			NULL,
+		LOCATION					INT				NULL,
+		STADIUM						VARCHAR(100)	NULL,
+		STADIUM_CAPACITY			VARCHAR(25)		NULL,
+		CITY						VARCHAR(50)		NULL,
+		STATE						VARCHAR(50)		NULL,
+		LATITUDE					VARCHAR(25)		NULL,
+		LONGITUDE					VARCHAR(25)		NULL,
+		TV_COVERAGE					VARCHAR(25)		NULL,
+		BETTING_LINE				VARCHAR(25)		NULL,
+		BETTING_LINE_OVER_UNDER		VARCHAR(25)		NULL,
+		ATTENDANCE					MEDIUMINT		NULL,
+		AWAY_WIN_PCT				VARCHAR(25)		NULL,
+		HOME_WIN_PCT				VARCHAR(25)		NULL,
+		AWAY_QUARTER1				VARCHAR(25)		NULL,
+		AWAY_QUARTER2				VARCHAR(25)		NULL,
+		AWAY_QUARTER3				VARCHAR(25)		NULL,
+		AWAY_QUARTER4				VARCHAR(25)		NULL,
+		AWAY_OVERTIME				VARCHAR(25)		NULL,
+		AWAY_TOTAL					VARCHAR(25)		NULL,
+		HOME_QUARTER1				VARCHAR(25)		NULL,
+		HOME_QUARTER2				VARCHAR(25)		NULL,
+		HOME_QUARTER3				VARCHAR(25)		NULL,
+		HOME_QUARTER4				VARCHAR(25)		NULL,
+		HOME_OVERTIME				VARCHAR(25)		NULL,
+		HOME_TOTAL					VARCHAR(25)		NULL,
+		GAME_TIME					VARCHAR(25)		NULL,
+		GAME_DATE					VARCHAR(25)		NULL,
+		GAME_MONTH					TINYINT			NULL,
+		GAME_DAY					TINYINT			NULL,
+		GAME_YEAR					SMALLINT		NULL,
+		REFRESHED_AT				DATETIME		NOT NULL
+	);
+
+	CREATE TABLE IF NOT EXISTS PICK_RESULTS (
+		LEAGUE						VARCHAR(5)		NOT NULL,
+		GAME_ID						INT				NOT NULL,
+		USER_ID						INT				NOT NULL,
+		SEASON						SMALLINT		NOT NULL,
+		WEEK						TINYINT			NOT NULL,
+		GAME_DATE					DATE			NOT NULL,
+		TEAM_PICKED					VARCHAR(25)		NULL,
+		WINNER						VARCHAR(25)		NULL,
+		CORRECT						TINYINT			NOT NULL,
+		POINTS						SMALLINT		NOT NULL
+	);
+
+	CREATE TABLE IF NOT EXISTS LEADERBOARD (
+		LEAGUE						VARCHAR(5)		NOT NULL,
+		SEASON						SMALLINT		NOT NULL,
+		WEEK						TINYINT			NOT NULL,
+		USER_ID						INT				NOT NULL,
+		POINTS						SMALLINT		NOT NULL,
+		CORRECT_PICKS				SMALLINT		NOT NULL,
+		SCORED_PICKS				SMALLINT		NOT NULL,
+		LEADERBOARD_RANK			INT				NOT NULL,
+		CURRENT_STREAK				SMALLINT		NULL,
+		LONGEST_STREAK				SMALLINT		NULL
+	);
+
 
 	/*******************************************************
 	CREATE PRIMARY KEYS
@@ -90,6 +174,12 @@ BEGIN
 	-- ALTER TABLE USERS ADD CONSTRAINT PK_USERS PRIMARY KEY (USER_ID);
 	ALTER TABLE PICKS
 		ADD CONSTRAINT PK_PICKS PRIMARY KEY (USER_ID, GAME_ID, LEAGUE);
+	ALTER TABLE SCHEDULE
+		ADD CONSTRAINT PK_SCHEDULE PRIMARY KEY (LEAGUE, GAME_ID);
+	ALTER TABLE PICK_RESULTS
+		ADD CONSTRAINT PK_PICK_RESULTS PRIMARY KEY (LEAGUE, GAME_ID, USER_ID);
+	ALTER TABLE LEADERBOARD
+		ADD CONSTRAINT PK_LEADERBOARD PRIMARY KEY (LEAGUE, SEASON, WEEK, USER_ID);
 
 
 	/*******************************************************
@@ -110,4 +200,17 @@ BEGIN
 		FOREIGN KEY (USER_ID) REFERENCES USERS(USER_ID);
 
 
+	/*******************************************************
+	CREATE INDEXES
+	*******************************************************/
+	ALTER TABLE PICKS
+		ADD INDEX IX_PICKS_LEAGUE_USER_GAME (LEAGUE, USER_ID, GAME_ID);
+	ALTER TABLE GAMES
+		ADD INDEX IX_GAMES_LEAGUE_DATE (LEAGUE, GAME_YEAR, GAME_MONTH, GAME_DAY);
+	ALTER TABLE USERS
+		ADD INDEX IX_USERS_USERNAME (USERNAME);
+	ALTER TABLE SCHEDULE
+		ADD INDEX IX_SCHEDULE_LEAGUE_DATE (LEAGUE, GAME_YEAR, GAME_MONTH, GAME_DAY);
+
+
 END
\ No newline at end of file
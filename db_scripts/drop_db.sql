@@ -5,6 +5,9 @@ BEGIN
 /*******************************************************
 DELETE FROM ALL TABLES
 *******************************************************
+DELETE FROM LEADERBOARD;
+DELETE FROM PICK_RESULTS;
+DELETE FROM SCHEDULE;
 DELETE FROM PICKS;
 DELETE FROM USERS;
 DELETE FROM GAMES;
@@ -26,6 +29,12 @@ ALTER TABLE GAMES
 /*******************************************************
 DROP ALL PRIMARY KEY CONSTRAINTS
 *******************************************************/
+ALTER TABLE LEADERBOARD
+	DROP CONSTRAINT PK_LEADERBOARD;
+ALTER TABLE PICK_RESULTS
+	DROP CONSTRAINT PK_PICK_RESULTS;
+ALTER TABLE SCHEDULE
+	DROP CONSTRAINT PK_SCHEDULE;
 ALTER TABLE PICKS
 	DROP CONSTRAINT PK_PICKS;
 ALTER TABLE USERS
@@ -41,6 +50,9 @@ ALTER TABLE GAMES
 /*******************************************************
 DROP ALL TABLES
 *******************************************************/
+DROP TABLE IF EXISTS LEADERBOARD;
+DROP TABLE IF EXISTS PICK_RESULTS;
+DROP TABLE IF EXISTS SCHEDULE;
 DROP TABLE IF EXISTS PICKS;
 DROP TABLE IF EXISTS USERS;
 DROP TABLE IF EXISTS LOCATIONS;
@@ -0,0 +1,36 @@
+CREATE PROCEDURE MIGRATE_INDEXES()
+BEGIN
+
+
+/*******************************************************
+Composite indexes matching the access paths of
+CFB_GET_ALL_DATA_VW and CFB_SUBMIT_PICK. Run once, then
+re-run cfb_get_all_data_vw.sql and cfb_submit_pick.sql so
+the view and procedure use league-qualified joins and
+sargable league predicates. Compare the view before and
+after with `python -m db_scripts.benchmark_view`.
+*******************************************************/
+
+
+/*******************************************************
+PICKS: LEAGUE FIRST, SO A LEAGUE'S PICKS ARE ONE RANGE
+*******************************************************/
+ALTER TABLE PICKS
+	ADD INDEX IX_PICKS_LEAGUE_USER_GAME (LEAGUE, USER_ID, GAME_ID);
+
+
+/*******************************************************
+GAMES: LEAGUE SCHEDULE BY DATE
+*******************************************************/
+ALTER TABLE GAMES
+	ADD INDEX IX_GAMES_LEAGUE_DATE (LEAGUE, GAME_YEAR, GAME_MONTH, GAME_DAY);
+
+
+/*******************************************************
+USERS: SIGN IN BY USERNAME
+*******************************************************/
+ALTER TABLE USERS
+	ADD INDEX IX_USERS_USERNAME (USERNAME);
+
+
+END
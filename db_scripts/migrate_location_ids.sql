@@ -0,0 +1,41 @@
+CREATE PROCEDURE MIGRATE_LOCATION_IDS()
+BEGIN
+
+
+/*******************************************************
+Location IDs are now derived from the stadium, city and
+state instead of a running counter, and no longer fit a
+SMALLINT. Run once, followed by a full (non-partial) ETL
+run with pruning of the whole league enabled,
+    python app.py --prune-league
+which re-keys LOCATIONS and GAMES.LOCATION and deletes
+the counter based locations. Without --prune-league only
+games are pruned and the old locations stay in LOCATIONS.
+*******************************************************/
+
+
+/*******************************************************
+DROP FOREIGN KEY CONSTRAINTS ON LOCATION IDS
+*******************************************************/
+ALTER TABLE GAMES
+	DROP FOREIGN KEY FK_GameLocations;
+
+
+/*******************************************************
+WIDEN LOCATION ID COLUMNS
+*******************************************************/
+ALTER TABLE LOCATIONS
+	MODIFY LOCATION_ID INT NOT NULL;
+ALTER TABLE GAMES
+	MODIFY LOCATION INT NULL;
+
+
+/*******************************************************
+RESTORE FOREIGN KEY CONSTRAINTS ON LOCATION IDS
+*******************************************************/
+ALTER TABLE GAMES
+	ADD CONSTRAINT FK_GameLocations
+	FOREIGN KEY (LEAGUE, LOCATION) REFERENCES LOCATIONS(LEAGUE, LOCATION_ID);
+
+
+END
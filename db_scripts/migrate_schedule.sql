@@ -0,0 +1,78 @@
+CREATE PROCEDURE MIGRATE_SCHEDULE()
+BEGIN
+
+
+/*******************************************************
+Materialized, denormalized schedule: one row per game
+with its teams and location joined in, refreshed by the
+loader for the games whose rows changed. Run once, then
+re-run cfb_get_all_data_vw.sql so the view reads it, and
+run a load (any load mode) to fill it.
+*******************************************************/
+
+
+/*******************************************************
+CREATE SCHEDULE TABLE
+*******************************************************/
+CREATE TABLE IF NOT EXISTS SCHEDULE (
+	GAME_ID						INT				NOT NULL,
+	LEAGUE						VARCHAR(5)		NOT NULL,
+	AWAY_TEAM					VARCHAR(25)		NULL,
+	AWAY_TEAM_NAME				VARCHAR(50)		NULL,
+	AWAY_TEAM_MASCOT			VARCHAR(50)		NULL,
+	AWAY_LOGO_URL				VARCHAR(75)		NULL,
+	AWAY_CONFERENCE				VARCHAR(50)		NULL,
+	AWAY_CONFERENCE_WINS		TINYINT			NULL,
+	AWAY_CONFERENCE_LOSSES		TINYINT			NULL,
+	AWAY_CONFERENCE_TIES		TINYINT			NULL,
+	AWAY_OVERALL_WINS			TINYINT			NULL,
+	AWAY_OVERALL_LOSSES			TINYINT			NULL,
+	AWAY_OVERALL_TIES			TINYINT			NULL,
+	HOME_TEAM					VARCHAR(25)		NULL,
+	HOME_TEAM_NAME				VARCHAR(50)		NULL,
+	HOME_TEAM_MASCOT			VARCHAR(50)		NULL,
+	HOME_LOGO_URL				VARCHAR(75)		NULL,
+	HOME_CONFERENCE				VARCHAR(50)		NULL,
+	HOME_CONFERENCE_WINS		TINYINT			NULL,
+	HOME_CONFERENCE_LOSSES		TINYINT			NULL,
+	HOME_CONFERENCE_TIES		TINYINT			NULL,
+	HOME_OVERALL_WINS			TINYINT			NULL,
+	HOME_OVERALL_LOSSES			TINYINT			NULL,
+	HOME_OVERALL_TIES			TINYINT			NULL,
+	LOCATION					INT				NULL,
+	STADIUM						VARCHAR(100)	NULL,
+	STADIUM_CAPACITY			VARCHAR(25)		NULL,
+	CITY						VARCHAR(50)		NULL,
+	STATE						VARCHAR(50)		NULL,
+	LATITUDE					VARCHAR(25)		NULL,
+	LONGITUDE					VARCHAR(25)		NULL,
+	TV_COVERAGE					VARCHAR(25)		NULL,
+	BETTING_LINE				VARCHAR(25)		NULL,
+	BETTING_LINE_OVER_UNDER		VARCHAR(25)		NULL,
+	ATTENDANCE					MEDIUMINT		NULL,
+	AWAY_WIN_PCT				VARCHAR(25)		NULL,
+	HOME_WIN_PCT				VARCHAR(25)		NULL,
+	AWAY_QUARTER1				VARCHAR(25)		NULL,
+	AWAY_QUARTER2				VARCHAR(25)		NULL,
+	AWAY_QUARTER3				VARCHAR(25)		NULL,
+	AWAY_QUARTER4				VARCHAR(25)		NULL,
+	AWAY_OVERTIME				VARCHAR(25)		NULL,
+	AWAY_TOTAL					VARCHAR(25)		NULL,
+	HOME_QUARTER1				VARCHAR(25)		NULL,
+	HOME_QUARTER2				VARCHAR(25)		NULL,
+	HOME_QUARTER3				VARCHAR(25)		NULL,
+	HOME_QUARTER4				VARCHAR(25)		NULL,
+	HOME_OVERTIME				VARCHAR(25)		NULL,
+	HOME_TOTAL					VARCHAR(25)		NULL,
+	GAME_TIME					VARCHAR(25)		NULL,
+	GAME_DATE					VARCHAR(25)		NULL,
+	GAME_MONTH					TINYINT			NULL,
+	GAME_DAY					TINYINT			NULL,
+	GAME_YEAR					SMALLINT		NULL,
+	REFRESHED_AT				DATETIME		NOT NULL,
+	CONSTRAINT PK_SCHEDULE PRIMARY KEY (LEAGUE, GAME_ID),
+	INDEX IX_SCHEDULE_LEAGUE_DATE (LEAGUE, GAME_YEAR, GAME_MONTH, GAME_DAY)
+);
+
+
+END
\ No newline at end of file
@@ -0,0 +1,45 @@
+CREATE PROCEDURE MIGRATE_SCORING()
+BEGIN
+
+
+/*******************************************************
+Scored picks and the leaderboard built from them by
+`etl.score.score`. PICK_RESULTS holds one row per pick of
+a final game, LEADERBOARD one row per user, league, season
+and week, with WEEK 0 holding the season totals.
+*******************************************************/
+
+
+/*******************************************************
+CREATE SCORING TABLES
+*******************************************************/
+CREATE TABLE IF NOT EXISTS PICK_RESULTS (
+	LEAGUE						VARCHAR(5)		NOT NULL,
+	GAME_ID						INT				NOT NULL,
+	USER_ID						INT				NOT NULL,
+	SEASON						SMALLINT		NOT NULL,
+	WEEK						TINYINT			NOT NULL,
+	GAME_DATE					DATE			NOT NULL,
+	TEAM_PICKED					VARCHAR(25)		NULL,
+	WINNER						VARCHAR(25)		NULL,
+	CORRECT						TINYINT			NOT NULL,
+	POINTS						SMALLINT		NOT NULL,
+	CONSTRAINT PK_PICK_RESULTS PRIMARY KEY (LEAGUE, GAME_ID, USER_ID)
+);
+
+CREATE TABLE IF NOT EXISTS LEADERBOARD (
+	LEAGUE						VARCHAR(5)		NOT NULL,
+	SEASON						SMALLINT		NOT NULL,
+	WEEK						TINYINT			NOT NULL,
+	USER_ID						INT				NOT NULL,
+	POINTS						SMALLINT		NOT NULL,
+	CORRECT_PICKS				SMALLINT		NOT NULL,
+	SCORED_PICKS				SMALLINT		NOT NULL,
+	LEADERBOARD_RANK			INT				NOT NULL,
+	CURRENT_STREAK				SMALLINT		NULL,
+	LONGEST_STREAK				SMALLINT		NULL,
+	CONSTRAINT PK_LEADERBOARD PRIMARY KEY (LEAGUE, SEASON, WEEK, USER_ID)
+);
+
+
+END
\ No newline at end of file
@@ -0,0 +1,31 @@
+DELIMITER //
+
+DROP PROCEDURE IF EXISTS PROVISION_PICKS//
+
+CREATE PROCEDURE PROVISION_PICKS (
+	IN LEAGUE_INPUT VARCHAR(5),
+    IN USER_ID_INPUT INT
+)
+
+BEGIN
+	/*******************************************************
+	Insert the missing (user, game, league) pick slots in one
+	anti-join statement. A NULL league covers every league and
+	a NULL user every user; the loader provisions new games,
+	CFB_CREATE_USER provisions new users.
+	*******************************************************/
+	INSERT INTO PICKS (USER_ID, GAME_ID, LEAGUE, TEAM_ID)
+		SELECT U.USER_ID, G.GAME_ID, G.LEAGUE, NULL
+        FROM USERS AS U
+			CROSS JOIN GAMES AS G
+        WHERE (LEAGUE_INPUT IS NULL OR G.LEAGUE = LEAGUE_INPUT)
+			AND (USER_ID_INPUT IS NULL OR U.USER_ID = USER_ID_INPUT)
+			AND NOT EXISTS (
+				SELECT 1 FROM PICKS AS P
+				WHERE P.USER_ID = U.USER_ID
+					AND P.GAME_ID = G.GAME_ID
+					AND P.LEAGUE = G.LEAGUE
+			);
+END//
+
+DELIMITER ;
@@ -0,0 +1,82 @@
+DELIMITER //
+
+DROP PROCEDURE IF EXISTS SUBMIT_PICKS//
+
+CREATE PROCEDURE SUBMIT_PICKS (
+	IN USER_ID_INPUT INT,
+    IN LEAGUE_INPUT VARCHAR(5),
+    IN PICKS_INPUT JSON
+)
+
+BEGIN
+	/*******************************************************
+	Submit a whole slate of picks for one user in one call:
+	PICKS_INPUT is a JSON array of {"game_id", "team_id"}
+	objects. Every pick is validated against its game's teams
+	and kickoff (scraped in Eastern time, the start of the
+	game date while TBD) in one query, the
+	valid ones are written in one transaction, and the status
+	of every submitted pick is returned.
+	*******************************************************/
+	DECLARE LOCAL_NOW DATETIME;
+	DECLARE EXIT HANDLER FOR SQLEXCEPTION
+	BEGIN
+		ROLLBACK;
+		DROP TEMPORARY TABLE IF EXISTS SUBMITTED_PICKS;
+		RESIGNAL;
+	END;
+
+	SET LOCAL_NOW = COALESCE(CONVERT_TZ(NOW(), @@session.time_zone, 'America/New_York'), NOW());
+
+	/*******************************************************
+	VALIDATE SUBMITTED PICKS
+	*******************************************************/
+	DROP TEMPORARY TABLE IF EXISTS SUBMITTED_PICKS;
+	CREATE TEMPORARY TABLE SUBMITTED_PICKS AS
+		SELECT
+			J.GAME_ID,
+            J.TEAM_ID,
+            G.GAME_ID IS NOT NULL AS GAME_FOUND,
+            J.TEAM_ID IN (G.AWAY_TEAM, G.HOME_TEAM) AS TEAM_VALID,
+            CASE
+				WHEN G.GAME_TIME REGEXP '^[0-9]{1,2}:[0-9]{2} [AP]M$'
+					THEN STR_TO_DATE(CONCAT(G.GAME_DATE, ' ', G.GAME_TIME), '%M %e, %Y %l:%i %p')
+				ELSE STR_TO_DATE(G.GAME_DATE, '%M %e, %Y')
+			END AS KICKOFF
+		FROM JSON_TABLE(
+				PICKS_INPUT, '$[*]' COLUMNS (
+					GAME_ID		INT				PATH '$.game_id',
+					TEAM_ID		VARCHAR(25)		PATH '$.team_id'
+				)
+			) AS J
+			LEFT JOIN GAMES AS G
+				ON G.GAME_ID = J.GAME_ID
+				AND G.LEAGUE = LEAGUE_INPUT;
+
+	/*******************************************************
+	APPLY VALID PICKS
+	*******************************************************/
+	START TRANSACTION;
+	INSERT INTO PICKS (USER_ID, GAME_ID, LEAGUE, TEAM_ID)
+		SELECT USER_ID_INPUT, S.GAME_ID, LEAGUE_INPUT, S.TEAM_ID
+        FROM SUBMITTED_PICKS AS S
+        WHERE S.TEAM_VALID
+			AND S.KICKOFF > LOCAL_NOW
+	ON DUPLICATE KEY UPDATE TEAM_ID = VALUES(TEAM_ID);
+	COMMIT;
+
+	SELECT
+		S.GAME_ID,
+        S.TEAM_ID,
+        CASE
+			WHEN NOT S.GAME_FOUND THEN 'unknown game'
+            WHEN NOT COALESCE(S.TEAM_VALID, FALSE) THEN 'team not playing'
+            WHEN S.KICKOFF IS NULL OR S.KICKOFF <= LOCAL_NOW THEN 'locked'
+            ELSE 'accepted'
+		END AS STATUS
+	FROM SUBMITTED_PICKS AS S;
+
+	DROP TEMPORARY TABLE SUBMITTED_PICKS;
+END//
+
+DELIMITER ;
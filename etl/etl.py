@@ -4,31 +4,79 @@ Author: Gabe Baduqui
 
 Scrape, transform and load fall sports schedule data from various web pages
 """
-import etl.extract.extract as ext
-import etl.transform.transform as trf
 import etl.load.load as load
+import etl.extract.dead_letter as dl
 from datetime import date
 
-def full_etl(prod: bool, league: str):
+football_leagues = ['CFB', 'NFL']
+
+default_run_windows = {
+    'CFB': {'year': 2024, 'weeks': 15},
+    'NFL': {'year': 2024, 'weeks': 18},
+    'MLB': {'schedule_window_begin': date(2024, 8, 22), 'schedule_window_end': date(2024, 9, 29)},
+    'NBA': {'schedule_window_begin': date(2024, 10, 1), 'schedule_window_end': date(2024, 12, 1)}
+}
+
+def get_run_window(league: str, season=None, weeks=None, dates=None, game_ids=None):
+    """Function that builds the `full_extract` arguments for a run over part of a league's season, starting from the league's default window.
+       `weeks` only applies to football leagues and `dates` only to the other leagues.
+       Accepts `league`: String, `season`: Number, `weeks`: Tuple of (first week, last week), `dates`: Tuple of (first date, last date), `game_ids`: List
+       Returns `run_window`: Dictionary"""
+    league = league.upper()
+    if league not in default_run_windows:
+        raise ValueError(f'Invalid League: {league}')
+    run_window = dict(default_run_windows[league])
+
+    if season is not None:
+        if league in football_leagues:
+            run_window['year'] = int(season)
+        else:
+            # Shift the default window into the requested season
+            year_offset = int(season) - run_window['schedule_window_begin'].year
+            run_window['schedule_window_begin'] = run_window['schedule_window_begin'].replace(year=run_window['schedule_window_begin'].year + year_offset)
+            run_window['schedule_window_end'] = run_window['schedule_window_end'].replace(year=run_window['schedule_window_end'].year + year_offset)
+
+    if weeks is not None and league in football_leagues:
+        run_window['first_week'], run_window['weeks'] = int(weeks[0]), int(weeks[1])
+    if dates is not None and league not in football_leagues:
+        run_window['schedule_window_begin'], run_window['schedule_window_end'] = dates[0], dates[1]
+    if game_ids is not None and len(game_ids) > 0:
+        run_window['game_ids'] = [str(game_id) for game_id in game_ids]
+
+    return run_window
+
+def get_dead_letter_game_ids(league: str):
+    """Function that returns the Game IDs to re-run for a league's pending dead letters: failed games plus the published games of failed teams
+       Accepts `league`: String
+       Returns `game_ids`: List"""
+    league = league.upper()
+    game_ids = [entry['key'] for entry in dl.get_pending_dead_letters(league, 'games')]
+    team_ids = [entry['key'] for entry in dl.get_pending_dead_letters(league, 'teams')]
+
+    # A failed team is re-scraped through any one of its games
+    games_output = load.read_output(f'{league.lower()}_games')
+    if len(team_ids) > 0 and games_output is not None:
+        for team_id in team_ids:
+            team_games = games_output[(games_output['away_team'].astype(str) == team_id) | (games_output['home_team'].astype(str) == team_id)]
+            if len(team_games) > 0 and str(team_games['game_id'].iloc[0]) not in game_ids:
+                game_ids.append(str(team_games['game_id'].iloc[0]))
+    return game_ids
+
+def is_partial_run(league: str, weeks=None, dates=None, game_ids=None):
+    """Function that determines whether a run only covers part of a season, in which case outputs are merged rather than replaced.
+       Like `get_run_window`, `weeks` only counts for football leagues and `dates` only for the other leagues, since the window ignores them
+       Accepts `league`: String, `weeks`: Tuple, `dates`: Tuple, `game_ids`: List
+       Returns `partial`: Boolean"""
+    football = league.upper() in football_leagues
+    return (weeks is not None and football) or (dates is not None and not football) or (game_ids is not None and len(game_ids) > 0)
+
+def full_etl(prod: bool, league: str, season=None, weeks=None, dates=None, game_ids=None, load_mode='upsert', prune_league=False):
+    """Function that runs the extract, transform, load and score stages for a single league through `etl.scheduler.run_leagues`
+       Accepts `prod`: Boolean, `league`: String, `season`: Number, `weeks`: Tuple, `dates`: Tuple, `game_ids`: List, `load_mode`: String, `prune_league`: Boolean
+       Returns `games`: Pandas DataFrame, `teams`: Pandas DataFrame, `locations`: Pandas DataFrame"""
+    # The scheduler builds its run windows with this module, so it is imported on use
+    import etl.scheduler as scheduler
     league = league.upper()
-    
-    # Extract
-    if league == 'CFB':
-        games_raw, teams_raw, locations_raw = ext.full_extract(league, year=2024, weeks=15)
-    elif league == 'NFL':
-        games_raw, teams_raw, locations_raw = ext.full_extract(league, year=2024, weeks=18)
-    elif league == 'MLB':
-        games_raw, teams_raw, locations_raw = ext.full_extract(league, schedule_window_begin=date(2024, 8, 22), schedule_window_end=date(2024, 9, 29))
-    elif league == 'NBA':
-        games_raw, teams_raw, locations_raw = ext.full_extract(league, schedule_window_begin=date(2024, 10, 1), schedule_window_end=date(2024, 12, 1))
-    else:
-        print('Invalid League!!!')
-        quit()
-    
-    # Transform
-    games, teams, locations = trf.full_transform(league, games_raw, teams_raw, locations_raw)
-
-    # Load
-    load.full_load(prod, league, games, teams, locations)
-
-    return games, teams, locations
\ No newline at end of file
+    results = scheduler.run_leagues(prod, [league], season=season, weeks=weeks, dates=dates, game_ids={league: game_ids} if game_ids is not None else None,
+                                    load_mode=load_mode, prune_league=prune_league)
+    return results[league]
@@ -0,0 +1,115 @@
+"""
+Pickem ETL
+Author: Gabe Baduqui
+
+Checkpoint extract progress to an append-only JSONL file so that an interrupted extract job resumes where it stopped.
+"""
+import hashlib, json, os
+from datetime import datetime, timedelta
+
+checkpoint_dir = './pickem_checkpoints'
+checkpoint_stages = ['games', 'teams', 'locations']
+
+# Checkpointed games hold the scores and statuses of the moment they were scraped, so an older checkpoint is discarded instead of resumed
+checkpoint_max_age = timedelta(hours=6)
+
+def get_checkpoint_path(league: str, run_window: dict):
+    """Function that returns the checkpoint file path for a given league and run window, so different windows never share progress
+       Accepts `league`: String, `run_window`: Dictionary
+       Returns `checkpoint_path`: String"""
+    window_key = json.dumps(run_window, sort_keys=True, default=str)
+    window_hash = hashlib.md5(window_key.encode('utf-8')).hexdigest()[:12]
+    checkpoint_path = f'{checkpoint_dir}/{league.upper()}_extract_{window_hash}.jsonl'
+    return checkpoint_path
+
+def read_checkpoint_entries(checkpoint_path: str):
+    """Function that reads all intact entries of a checkpoint file, ignoring a line left half-written by a crash
+       Accepts `checkpoint_path`: String
+       Returns `entries`: List of Dictionaries"""
+    entries = []
+    try:
+        with open(checkpoint_path, 'r') as checkpoint_file:
+            for line in checkpoint_file:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return entries
+
+def get_created_at(entries: list):
+    """Function that returns when a checkpoint was created, from the entry written when it was opened
+       Accepts `entries`: List of Dictionaries
+       Returns `created_at`: Datetime, None for a checkpoint without a readable creation time"""
+    for entry in entries:
+        if entry['stage'] == 'created_at':
+            try:
+                return datetime.fromisoformat(entry['record'])
+            except (TypeError, ValueError):
+                return None
+    return None
+
+def open_checkpoint(league: str, run_window: dict, resume=True):
+    """Function that opens the checkpoint for a given league and run window, loading the progress of a previous interrupted run when `resume` is set.
+       A checkpoint created more than `checkpoint_max_age` ago is discarded, so an old crashed run's game records are scraped again
+       Accepts `league`: String, `run_window`: Dictionary, `resume`: Boolean
+       Returns `checkpoint`: Dictionary"""
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    checkpoint_path = get_checkpoint_path(league, run_window)
+    entries = read_checkpoint_entries(checkpoint_path) if resume else []
+    created_at = get_created_at(entries)
+    if created_at is None or datetime.now() - created_at > checkpoint_max_age:
+        if len(entries) > 0:
+            checkpoint_age = f'created {created_at:%Y-%m-%d %H:%M}' if created_at is not None else 'without a creation time'
+            print(f'~~ Discarding {league.upper()} extract checkpoint {checkpoint_age}, resuming only checkpoints newer than {checkpoint_max_age}')
+        entries = []
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+    checkpoint = {'path': checkpoint_path, 'game_ids': None}
+    for stage in checkpoint_stages:
+        checkpoint[stage] = {}
+    for entry in entries:
+        if entry['stage'] == 'game_ids':
+            checkpoint['game_ids'] = entry['record']
+        elif entry['stage'] in checkpoint_stages:
+            checkpoint[entry['stage']][entry['key']] = entry['record']
+
+    checkpoint['file'] = open(checkpoint_path, 'a')
+    if len(entries) == 0:
+        write_checkpoint(checkpoint, 'created_at', '', datetime.now().isoformat(timespec='seconds'))
+    return checkpoint
+
+def write_checkpoint(checkpoint: dict, stage: str, key: str, record: any):
+    """Function that durably appends a completed record (or the discovered Game IDs) to the checkpoint
+       Accepts `checkpoint`: Dictionary, `stage`: String, `key`: String, `record`: Any JSON serializable value
+       Returns: n/a"""
+    if checkpoint is None:
+        return
+    key = str(key)
+    entry = {'stage': stage, 'key': key, 'record': record}
+    checkpoint['file'].write(json.dumps(entry, default=str) + '\n')
+    checkpoint['file'].flush()
+    os.fsync(checkpoint['file'].fileno())
+
+    if stage == 'game_ids':
+        checkpoint['game_ids'] = record
+    elif stage in checkpoint_stages:
+        checkpoint[stage][key] = record
+
+def get_checkpointed_record(checkpoint: dict, stage: str, key: str):
+    """Function that returns the record completed for a given key by a previous run, if any
+       Accepts `checkpoint`: Dictionary, `stage`: String, `key`: String
+       Returns `record`: Dictionary, None if the key has not been completed"""
+    if checkpoint is None:
+        return None
+    return checkpoint[stage].get(str(key))
+
+def complete_checkpoint(checkpoint: dict):
+    """Function that closes and removes a checkpoint once its extract job has finished successfully
+       Accepts `checkpoint`: Dictionary
+       Returns: n/a"""
+    checkpoint['file'].close()
+    if os.path.exists(checkpoint['path']):
+        os.remove(checkpoint['path'])
@@ -4,7 +4,8 @@ Author: Gabe Baduqui
 
 Retrieve location data from Geocode.maps forward geocode API
 """
-import requests, time
+import time
+import etl.utils.request_budget as net
 import etl.utils.credentials as cred
 
 def get_city_name(location_name: str):
@@ -74,14 +75,14 @@ def call_geocode_api(stadium: str, city: str, state: str, logfile: object):
 
     logfile.write('Geocode API Response: ')
     try:
-        response = requests.get(geocode_api_url)
+        response = net.get(geocode_api_url)
         while response.status_code == 429:
             time.sleep(2)
-            response = requests.get(geocode_api_url)
+            response = net.get(geocode_api_url)
         geocode_record = response.json()[0]
         logfile.write(f'{geocode_record}\n')
     except Exception as e:
-        logfile.write(f'response: {requests.get(geocode_api_url).status_code} | ')
+        logfile.write(f'response: {net.get(geocode_api_url).status_code} | ')
         geocode_record = None
         logfile.write(f'{e}\n')
 
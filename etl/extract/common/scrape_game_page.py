@@ -4,7 +4,7 @@ Author: Gabe Baduqui
 
 Scrape all Game-specific data elements for a given Game ID.
 """
-import requests
+import etl.utils.request_budget as net
 import etl.extract.extract as ex
 import etl.extract.cfb.scrape_game_page as cfb_game
 import etl.extract.nfl.scrape_game_page as nfl_game
@@ -251,19 +251,27 @@ def get_home_winning_probability(matchup: str, logfile: object):
     return home_win_pct
 
 
+def get_game_url(league: str, game_id: str):
+    """Function that returns the ESPN web page URL of a given Game ID
+       Accepts `league`: String, `game_id`: String
+       Returns `espn_game_url`: String"""
+    if league.upper() == 'CFB':
+        espn_game_url = f'https://www.espn.com/college-football/game/_/gameId/{game_id}'
+    else:
+        espn_game_url = f'https://www.espn.com/{league.lower()}/game/_/gameId/{game_id}'
+    return espn_game_url
+
 def get_game_data(league: str, game_id: str, logfile: object):
     """Function that scrapes the webpage of a given Game ID and extracts needed data fields.
+       Raises an HTTPError when ESPN does not return the page successfully.
        Accepts `game_id`: String, `espn_game_url`: String, `logfile`: File Object
        Returns `game_data`: Dictionary"""
     print(f'~~ Scraping {league.upper()} GameID {game_id} data')
     logfile.write(f'~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\nScraping {league.upper()} GameID {game_id} data\n')
 
-    if league.upper() == 'CFB':
-        espn_game_url = f'https://www.espn.com/college-football/game/_/gameId/{game_id}'
-    else:
-        espn_game_url = f'https://www.espn.com/{league.lower()}/game/_/gameId/{game_id}'
-
-    game_resp = requests.get(espn_game_url, headers=ex.custom_header)
+    espn_game_url = get_game_url(league, game_id)
+    game_resp = net.get(espn_game_url, headers=ex.custom_header)
+    game_resp.raise_for_status()
     game_soup = BeautifulSoup(game_resp.content, 'html.parser')
 
     # Instantiate `game_data` dictionary
@@ -4,7 +4,7 @@ Author: Gabe Baduqui
 
 Scrape all Game IDs for a given season/week(s).
 """
-import requests
+import etl.utils.request_budget as net
 import etl.extract.extract as ex
 import etl.utils.get_all_dates_in_range as all_dates
 from bs4 import BeautifulSoup
@@ -41,7 +41,7 @@ def get_non_football_game_ids(league: str, schedule_window_begin: datetime, sche
         schedule_page_url = f'{espn_url}/{date_yyyymmdd}'
 
         # Scrape HTML from HTTP request to the URL above and store in variable `soup`
-        page = requests.get(schedule_page_url, headers=ex.custom_header)
+        page = net.get(schedule_page_url, headers=ex.custom_header)
         page_soup = BeautifulSoup(page.content, 'html.parser')
 
         # Instantiate variable for current day DIV
@@ -60,9 +60,9 @@ def get_non_football_game_ids(league: str, schedule_window_begin: datetime, sche
     return game_ids
 
 
-def get_football_game_ids(league: str, year: any, weeks: any, logfile: object):
-    """Function that scrapes the Game ID from each game row for a given season.
-       Accepts: `espn_schedule_url`: String, `year`: Number, `weeks`: Number, `logfile`: File Object
+def get_football_game_ids(league: str, year: any, weeks: any, logfile: object, first_week=1):
+    """Function that scrapes the Game ID from each game row for the weeks `first_week` through `weeks` of a given season.
+       Accepts: `espn_schedule_url`: String, `year`: Number, `weeks`: Number, `logfile`: File Object, `first_week`: Number
        Returns: game_ids: List of Strings"""
     game_ids = []
     espn_url = 'https://www.espn.com'
@@ -75,15 +75,14 @@ def get_football_game_ids(league: str, year: any, weeks: any, logfile: object):
         logfile.write(f'Incorrect league `{league.upper()}` inputted!!!\n')
         return
     
-    for week in range(weeks):
-        week += 1
+    for week in range(first_week, weeks + 1):
         print(f'~~~~ Scraping {league.upper()} Week {week} Games')
         logfile.write(f'~~~~ Scraping {league.upper()} Week {week} Games\n')
 
         espn_current_week_url = f'{schedule_url}week/{week}/year/{year}/'
 
         # Scrape HTML from HTTP request to the URL above and store in variable `soup`
-        page = requests.get(espn_current_week_url, headers=ex.custom_header)
+        page = net.get(espn_current_week_url, headers=ex.custom_header)
         page_soup = BeautifulSoup(page.content, 'html.parser')
 
         # Instantiate variable for 'parent' schedule DIV and for each distinct day with games in this particular week
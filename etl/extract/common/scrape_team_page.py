@@ -4,7 +4,7 @@ Author: Gabe Baduqui
 
 Scrape all Team-specific data elements for a given Team ID
 """
-import requests
+import etl.utils.request_budget as net
 import etl.extract.extract as ex
 import etl.extract.cfb.scrape_team_page as cfb_team
 import etl.extract.nfl.scrape_team_page as nfl_team
@@ -127,20 +127,28 @@ def get_overall_record(league: str, team_standing_row: str, logfile: object):
     return overall_record
 
 
+def get_team_url(league: str, team_id: str):
+    """Function that returns the ESPN web page URL of a given Team ID
+       Accepts `league`: String, `team_id`: String
+       Returns `espn_team_url`: String"""
+    if league.upper() == 'CFB':
+        espn_team_url = f'https://www.espn.com/college-football/team/_/id/{team_id}'
+    else:
+        espn_team_url = f'https://www.espn.com/{league.lower()}/team/_/name/{team_id}'
+    return espn_team_url
+
 def get_team_data(league: str, team_id: str, logfile: object):
     """Function that scrapes the webpage of a given Team and extracts the needed data fields.
+       Raises an HTTPError when ESPN does not return the page successfully.
        Accepts `league`: String, team_id`: String, `espn_team_url`: String `logfile`: File Object
        Returns team_data: Dictionary"""
     print(f'~~ Scraping {league.upper()} TeamID {team_id} data')
     logfile.write(f'~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\nScraping {league.upper()} TeamID {team_id} data\n')
 
     # Scrape HTML from HTTP request to the URL above and store in variable `page_soup`
-    if league.upper() == 'CFB':
-        espn_team_url = f'https://www.espn.com/college-football/team/_/id/{team_id}'
-    else:
-        espn_team_url = f'https://www.espn.com/{league.lower()}/team/_/name/{team_id}'
-
-    team_resp = requests.get(espn_team_url, headers=ex.custom_header)
+    espn_team_url = get_team_url(league, team_id)
+    team_resp = net.get(espn_team_url, headers=ex.custom_header)
+    team_resp.raise_for_status()
     team_soup = BeautifulSoup(team_resp.content, 'html.parser')
 
     # Instantiate `team_data` dictionary
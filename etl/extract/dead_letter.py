@@ -0,0 +1,136 @@
+"""
+Pickem ETL
+Author: Gabe Baduqui
+
+Record pages that failed to scrape in a per-league dead-letter store and retry them in deferred, budgeted batches.
+"""
+import json, os, time
+import etl.utils.get_timestamp as ts
+
+dead_letter_dir = './pickem_checkpoints'
+max_attempts = 5
+
+def get_dead_letter_path(league: str):
+    """Function that returns the dead-letter file path of a given league
+       Accepts `league`: String
+       Returns `dead_letter_path`: String"""
+    return f'{dead_letter_dir}/{league.upper()}_dead_letter.jsonl'
+
+def read_dead_letters(league: str):
+    """Function that reads the latest state of every dead-letter entry of a given league, keyed by (stage, key)
+       Accepts `league`: String
+       Returns `dead_letters`: Dictionary"""
+    dead_letters = {}
+    try:
+        with open(get_dead_letter_path(league), 'r') as dead_letter_file:
+            for line in dead_letter_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                dead_letters[(entry['stage'], entry['key'])] = entry
+    except FileNotFoundError:
+        pass
+    return dead_letters
+
+def append_dead_letter(league: str, entry: dict):
+    """Function that durably appends a new state of a dead-letter entry
+       Accepts `league`: String, `entry`: Dictionary
+       Returns: n/a"""
+    os.makedirs(dead_letter_dir, exist_ok=True)
+    with open(get_dead_letter_path(league), 'a') as dead_letter_file:
+        dead_letter_file.write(json.dumps(entry, default=str) + '\n')
+        dead_letter_file.flush()
+        os.fsync(dead_letter_file.fileno())
+
+def record_failure(league: str, stage: str, key: str, url: str, error_class: str, error: str, logfile: object):
+    """Function that records a failed page in the dead-letter store, incrementing its attempt count
+       Accepts `league`: String, `stage`: String, `key`: String, `url`: String, `error_class`: String, `error`: String, `logfile`: File Object
+       Returns `entry`: Dictionary"""
+    key = str(key)
+    previous_entry = read_dead_letters(league).get((stage, key))
+    attempts = 1
+    if previous_entry is not None and previous_entry['status'] == 'pending':
+        attempts = previous_entry['attempts'] + 1
+
+    entry = {'league': league.upper(), 'stage': stage, 'key': key, 'url': url, 'error_class': error_class,
+             'error': error, 'attempts': attempts, 'status': 'pending', 'timestamp': ts.get_timestamp()}
+    append_dead_letter(league, entry)
+    print(f'~~~~ Dead-lettered {league.upper()} {stage} {key} ({error_class}, attempt {attempts})')
+    logfile.write(f'~~~~ Dead-lettered {league.upper()} {stage} {key}: {url} ({error_class}: {error}, attempt {attempts})\n')
+    return entry
+
+def resolve_dead_letter(league: str, stage: str, key: str, logfile: object):
+    """Function that marks a dead-letter entry as resolved once its page has been scraped successfully
+       Accepts `league`: String, `stage`: String, `key`: String, `logfile`: File Object
+       Returns: n/a"""
+    key = str(key)
+    entry = read_dead_letters(league).get((stage, key))
+    if entry is None or entry['status'] != 'pending':
+        return
+    entry = dict(entry, status='resolved', timestamp=ts.get_timestamp())
+    append_dead_letter(league, entry)
+    logfile.write(f'~~~~ Resolved dead-lettered {league.upper()} {stage} {key}\n')
+
+def get_pending_dead_letters(league: str, stage: str, keys=None):
+    """Function that returns the pending dead-letter entries of a stage that have attempts left, optionally limited to the given keys
+       Accepts `league`: String, `stage`: String, `keys`: List
+       Returns `pending_entries`: List of Dictionaries"""
+    if keys is not None:
+        keys = set(str(key) for key in keys)
+    pending_entries = [entry for (entry_stage, entry_key), entry in read_dead_letters(league).items()
+                       if entry_stage == stage and entry['status'] == 'pending' and entry['attempts'] < max_attempts
+                       and (keys is None or entry_key in keys)]
+    return pending_entries
+
+def get_failed_keys(league: str, stage: str):
+    """Function that returns the keys of a stage whose pages are still failed, whether or not they have attempts left
+       Accepts `league`: String, `stage`: String
+       Returns `failed_keys`: Set of Strings"""
+    return {entry_key for (entry_stage, entry_key), entry in read_dead_letters(league).items() if entry_stage == stage and entry['status'] == 'pending'}
+
+def retry_dead_letters(league: str, stage: str, fetch_record: object, get_failure: object, logfile: object, keys=None, retry_budget=50, backoff_seconds=2):
+    """Function that re-fetches pending dead-lettered pages of a stage in one deferred batch, spending at most `retry_budget` requests
+       Accepts `league`: String, `stage`: String, `fetch_record`: Function(key) returning a record, `get_failure`: Function(record) returning an error class or None,
+               `logfile`: File Object, `keys`: List, `retry_budget`: Number, `backoff_seconds`: Number
+       Returns `recovered_records`: Dictionary of records keyed by key"""
+    recovered_records = {}
+    pending_entries = get_pending_dead_letters(league, stage, keys)
+    if len(pending_entries) == 0 or retry_budget <= 0:
+        return recovered_records
+
+    batch = pending_entries[:retry_budget]
+    print(f'\n~~ Retrying {len(batch)} of {len(pending_entries)} dead-lettered {league.upper()} {stage} pages ~~')
+    logfile.write(f'\n~~ Retrying {len(batch)} of {len(pending_entries)} dead-lettered {league.upper()} {stage} pages ~~\n')
+    time.sleep(backoff_seconds)
+
+    for entry in batch:
+        try:
+            record = fetch_record(entry['key'])
+            error_class = get_failure(record)
+            error = error_class
+        except Exception as e:
+            record = None
+            error_class = type(e).__name__
+            error = str(e)
+
+        if error_class is None:
+            resolve_dead_letter(league, stage, entry['key'], logfile)
+            recovered_records[entry['key']] = record
+        else:
+            record_failure(league, stage, entry['key'], entry['url'], error_class, error, logfile)
+
+    return recovered_records
+
+def compact_dead_letters(league: str):
+    """Function that rewrites a league's dead-letter file with only its pending entries
+       Accepts `league`: String
+       Returns: n/a"""
+    dead_letter_path = get_dead_letter_path(league)
+    if not os.path.exists(dead_letter_path):
+        return
+    pending_entries = [entry for entry in read_dead_letters(league).values() if entry['status'] == 'pending']
+    with open(f'{dead_letter_path}.tmp', 'w') as dead_letter_file:
+        for entry in pending_entries:
+            dead_letter_file.write(json.dumps(entry, default=str) + '\n')
+    os.replace(f'{dead_letter_path}.tmp', dead_letter_path)
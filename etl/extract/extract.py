@@ -7,10 +7,13 @@ Scrape pickem data from various web sources.
 import pandas as pd
 import time
 import etl.utils.get_timestamp as ts
+import etl.utils.get_location_id as loc_id
 import etl.extract.common.scrape_schedule_page as schedule
 import etl.extract.common.scrape_game_page as game
 import etl.extract.common.scrape_team_page as team
 import etl.extract.common.get_geocode_data as geo
+import etl.extract.checkpoint as ckpt
+import etl.extract.dead_letter as dl
 from datetime import date
 
 custom_header = {
@@ -36,88 +39,211 @@ def instantiate_logfile(league: str):
     extract_logfile = open(extract_logfile_path, 'a')
     return extract_logfile
 
-def extract_games(league: str, game_ids: list, extract_logfile: object):
-    """Function that instantiates a Pandas DataFrame storing Game Data scraped from ESPN Game web pages
-       Accepts `league`: String, game_ids`: List, `extract_logfile`: File Object
+def get_game_failure(game_data: dict):
+    """Function that classifies a scraped game record as failed when its Gamestrip or team IDs could not be scraped
+       Accepts `game_data`: Dictionary
+       Returns `error_class`: String, None if the record is complete"""
+    if 'away_team' not in game_data or 'home_team' not in game_data:
+        return 'MissingGamestrip'
+    if game_data['away_team'] == '0' or game_data['home_team'] == '0':
+        return 'MissingTeamId'
+    return None
+
+def get_team_failure(team_data: dict):
+    """Function that classifies a scraped team record as failed when its header or standings could not be scraped
+       Accepts `team_data`: Dictionary
+       Returns `error_class`: String, None if the record is complete"""
+    # Team '0' is the placeholder for a team ID that could not be scraped from its game, there is no page to retry
+    if str(team_data['team_id']) == '0':
+        return None
+    if 'name' not in team_data:
+        return 'MissingClubhouseHeader'
+    if 'conference_name' not in team_data:
+        return 'MissingTeamStandings'
+    return None
+
+def get_placeholder(columns: list, key_column: str, key: str, league: str):
+    """Function that builds the record of a page that could not be fetched at all: its key and league, with every scraped column set to None
+       Accepts `columns`: List, `key_column`: String, `key`: String, `league`: String
+       Returns `placeholder`: Dictionary"""
+    placeholder = {column: None for column in columns}
+    placeholder.update({key_column: key, 'league': league})
+    return placeholder
+
+def scrape_record(league: str, stage: str, key: str, url: str, scrape: object, get_failure: object, placeholder: dict, dead_letters: dict, extract_logfile: object, checkpoint: dict):
+    """Function that scrapes a single page, checkpointing the record on success and recording it in the dead-letter store on failure
+       Accepts `league`: String, `stage`: String, `key`: String, `url`: String, `scrape`: Function, `get_failure`: Function, `placeholder`: Dictionary,
+               `dead_letters`: Dictionary, `extract_logfile`: File Object, `checkpoint`: Dictionary
+       Returns `record`: Dictionary, `placeholder` if the page could not be fetched at all"""
+    try:
+        record = scrape()
+        error_class = get_failure(record)
+        error = error_class
+    except Exception as e:
+        record = placeholder
+        error_class = type(e).__name__
+        error = str(e)
+
+    if error_class is None:
+        ckpt.write_checkpoint(checkpoint, stage, key, record)
+        if (stage, str(key)) in dead_letters:
+            dl.resolve_dead_letter(league, stage, key, extract_logfile)
+    else:
+        dl.record_failure(league, stage, key, url, error_class, error, extract_logfile)
+    return record
+
+def replace_records(df: dict, key_column: str, records: dict):
+    """Function that overwrites the rows of a DataFrame with the re-fetched records of the same key
+       Accepts `df`: Pandas DataFrame, `key_column`: String, `records`: Dictionary of records keyed by key
+       Returns `df`: Pandas DataFrame"""
+    for key, record in records.items():
+        for idx in df.index[df[key_column].astype(str) == str(key)]:
+            for column, value in record.items():
+                df.at[idx, column] = value
+    return df
+
+def extract_games(league: str, game_ids: list, extract_logfile: object, checkpoint=None):
+    """Function that instantiates a Pandas DataFrame storing Game Data scraped from ESPN Game web pages, skipping games already completed in `checkpoint`
+       Accepts `league`: String, game_ids`: List, `extract_logfile`: File Object, `checkpoint`: Dictionary
        Returns `games_df`: Pandas DataFrame"""
     games_df = pd.DataFrame([], columns=['game_id', 'league', 'away_team', 'home_team', 'away_team_box_score', 
                                             'home_team_box_score', 'stadium', 'location', 'game_timestamp', 'tv_coverage', 'betting_line', 
                                             'betting_over_under', 'stadium_capacity', 'attendance', 'away_win_pct', 'home_win_pct'])
+    game_rows = []
+    dead_letters = dl.read_dead_letters(league)
 
     for game_id in game_ids:
-        game_data = game.get_game_data(league, game_id, extract_logfile)
-        new_game_row = pd.DataFrame([game_data])
-        games_df = pd.concat([games_df, new_game_row], ignore_index=True)
-        time.sleep(.2)
+        game_data = ckpt.get_checkpointed_record(checkpoint, 'games', game_id)
+        if game_data is None:
+            game_data = scrape_record(league, 'games', game_id, game.get_game_url(league, game_id), lambda: game.get_game_data(league, game_id, extract_logfile),
+                                      get_game_failure, get_placeholder(games_df.columns, 'game_id', game_id, league), dead_letters, extract_logfile, checkpoint)
+            time.sleep(.2)
+        game_rows.append(game_data)
+
+    if len(game_rows) > 0:
+        games_df = pd.concat([games_df, pd.DataFrame(game_rows)], ignore_index=True)
     return games_df
 
-def extract_teams(league: str, team_ids: list, extract_logfile: object):
-    """Function that instantiates a Pandas DataFrame storing School Data scraped from ESPN Team web pages
-       Accepts `league`: String, team_ids`: List, `extract_logfile`: File Object
+def extract_teams(league: str, team_ids: list, extract_logfile: object, checkpoint=None):
+    """Function that instantiates a Pandas DataFrame storing School Data scraped from ESPN Team web pages, skipping teams already completed in `checkpoint`
+       Accepts `league`: String, team_ids`: List, `extract_logfile`: File Object, `checkpoint`: Dictionary
        Returns `teams_df`: Pandas DataFrame"""
     teams_df = pd.DataFrame([], columns=['team_id', 'league', 'name', 'mascot', 'primary_color', 'secondary_color', 'accent_color', 'logo_url', 'conference_name', 'conference_record', 'overall_record'])
+    team_rows = []
+    dead_letters = dl.read_dead_letters(league)
 
     for team_id in team_ids:
-        team_data = team.get_team_data(league, team_id, extract_logfile)
-        new_team_row = pd.DataFrame([team_data])
-        teams_df = pd.concat([teams_df, new_team_row], ignore_index=True)
-        time.sleep(.2)
+        team_data = ckpt.get_checkpointed_record(checkpoint, 'teams', team_id)
+        if team_data is None:
+            team_data = scrape_record(league, 'teams', team_id, team.get_team_url(league, team_id), lambda: team.get_team_data(league, team_id, extract_logfile),
+                                      get_team_failure, get_placeholder(teams_df.columns, 'team_id', team_id, league), dead_letters, extract_logfile, checkpoint)
+            time.sleep(.2)
+        team_rows.append(team_data)
+
+    if len(team_rows) > 0:
+        teams_df = pd.concat([teams_df, pd.DataFrame(team_rows)], ignore_index=True)
     return teams_df
 
-def extract_locations(league: str, stadiums: list, location_names: list, stadium_capacities: list, extract_logfile: object):
-    """Function that instantiates a Pandas DataFrame storing Geocode Data retrieved from Geocode.maps REST API
-       Accepts `stadiums`: List, `location_names`: List, `stadium_capacities`: List, `extract_logfile`: File Object
-       Returns `games_raw`: Pandas DataFrame, `teams_raw`: Pandas DataFrame, `locations_raw`: Pandas DataFrame"""
+def extract_locations(league: str, stadiums: list, location_names: list, stadium_capacities: list, extract_logfile: object, known_locations=None, checkpoint=None):
+    """Function that instantiates a Pandas DataFrame storing Geocode Data retrieved from Geocode.maps REST API, skipping stadiums already completed in `checkpoint`.
+       Location IDs are derived from the stadium, city and state (see `etl.utils.get_location_id`), so they do not depend on game order
+       Accepts `stadiums`: List, `location_names`: List, `stadium_capacities`: List, `extract_logfile`: File Object, `known_locations`: Pandas DataFrame, `checkpoint`: Dictionary
+       Returns `locations_df`: Pandas DataFrame"""
     locations_df = pd.DataFrame([], columns=['league', 'location_id', 'stadium', 'stadium_capacity', 'city', 'state', 'latitude', 'longitude'])
-    unique_locations = []
-    location_id = 1
+    location_rows = []
+
+    # Keep previously extracted locations, re-keyed on their stable ID, and only geocode locations not seen before
+    if known_locations is not None and len(known_locations) > 0:
+        known_locations = known_locations[locations_df.columns].reset_index(drop=True)
+        known_locations['location_id'] = [loc_id.get_location_id(stadium, city, state) for stadium, city, state
+                                          in zip(known_locations['stadium'], known_locations['city'], known_locations['state'])]
+        locations_df = known_locations.drop_duplicates('location_id').reset_index(drop=True)
+    unique_locations = set(locations_df['location_id'])
 
     for i in range(len(stadiums)):
         stadium = stadiums[i]
         location_name = location_names[i]
         stadium_capacity = stadium_capacities[i]
-        concatenated_location = f'{stadium}, {location_name}'
         
-        if ((stadium is not None) and (location_name is not None)) and (concatenated_location not in unique_locations):
-            unique_locations.append(concatenated_location)
-            location_data = geo.get_location_data(league, location_id, stadium, stadium_capacity, location_name, extract_logfile)
-            new_location_row = pd.DataFrame([location_data])
-            locations_df = pd.concat([locations_df, new_location_row], ignore_index=True)
-            location_id += 1
-        time.sleep(1)
+        # Games whose page could not be fetched have no stadium or location to geocode
+        if (stadium is not None) and (location_name is not None) and not pd.isna(stadium) and not pd.isna(location_name):
+            location_id = loc_id.get_location_id_from_name(stadium, location_name)
+            if location_id in unique_locations:
+                continue
+            unique_locations.add(location_id)
+            location_data = ckpt.get_checkpointed_record(checkpoint, 'locations', location_id)
+            if location_data is None:
+                location_data = geo.get_location_data(league, location_id, stadium, stadium_capacity, location_name, extract_logfile)
+                ckpt.write_checkpoint(checkpoint, 'locations', location_id, location_data)
+                time.sleep(1)
+            location_rows.append(location_data)
+
+    if len(location_rows) > 0:
+        locations_df = pd.concat([locations_df, pd.DataFrame(location_rows)], ignore_index=True)
     return locations_df
 
 
-def full_extract(league: str, year=2024, weeks=15, schedule_window_begin=date(2024, 8, 21), schedule_window_end=date(2024, 9, 29)):
-    """Function that calls all necessary functions to extract all pickem data from required sources and return in Pandas DataFrames
-       Accepts `league`: String, `year`: Number, `weeks`: Number, `schedule_window_begin`: Date, `schedule_window_end`: Date
-       Returns `locations_df`: Pandas DataFrame"""
+def full_extract(league: str, year=2024, weeks=15, schedule_window_begin=date(2024, 8, 21), schedule_window_end=date(2024, 9, 29), first_week=1, game_ids=None, known_locations=None, resume=True, retry_budget=50):
+    """Function that calls all necessary functions to extract all pickem data from required sources and return in Pandas DataFrames.
+       Only the weeks `first_week` through `weeks` (football) or the dates in the schedule window (other leagues) are scraped, unless explicit `game_ids` are given.
+       Progress is checkpointed as it is made; with `resume` set, a previously interrupted extract of the same window continues from its checkpoint.
+       Pages that fail are dead-lettered and retried in one batch at the end of their stage, spending at most `retry_budget` requests per stage.
+       Accepts `league`: String, `year`: Number, `weeks`: Number, `schedule_window_begin`: Date, `schedule_window_end`: Date, `first_week`: Number, `game_ids`: List, `known_locations`: Pandas DataFrame, `resume`: Boolean, `retry_budget`: Number
+       Returns `games_raw`: Pandas DataFrame, `teams_raw`: Pandas DataFrame, `locations_raw`: Pandas DataFrame"""
     extract_logfile = instantiate_logfile(league)
     print(f'~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\nBeginning Full {league.upper()} Extract Jobs\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\n')
     extract_logfile.write(f'~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\nBeginning Full {league.upper()} Extract Jobs\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\n\n')
-    
-    print(f'\n~~ Retrieving {league.upper()} Game IDs for {year} schedule ~~')
-    extract_logfile.write(f'\n~~ Retrieving {league.upper()} Game IDs for {year} schedule ~~\n')
-    if league in ['CFB', 'NFL']: 
-        game_ids = schedule.get_football_game_ids(league, year, weeks, extract_logfile)
-    elif league in ['MLB', 'NBA']:
-        game_ids = schedule.get_non_football_game_ids(league, schedule_window_begin, schedule_window_end, extract_logfile)
+
+    run_window = {'year': year, 'weeks': weeks, 'first_week': first_week, 'schedule_window_begin': schedule_window_begin,
+                  'schedule_window_end': schedule_window_end, 'game_ids': game_ids}
+    checkpoint = ckpt.open_checkpoint(league, run_window, resume)
+    completed_records = sum(len(checkpoint[stage]) for stage in ckpt.checkpoint_stages)
+    if completed_records > 0 or checkpoint['game_ids'] is not None:
+        print(f'\n~~ Resuming {league.upper()} extract from checkpoint with {completed_records} completed records ~~')
+        extract_logfile.write(f'\n~~ Resuming {league.upper()} extract from checkpoint {checkpoint["path"]} with {completed_records} completed records ~~\n')
+
+    if checkpoint['game_ids'] is not None:
+        game_ids = checkpoint['game_ids']
+    elif game_ids is not None:
+        print(f'\n~~ Using {len(game_ids)} requested {league.upper()} Game IDs ~~')
+        extract_logfile.write(f'\n~~ Using {len(game_ids)} requested {league.upper()} Game IDs ~~\n')
     else:
-        print(f'\n~~ Invalid League: {league.upper()}')
-        extract_logfile.write(f'\n~~ Invalid League: {league.upper()}\n')
+        print(f'\n~~ Retrieving {league.upper()} Game IDs for {year} schedule ~~')
+        extract_logfile.write(f'\n~~ Retrieving {league.upper()} Game IDs for {year} schedule ~~\n')
+        if league in ['CFB', 'NFL']: 
+            game_ids = schedule.get_football_game_ids(league, year, weeks, extract_logfile, first_week)
+        elif league in ['MLB', 'NBA']:
+            game_ids = schedule.get_non_football_game_ids(league, schedule_window_begin, schedule_window_end, extract_logfile)
+        else:
+            print(f'\n~~ Invalid League: {league.upper()}')
+            extract_logfile.write(f'\n~~ Invalid League: {league.upper()}\n')
+        ckpt.write_checkpoint(checkpoint, 'game_ids', 'all', game_ids)
 
     print(f'\n~~ Retrieving {league.upper()} Game Data ~~')
     extract_logfile.write(f'\n~~ Retrieving {league.upper()} Game Data ~~\n')
-    games_raw = extract_games(league, game_ids, extract_logfile)
+    games_raw = extract_games(league, game_ids, extract_logfile, checkpoint)
+    recovered_games = dl.retry_dead_letters(league, 'games', lambda game_id: game.get_game_data(league, game_id, extract_logfile), get_game_failure,
+                                            extract_logfile, keys=game_ids, retry_budget=retry_budget)
+    for game_id, game_data in recovered_games.items():
+        ckpt.write_checkpoint(checkpoint, 'games', game_id, game_data)
+    games_raw = replace_records(games_raw, 'game_id', recovered_games)
 
     print(f'\n\n~~ Retrieving {league.upper()} Teams Data ~~')
     extract_logfile.write(f'\n\n~~ Retrieving {league.upper()} Teams Data ~~\n')
-    teams_raw = extract_teams(league, games_raw['away_team'].unique(), extract_logfile)
+    team_ids = pd.concat([games_raw['away_team'], games_raw['home_team']]).dropna().unique()
+    teams_raw = extract_teams(league, team_ids, extract_logfile, checkpoint)
+    recovered_teams = dl.retry_dead_letters(league, 'teams', lambda team_id: team.get_team_data(league, team_id, extract_logfile), get_team_failure,
+                                            extract_logfile, keys=team_ids, retry_budget=retry_budget)
+    for team_id, team_data in recovered_teams.items():
+        ckpt.write_checkpoint(checkpoint, 'teams', team_id, team_data)
+    teams_raw = replace_records(teams_raw, 'team_id', recovered_teams)
 
     print(f'\n\n~~ Retrieving {league.upper()} Locations Data ~~')
     extract_logfile.write(f'\n\n~~ Retrieving {league.upper()} Locations Data ~~\n')
-    locations_raw = extract_locations(league, games_raw['stadium'], games_raw['location'], games_raw['stadium_capacity'], extract_logfile)
+    locations_raw = extract_locations(league, games_raw['stadium'], games_raw['location'], games_raw['stadium_capacity'], extract_logfile, known_locations, checkpoint)
 
+    ckpt.complete_checkpoint(checkpoint)
+    dl.compact_dead_letters(league)
     print('\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\nFinished Full Extract Jobs\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\n\n')
     extract_logfile.write('\n\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\nFinished Full Extract Jobs\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\n\n\n')
 
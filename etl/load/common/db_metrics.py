@@ -0,0 +1,51 @@
+"""
+Pickem ETL
+Author: Gabe Baduqui
+
+Count and time the connections, statements and commits of the database backends.
+"""
+import threading
+
+metrics_lock = threading.Lock()
+metric_names = ['connections', 'connect_seconds', 'statements', 'statement_seconds', 'commits', 'commit_seconds']
+metrics = {metric_name: 0 for metric_name in metric_names}
+# Metrics of the current thread only, so that concurrently loaded partitions each report their own
+thread_metrics = threading.local()
+
+def get_thread_metrics():
+    """Function to return the metrics dictionary of the current thread
+       Accepts: n/a
+       Returns: `current_thread_metrics`: Dictionary"""
+    if not hasattr(thread_metrics, 'metrics'):
+        thread_metrics.metrics = {metric_name: 0 for metric_name in metric_names}
+    return thread_metrics.metrics
+
+def record_metric(metric_name: str, seconds: float):
+    """Function to add one timed operation to the process wide and current thread DB layer metrics
+       Accepts: `metric_name`: String (connect, statement or commit), `seconds`: Number
+       Returns: n/a"""
+    count_name = 'connections' if metric_name == 'connect' else f'{metric_name}s'
+    current_thread_metrics = get_thread_metrics()
+    current_thread_metrics[count_name] += 1
+    current_thread_metrics[f'{metric_name}_seconds'] += seconds
+    with metrics_lock:
+        metrics[count_name] += 1
+        metrics[f'{metric_name}_seconds'] += seconds
+
+def get_metrics(thread_only=False):
+    """Function to return a snapshot of the connection, statement and commit counts and timings, of the whole process or only the current thread
+       Accepts: `thread_only`: Boolean
+       Returns: `metrics_snapshot`: Dictionary"""
+    if thread_only:
+        return dict(get_thread_metrics())
+    with metrics_lock:
+        metrics_snapshot = dict(metrics)
+    return metrics_snapshot
+
+def get_metrics_since(metrics_snapshot: dict, thread_only=False):
+    """Function to return the metrics accumulated since a previous snapshot
+       Accepts: `metrics_snapshot`: Dictionary, `thread_only`: Boolean
+       Returns: `metrics_delta`: Dictionary"""
+    current_metrics = get_metrics(thread_only)
+    metrics_delta = {name: round(current_metrics[name] - metrics_snapshot[name], 4) for name in current_metrics}
+    return metrics_delta
@@ -0,0 +1,224 @@
+"""
+Pickem ETL
+Author: Gabe Baduqui
+
+Columns and keys of the pickem database tables, and the conversion of DataFrame rows into database values and row fingerprints, shared by every database backend.
+"""
+import hashlib
+import numpy as np
+import pandas as pd
+import etl.utils.get_week as wk
+
+# (Database column, DataFrame column) pairs of every table written or read by the ETL, and the primary keys defined in `create_db.sql`
+table_columns = {
+    'games': [('GAME_ID', 'game_id'), ('LEAGUE', 'league'), ('AWAY_TEAM', 'away_team'), ('HOME_TEAM', 'home_team'), ('LOCATION', 'location'),
+              ('TV_COVERAGE', 'tv_coverage'), ('BETTING_LINE', 'betting_line'), ('BETTING_LINE_OVER_UNDER', 'betting_over_under'),
+              ('ATTENDANCE', 'attendance'), ('AWAY_WIN_PCT', 'away_win_pct'), ('HOME_WIN_PCT', 'home_win_pct'),
+              ('AWAY_QUARTER1', 'away_quarter1'), ('AWAY_QUARTER2', 'away_quarter2'), ('AWAY_QUARTER3', 'away_quarter3'),
+              ('AWAY_QUARTER4', 'away_quarter4'), ('AWAY_OVERTIME', 'away_overtime'), ('AWAY_TOTAL', 'away_total'),
+              ('HOME_QUARTER1', 'home_quarter1'), ('HOME_QUARTER2', 'home_quarter2'), ('HOME_QUARTER3', 'home_quarter3'),
+              ('HOME_QUARTER4', 'home_quarter4'), ('HOME_OVERTIME', 'home_overtime'), ('HOME_TOTAL', 'home_total'),
+              ('GAME_TIME', 'game_time'), ('GAME_DATE', 'game_date'), ('GAME_MONTH', 'game_month'), ('GAME_DAY', 'game_day'),
+              ('GAME_YEAR', 'game_year')],
+    'teams': [('TEAM_ID', 'team_id'), ('LEAGUE', 'league'), ('NAME', 'name'), ('MASCOT', 'mascot'), ('PRIMARY_COLOR', 'primary_color'),
+              ('SECONDARY_COLOR', 'secondary_color'), ('ACCENT_COLOR', 'accent_color'), ('LOGO_URL', 'logo_url'),
+              ('CONFERENCE_NAME', 'conference_name'), ('CONFERENCE_WINS', 'conference_wins'), ('CONFERENCE_LOSSES', 'conference_losses'),
+              ('CONFERENCE_TIES', 'conference_ties'), ('OVERALL_WINS', 'overall_wins'), ('OVERALL_LOSSES', 'overall_losses'),
+              ('OVERALL_TIES', 'overall_ties')],
+    'locations': [('LEAGUE', 'league'), ('LOCATION_ID', 'location_id'), ('STADIUM', 'stadium'), ('STADIUM_CAPACITY', 'stadium_capacity'),
+                  ('CITY', 'city'), ('STATE', 'state'), ('LATITUDE', 'latitude'), ('LONGITUDE', 'longitude')],
+    'picks': [('USER_ID', 'user_id'), ('GAME_ID', 'game_id'), ('LEAGUE', 'league'), ('TEAM_ID', 'team_id')],
+    'pick_results': [('LEAGUE', 'league'), ('GAME_ID', 'game_id'), ('USER_ID', 'user_id'), ('SEASON', 'season'), ('WEEK', 'week'),
+                     ('GAME_DATE', 'game_date'), ('TEAM_PICKED', 'team_picked'), ('WINNER', 'winner'), ('CORRECT', 'correct'), ('POINTS', 'points')],
+    'leaderboard': [('LEAGUE', 'league'), ('SEASON', 'season'), ('WEEK', 'week'), ('USER_ID', 'user_id'), ('POINTS', 'points'),
+                    ('CORRECT_PICKS', 'correct_picks'), ('SCORED_PICKS', 'scored_picks'), ('LEADERBOARD_RANK', 'leaderboard_rank'),
+                    ('CURRENT_STREAK', 'current_streak'), ('LONGEST_STREAK', 'longest_streak')]
+}
+table_primary_keys = {
+    'games': ['GAME_ID', 'LEAGUE'],
+    'teams': ['TEAM_ID', 'LEAGUE'],
+    'locations': ['LEAGUE', 'LOCATION_ID'],
+    'picks': ['USER_ID', 'GAME_ID', 'LEAGUE'],
+    'pick_results': ['LEAGUE', 'GAME_ID', 'USER_ID'],
+    'leaderboard': ['LEAGUE', 'SEASON', 'WEEK', 'USER_ID']
+}
+
+# Columns besides the primary keys that `create_db.sql` defines as NOT NULL. A row leaving one empty fails the whole multi-row statement it is bound to
+table_required_columns = {
+    'games': [],
+    'teams': ['NAME', 'MASCOT'],
+    'locations': ['STADIUM'],
+    'picks': [],
+    'pick_results': ['SEASON', 'WEEK', 'GAME_DATE', 'CORRECT', 'POINTS'],
+    'leaderboard': ['POINTS', 'CORRECT_PICKS', 'SCORED_PICKS', 'LEADERBOARD_RANK']
+}
+
+# Columns holding whole numbers that the CSV outputs may write as floats (e.g. 52.0) when the DataFrame column also holds NaN
+whole_number_columns = {'GAME_ID', 'AWAY_TEAM', 'HOME_TEAM', 'LOCATION', 'ATTENDANCE', 'AWAY_QUARTER1', 'AWAY_QUARTER2', 'AWAY_QUARTER3',
+                        'AWAY_QUARTER4', 'AWAY_OVERTIME', 'AWAY_TOTAL', 'HOME_QUARTER1', 'HOME_QUARTER2', 'HOME_QUARTER3', 'HOME_QUARTER4',
+                        'HOME_OVERTIME', 'HOME_TOTAL', 'GAME_MONTH', 'GAME_DAY', 'GAME_YEAR', 'TEAM_ID', 'CONFERENCE_WINS',
+                        'CONFERENCE_LOSSES', 'CONFERENCE_TIES', 'OVERALL_WINS', 'OVERALL_LOSSES', 'OVERALL_TIES', 'LOCATION_ID',
+                        'STADIUM_CAPACITY', 'USER_ID', 'SEASON', 'WEEK', 'TEAM_PICKED', 'WINNER', 'CORRECT', 'POINTS', 'CORRECT_PICKS',
+                        'SCORED_PICKS', 'LEADERBOARD_RANK', 'CURRENT_STREAK', 'LONGEST_STREAK'}
+
+# Stand-in for NULL in row fingerprints, since CONCAT_WS skips NULL values
+fingerprint_null = '<NULL>'
+
+def to_db_value(value: any):
+    """Function to adapt a DataFrame value to a bound statement parameter: NaN and None become NULL, numpy scalars become Python values
+       and whole floats (e.g. IDs read back from CSV as 52.0) become integers
+       Accepts: `value`: Any
+       Returns: `db_value`: None, Integer, Float or String"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def get_record_params(table_name: str, record: list, db_columns: list):
+    """Function to adapt the values of a single record to the bound parameters of the given database columns
+       Accepts: `table_name`: String, `record`: Pandas Series, `db_columns`: List
+       Returns: `record_params`: Tuple"""
+    df_columns = dict(table_columns[table_name.lower()])
+    return tuple(to_db_value(record.get(df_columns[db_column])) for db_column in db_columns)
+
+def get_record_values(table_name: str, df: dict):
+    """Function to convert the rows of a DataFrame into parameter tuples ordered like `table_columns`
+       Accepts: `table_name`: String, `df`: Pandas DataFrame
+       Returns: `record_values`: List of Tuples"""
+    df_columns = [df_column for _, df_column in table_columns[table_name.lower()]]
+    values_df = df.reindex(columns=df_columns).astype(object)
+    return [tuple(to_db_value(value) for value in row) for row in values_df.itertuples(index=False, name=None)]
+
+def get_loadable_records(table_name: str, df: dict):
+    """Function to split off the DataFrame rows the database would reject, those missing a primary key or NOT NULL column value,
+       so they can be skipped and logged instead of failing the batch they are written in
+       Accepts: `table_name`: String, `df`: Pandas DataFrame
+       Returns: `records`: Pandas DataFrame of the loadable rows, `rejected_keys`: List of the rejected rows' primary key Tuples"""
+    table_name = table_name.lower()
+    df_columns = dict(table_columns[table_name])
+    key_columns = [df_columns[db_column] for db_column in table_primary_keys[table_name]]
+    required_columns = key_columns + [df_columns[db_column] for db_column in table_required_columns[table_name]]
+    loadable_rows = df.reindex(columns=required_columns).notna().all(axis=1).values
+    rejected_keys = [tuple(to_db_value(value) for value in key) for key in df.reindex(columns=key_columns)[~loadable_rows].astype(object).itertuples(index=False, name=None)]
+    return df[loadable_rows], rejected_keys
+
+def get_frame_fingerprints(table_name: str, df: dict):
+    """Function to compute the primary key and fingerprint of every DataFrame row the same way the backends' `fetch_fingerprints` do
+       Accepts: `table_name`: String, `df`: Pandas DataFrame
+       Returns: `fingerprints`: Pandas Series of fingerprints indexed by primary key, aligned with the rows of `df`"""
+    table_name = table_name.lower()
+    db_columns = [db_column for db_column, _ in table_columns[table_name]]
+    values_df = pd.DataFrame(get_record_values(table_name, df), columns=db_columns, dtype=object)
+    text_df = values_df.where(values_df.notna(), fingerprint_null).astype(str)
+    row_text = text_df[db_columns[0]].str.cat([text_df[db_column] for db_column in db_columns[1:]], sep='|')
+    fingerprints = pd.Series([hashlib.md5(text.encode('utf-8')).hexdigest() for text in row_text],
+                             index=pd.MultiIndex.from_frame(text_df[table_primary_keys[table_name]]), dtype=object)
+    return fingerprints
+
+# (SCHEDULE column, GAMES/TEAMS/LOCATIONS expression) pairs of the materialized schedule, one row per game with its teams and location joined in
+schedule_columns = [('GAME_ID', 'G.GAME_ID'), ('LEAGUE', 'G.LEAGUE'),
+                    ('AWAY_TEAM', 'G.AWAY_TEAM'), ('AWAY_TEAM_NAME', 'AWAY.NAME'), ('AWAY_TEAM_MASCOT', 'AWAY.MASCOT'), ('AWAY_LOGO_URL', 'AWAY.LOGO_URL'),
+                    ('AWAY_CONFERENCE', 'AWAY.CONFERENCE_NAME'), ('AWAY_CONFERENCE_WINS', 'AWAY.CONFERENCE_WINS'), ('AWAY_CONFERENCE_LOSSES', 'AWAY.CONFERENCE_LOSSES'),
+                    ('AWAY_CONFERENCE_TIES', 'AWAY.CONFERENCE_TIES'), ('AWAY_OVERALL_WINS', 'AWAY.OVERALL_WINS'), ('AWAY_OVERALL_LOSSES', 'AWAY.OVERALL_LOSSES'),
+                    ('AWAY_OVERALL_TIES', 'AWAY.OVERALL_TIES'),
+                    ('HOME_TEAM', 'G.HOME_TEAM'), ('HOME_TEAM_NAME', 'HOME.NAME'), ('HOME_TEAM_MASCOT', 'HOME.MASCOT'), ('HOME_LOGO_URL', 'HOME.LOGO_URL'),
+                    ('HOME_CONFERENCE', 'HOME.CONFERENCE_NAME'), ('HOME_CONFERENCE_WINS', 'HOME.CONFERENCE_WINS'), ('HOME_CONFERENCE_LOSSES', 'HOME.CONFERENCE_LOSSES'),
+                    ('HOME_CONFERENCE_TIES', 'HOME.CONFERENCE_TIES'), ('HOME_OVERALL_WINS', 'HOME.OVERALL_WINS'), ('HOME_OVERALL_LOSSES', 'HOME.OVERALL_LOSSES'),
+                    ('HOME_OVERALL_TIES', 'HOME.OVERALL_TIES'),
+                    ('LOCATION', 'G.LOCATION'), ('STADIUM', 'L.STADIUM'), ('STADIUM_CAPACITY', 'L.STADIUM_CAPACITY'), ('CITY', 'L.CITY'), ('STATE', 'L.STATE'),
+                    ('LATITUDE', 'L.LATITUDE'), ('LONGITUDE', 'L.LONGITUDE'),
+                    ('TV_COVERAGE', 'G.TV_COVERAGE'), ('BETTING_LINE', 'G.BETTING_LINE'), ('BETTING_LINE_OVER_UNDER', 'G.BETTING_LINE_OVER_UNDER'),
+                    ('ATTENDANCE', 'G.ATTENDANCE'), ('AWAY_WIN_PCT', 'G.AWAY_WIN_PCT'), ('HOME_WIN_PCT', 'G.HOME_WIN_PCT'),
+                    ('AWAY_QUARTER1', 'G.AWAY_QUARTER1'), ('AWAY_QUARTER2', 'G.AWAY_QUARTER2'), ('AWAY_QUARTER3', 'G.AWAY_QUARTER3'),
+                    ('AWAY_QUARTER4', 'G.AWAY_QUARTER4'), ('AWAY_OVERTIME', 'G.AWAY_OVERTIME'), ('AWAY_TOTAL', 'G.AWAY_TOTAL'),
+                    ('HOME_QUARTER1', 'G.HOME_QUARTER1'), ('HOME_QUARTER2', 'G.HOME_QUARTER2'), ('HOME_QUARTER3', 'G.HOME_QUARTER3'),
+                    ('HOME_QUARTER4', 'G.HOME_QUARTER4'), ('HOME_OVERTIME', 'G.HOME_OVERTIME'), ('HOME_TOTAL', 'G.HOME_TOTAL'),
+                    ('GAME_TIME', 'G.GAME_TIME'), ('GAME_DATE', 'G.GAME_DATE'), ('GAME_MONTH', 'G.GAME_MONTH'), ('GAME_DAY', 'G.GAME_DAY'),
+                    ('GAME_YEAR', 'G.GAME_YEAR'), ('REFRESHED_AT', 'CURRENT_TIMESTAMP')]
+schedule_primary_keys = ['LEAGUE', 'GAME_ID']
+
+# Above this many changed keys a league's whole schedule is refreshed, and its pick slots provisioned, instead of only the games they touch
+changed_key_limit = 500
+
+def get_key_ids(table_name: str, keys: list):
+    """Function to extract the non-league part of primary key Tuples, e.g. the team IDs of TEAMS keys
+       Accepts: `table_name`: String, `keys`: List of primary key Tuples
+       Returns: `key_ids`: List"""
+    key_columns = table_primary_keys[table_name.lower()]
+    id_position = [position for position, key_column in enumerate(key_columns) if key_column != 'LEAGUE'][0]
+    return sorted(set(str(key[id_position]) for key in keys))
+
+def get_schedule_refresh_select(league: str, changed_keys: dict, param_marker: str):
+    """Function to build the SELECT producing the SCHEDULE rows of a league from GAMES, TEAMS and LOCATIONS. With `changed_keys` only games
+       that changed, or whose teams or location changed, are selected; without them, or past `changed_key_limit`, the whole league is
+       Accepts: `league`: String, `changed_keys`: Dictionary of primary key Tuple Lists keyed by table name, or None, `param_marker`: String
+       Returns: `select_stmt`: String, `params`: List, `refreshed_keys`: Dictionary of refreshed key counts keyed by table name, None for the whole league"""
+    select_stmt = (f"SELECT {', '.join(expression for _, expression in schedule_columns)} "
+                   "FROM GAMES AS G "
+                   "LEFT JOIN TEAMS AS AWAY ON G.AWAY_TEAM = AWAY.TEAM_ID AND G.LEAGUE = AWAY.LEAGUE "
+                   "LEFT JOIN TEAMS AS HOME ON G.HOME_TEAM = HOME.TEAM_ID AND G.LEAGUE = HOME.LEAGUE "
+                   "LEFT JOIN LOCATIONS AS L ON G.LOCATION = L.LOCATION_ID AND G.LEAGUE = L.LEAGUE "
+                   f"WHERE G.LEAGUE = {param_marker}")
+    params = [league.upper()]
+    if changed_keys is None or sum(len(keys) for keys in changed_keys.values()) > changed_key_limit:
+        return select_stmt, params, None
+
+    key_ids = {table_name: get_key_ids(table_name, changed_keys.get(table_name, [])) for table_name in ['games', 'teams', 'locations']}
+    key_filters = {'games': ['G.GAME_ID'], 'teams': ['G.AWAY_TEAM', 'G.HOME_TEAM'], 'locations': ['G.LOCATION']}
+    conditions = []
+    for table_name, columns in key_filters.items():
+        if len(key_ids[table_name]) == 0:
+            continue
+        for column in columns:
+            conditions.append(f"{column} IN ({', '.join([param_marker] * len(key_ids[table_name]))})")
+            params.extend(key_ids[table_name])
+    select_stmt += f" AND ({' OR '.join(conditions) if len(conditions) > 0 else '1 = 0'})"
+    return select_stmt, params, {table_name: len(ids) for table_name, ids in key_ids.items()}
+
+def get_provision_picks_insert(league: str, game_keys: list, user_id: int, param_marker: str):
+    """Function to build the anti-join INSERT that adds every missing (user, game, league) pick slot of a league in one statement,
+       optionally limited to the games of `game_keys` (unless there are more than `changed_key_limit`) or to one user
+       Accepts: `league`: String, `game_keys`: List of GAMES primary key Tuples or None, `user_id`: Number or None, `param_marker`: String
+       Returns: `provision_stmt`: String, `params`: List"""
+    provision_stmt = ("INSERT INTO PICKS (USER_ID, GAME_ID, LEAGUE, TEAM_ID) "
+                      "SELECT U.USER_ID, G.GAME_ID, G.LEAGUE, NULL FROM USERS AS U CROSS JOIN GAMES AS G "
+                      f"WHERE G.LEAGUE = {param_marker} "
+                      "AND NOT EXISTS (SELECT 1 FROM PICKS AS P WHERE P.USER_ID = U.USER_ID AND P.GAME_ID = G.GAME_ID AND P.LEAGUE = G.LEAGUE)")
+    params = [league.upper()]
+    if game_keys is not None and len(game_keys) <= changed_key_limit:
+        game_ids = get_key_ids('games', game_keys)
+        if len(game_ids) == 0:
+            return None, params
+        provision_stmt += f" AND G.GAME_ID IN ({', '.join([param_marker] * len(game_ids))})"
+        params.extend(game_ids)
+    if user_id is not None:
+        provision_stmt += f' AND U.USER_ID = {param_marker}'
+        params.append(user_id)
+    return provision_stmt, params
+
+# Status of every submitted pick; only accepted picks are written
+pick_statuses = ['accepted', 'unknown game', 'team not playing', 'locked']
+
+def get_pick_statuses(picks: dict, games_df: dict, now=None):
+    """Function to validate a user's submitted picks against their games in one pass: a pick is accepted when its game exists,
+       its team plays in the game and the game has not kicked off yet
+       Accepts: `picks`: Dictionary of picked Team IDs keyed by Game ID, `games_df`: Pandas DataFrame of the picked games,
+       `now`: Timestamp in `kickoff_timezone` local time, defaults to the current time
+       Returns: `submitted_picks`: Pandas DataFrame of game_id, team_id and status"""
+    now = pd.Timestamp(now) if now is not None else pd.Timestamp.now(tz=wk.kickoff_timezone).tz_localize(None)
+    submitted_picks = pd.DataFrame({'game_id': [str(to_db_value(game_id)) for game_id in picks.keys()],
+                                    'team_id': [str(to_db_value(team_id)) for team_id in picks.values()]})
+    games = pd.DataFrame({'game_id': [str(to_db_value(game_id)) for game_id in games_df['game_id']],
+                          'away_team': [str(to_db_value(team_id)) for team_id in games_df['away_team']],
+                          'home_team': [str(to_db_value(team_id)) for team_id in games_df['home_team']],
+                          'kickoff': wk.get_kickoffs(games_df).values})
+    submitted_picks = submitted_picks.merge(games.drop_duplicates('game_id'), on='game_id', how='left')
+
+    game_found = submitted_picks['away_team'].notna()
+    team_valid = (submitted_picks['team_id'] == submitted_picks['away_team']) | (submitted_picks['team_id'] == submitted_picks['home_team'])
+    not_started = submitted_picks['kickoff'].notna() & (submitted_picks['kickoff'] > now)
+    submitted_picks['status'] = np.select([~game_found, ~team_valid, ~not_started], pick_statuses[1:], default=pick_statuses[0])
+    return submitted_picks[['game_id', 'team_id', 'status']]
@@ -4,167 +4,615 @@ Author: Gabe Baduqui
 
 Load pickem data from various web sources into MySQL Database.
 """
+import csv, os, threading, time
+import pandas as pd
 import mysql.connector
+import mysql.connector.pooling
 import etl.utils.credentials as cred
+from etl.load.common.db_tables import table_columns, table_primary_keys, whole_number_columns, fingerprint_null, to_db_value, get_record_params, get_record_values, get_loadable_records, get_frame_fingerprints, schedule_columns, schedule_primary_keys, get_schedule_refresh_select, get_provision_picks_insert
+from etl.load.common.db_metrics import record_metric, get_metrics, get_metrics_since
+
+db_name = 'MySQL Database'
+
+# Enough connections for every league to load its independent tables at once
+pool_size = 10
+pool_timeout = 30
+batch_size = 500
+
+connection_pool = None
+pool_lock = threading.Lock()
+swap_lock = threading.Lock()
 
 def instantiate_connection():
-    """Function to instantiate connection to MySQL `PICKEM_GB` database
+    """Function to check out a connection to MySQL `PICKEM_GB` database from the shared connection pool,
+       waiting up to `pool_timeout` seconds when every pooled connection is in use. Closing the connection returns it to the pool.
        Accepts: n/a
-       Returns: `conn`: MySQLConnection Object"""
-    config = cred.db_config
-    conn = mysql.connector.connect(**config)
+       Returns: `conn`: PooledMySQLConnection Object"""
+    global connection_pool
+    start = time.perf_counter()
+    with pool_lock:
+        if connection_pool is None:
+            # `allow_local_infile` lets `load_csv_file` stream the local CSV outputs with LOAD DATA LOCAL INFILE
+            connection_pool = mysql.connector.pooling.MySQLConnectionPool(pool_name='pickem_pool', pool_size=pool_size, allow_local_infile=True, **cred.db_config)
+
+    while True:
+        try:
+            conn = connection_pool.get_connection()
+            break
+        except mysql.connector.errors.PoolError:
+            if time.perf_counter() - start > pool_timeout:
+                raise
+            time.sleep(.05)
+    record_metric('connect', time.perf_counter() - start)
     return conn
 
+def execute_statement(cursor: object, statement: str, params=None):
+    """Function to execute a single statement, recording its timing
+       Accepts: `cursor`: MySQLCursor Object, `statement`: String, `params`: Tuple
+       Returns: n/a"""
+    start = time.perf_counter()
+    cursor.execute(statement, params)
+    record_metric('statement', time.perf_counter() - start)
 
-def record_exists_in_table(table_name: str, record: list, logfile: object):
-    """Function to verify if record exists in given table
-       Accepts: `table_name`: String, `record`: List, `logfile`: Logfile object
-       Returns: `record_exists`: Boolean"""
-    if table_name.lower() == 'games':
-        record_exists_query = f"SELECT COUNT(*) FROM GAMES WHERE LEAGUE = '{record.league}' AND GAME_ID = {int(record.game_id)};"
-    if table_name.lower() == 'teams':
-        record_exists_query = f"SELECT COUNT(*) FROM TEAMS WHERE LEAGUE = '{record.league}' AND TEAM_ID = '{record.team_id}';"
-    if table_name.lower() == 'locations':
-        record_exists_query = f"SELECT COUNT(*) FROM LOCATIONS WHERE LEAGUE = '{record.league}' AND LOCATION_ID = {int(record.location_id)};"
-    
+def commit(conn: object):
+    """Function to commit the open transaction of a connection, recording its timing
+       Accepts: `conn`: MySQLConnection Object
+       Returns: n/a"""
+    start = time.perf_counter()
+    conn.commit()
+    record_metric('commit', time.perf_counter() - start)
+
+
+def get_upsert_statement(table_name: str, row_count=1):
+    """Function to build the parameterized multi-row `INSERT ... ON DUPLICATE KEY UPDATE` statement of a given table
+       Accepts: `table_name`: String, `row_count`: Number of rows bound per execution
+       Returns: `upsert_stmt`: String"""
+    table_name = table_name.lower()
+    db_columns = [db_column for db_column, _ in table_columns[table_name]]
+    update_columns = [db_column for db_column in db_columns if db_column not in table_primary_keys[table_name]]
+    row_placeholders = f"({', '.join(['%s'] * len(db_columns))})"
+    upsert_stmt = (f"INSERT INTO {table_name.upper()} ({', '.join(db_columns)}) "
+                   f"VALUES {', '.join([row_placeholders] * row_count)} "
+                   f"ON DUPLICATE KEY UPDATE {', '.join(f'{db_column} = VALUES({db_column})' for db_column in update_columns)}")
+    return upsert_stmt
+
+def get_exists_statement(table_name: str):
+    """Function to build the parameterized statement counting the rows of a given table with a given primary key
+       Accepts: `table_name`: String
+       Returns: `exists_stmt`: String"""
+    key_columns = table_primary_keys[table_name.lower()]
+    return f"SELECT COUNT(*) FROM {table_name.upper()} WHERE {' AND '.join(f'{key_column} = %s' for key_column in key_columns)}"
+
+def get_update_statement(table_name: str):
+    """Function to build the parameterized statement updating every non-key column of a given table by primary key
+       Accepts: `table_name`: String
+       Returns: `update_stmt`: String"""
+    key_columns = table_primary_keys[table_name.lower()]
+    update_columns = [db_column for db_column, _ in table_columns[table_name.lower()] if db_column not in key_columns]
+    return (f"UPDATE {table_name.upper()} SET {', '.join(f'{db_column} = %s' for db_column in update_columns)} "
+            f"WHERE {' AND '.join(f'{key_column} = %s' for key_column in key_columns)}")
+
+def upsert_records(table_name: str, df: dict, logfile: object, batch_size=batch_size, conn=None):
+    """Function to insert or update every row of a DataFrame in the given table with multi-row `INSERT ... ON DUPLICATE KEY UPDATE` batches,
+       committing each batch. The batch statement is prepared once server-side and re-executed with new bound parameters for every full batch.
+       Rows missing a primary key or NOT NULL column value are skipped and logged, since one of them would fail its whole batch.
+       A failed batch is rolled back and logged without stopping the remaining batches
+       Accepts: `table_name`: String, `df`: Pandas DataFrame, `logfile`: File Object, `batch_size`: Number, `conn`: MySQLConnection Object
+       Returns: `upserted_records`: Number"""
+    df, rejected_keys = get_loadable_records(table_name, df)
+    if len(rejected_keys) > 0:
+        print(f'~~~~ Skipping {len(rejected_keys)} {table_name} records missing NOT NULL values: {rejected_keys}')
+        logfile.write(f'~~~~ Skipping {len(rejected_keys)} {table_name} records missing NOT NULL values: {rejected_keys}\n')
+    record_values = get_record_values(table_name, df)
+    upserted_records = 0
+    start = time.perf_counter()
+
+    own_connection = conn is None
+    if own_connection:
+        conn = instantiate_connection()
+    cursor = conn.cursor(prepared=True)
+    try:
+        for batch_start in range(0, len(record_values), batch_size):
+            batch = record_values[batch_start:batch_start + batch_size]
+            try:
+                execute_statement(cursor, get_upsert_statement(table_name, len(batch)), tuple(value for row in batch for value in row))
+                commit(conn)
+                upserted_records += len(batch)
+            except Exception as e:
+                conn.rollback()
+                print(f'Error occurred upserting {table_name} records {batch_start} to {batch_start + len(batch) - 1}:\n{e}')
+                logfile.write(f'Error occurred upserting {table_name} records {batch_start} to {batch_start + len(batch) - 1}:\n{e}\n\n')
+    finally:
+        cursor.close()
+        if own_connection:
+            conn.close()
+
+    elapsed = time.perf_counter() - start
+    rows_per_second = round(upserted_records / elapsed) if elapsed > 0 else upserted_records
+    print(f'~~~~ Upserted {upserted_records} of {len(record_values)} {table_name} records in {elapsed:.2f}s ({rows_per_second} rows/sec)')
+    logfile.write(f'~~~~ Upserted {upserted_records} of {len(record_values)} {table_name} records in {elapsed:.2f}s ({rows_per_second} rows/sec)\n')
+    return upserted_records
+
+def fetch_fingerprints(table_name: str, league: str, conn=None):
+    """Function to fetch the primary key and an MD5 fingerprint of every row a league has in the given table, in one query
+       Accepts: `table_name`: String, `league`: String, `conn`: MySQLConnection Object
+       Returns: `fingerprints`: Pandas Series of fingerprints indexed by primary key"""
+    table_name = table_name.lower()
+    db_columns = [db_column for db_column, _ in table_columns[table_name]]
+    key_columns = table_primary_keys[table_name]
+    fingerprint_columns = ', '.join(f"COALESCE(CAST({db_column} AS CHAR), '{fingerprint_null}')" for db_column in db_columns)
+    fingerprint_stmt = f"SELECT {', '.join(key_columns)}, MD5(CONCAT_WS('|', {fingerprint_columns})) FROM {table_name.upper()} WHERE LEAGUE = %s"
+
+    own_connection = conn is None
+    if own_connection:
+        conn = instantiate_connection()
+    cursor = conn.cursor()
+    try:
+        execute_statement(cursor, fingerprint_stmt, (league.upper(),))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+        if own_connection:
+            conn.close()
+
+    keys = [tuple(str(value) for value in row[:-1]) for row in rows]
+    fingerprints = pd.Series([row[-1] for row in rows], index=pd.MultiIndex.from_tuples(keys, names=key_columns), dtype=object)
+    return fingerprints
+
+def fetch_records(table_name: str, league: str, game_ids=None, conn=None):
+    """Function to read a league's rows of the given table, optionally only those of the given Game IDs (read `batch_size` IDs per query)
+       Accepts: `table_name`: String, `league`: String, `game_ids`: List, `conn`: MySQLConnection Object
+       Returns: `df`: Pandas DataFrame with the DataFrame column names of `table_columns`"""
+    table_name = table_name.lower()
+    db_columns = [db_column for db_column, _ in table_columns[table_name]]
+    df_columns = [df_column for _, df_column in table_columns[table_name]]
+    select_stmt = f"SELECT {', '.join(db_columns)} FROM {table_name.upper()} WHERE LEAGUE = %s"
+    if game_ids is None:
+        statements = [(select_stmt, (league.upper(),))]
+    else:
+        game_ids = [str(to_db_value(game_id)) for game_id in game_ids]
+        statements = [(f"{select_stmt} AND GAME_ID IN ({', '.join(['%s'] * len(game_ids[batch_start:batch_start + batch_size]))})",
+                       (league.upper(), *game_ids[batch_start:batch_start + batch_size])) for batch_start in range(0, len(game_ids), batch_size)]
+
+    rows = []
+    own_connection = conn is None
+    if own_connection:
+        conn = instantiate_connection()
+    cursor = conn.cursor()
+    try:
+        for statement, params in statements:
+            execute_statement(cursor, statement, params)
+            rows.extend(cursor.fetchall())
+    finally:
+        cursor.close()
+        if own_connection:
+            conn.close()
+    return pd.DataFrame(rows, columns=df_columns, dtype=object)
+
+def delete_records(table_name: str, keys: list, logfile: object, batch_size=batch_size, conn=None):
+    """Function to delete the rows with the given primary keys from the given table in batches, committing each batch
+       Accepts: `table_name`: String, `keys`: List of primary key Tuples, `logfile`: File Object, `batch_size`: Number, `conn`: MySQLConnection Object
+       Returns: `deleted_records`: Number"""
+    key_columns = table_primary_keys[table_name.lower()]
+    key_placeholders = f"({', '.join(['%s'] * len(key_columns))})"
+    deleted_records = 0
+
+    own_connection = conn is None
+    if own_connection:
+        conn = instantiate_connection()
+    cursor = conn.cursor(prepared=True)
+    try:
+        for batch_start in range(0, len(keys), batch_size):
+            batch = keys[batch_start:batch_start + batch_size]
+            delete_stmt = f"DELETE FROM {table_name.upper()} WHERE ({', '.join(key_columns)}) IN ({', '.join([key_placeholders] * len(batch))})"
+            try:
+                execute_statement(cursor, delete_stmt, tuple(value for key in batch for value in key))
+                commit(conn)
+                deleted_records += len(batch)
+            except Exception as e:
+                conn.rollback()
+                print(f'Error occurred deleting {table_name} records {batch}:\n{e}')
+                logfile.write(f'Error occurred deleting {table_name} records {batch}:\n{e}\n\n')
+    finally:
+        cursor.close()
+        if own_connection:
+            conn.close()
+    return deleted_records
+
+def delete_game_records(table_name: str, league: str, game_ids: list, logfile: object, batch_size=batch_size, conn=None):
+    """Function to delete every row a league's given games have in the given table (e.g. the PICKS of pruned games) in batches, committing each batch
+       Accepts: `table_name`: String, `league`: String, `game_ids`: List, `logfile`: File Object, `batch_size`: Number, `conn`: MySQLConnection Object
+       Returns: `deleted_records`: Number"""
+    game_ids = [str(to_db_value(game_id)) for game_id in game_ids]
+    deleted_records = 0
+
+    own_connection = conn is None
+    if own_connection:
+        conn = instantiate_connection()
+    cursor = conn.cursor(prepared=True)
+    try:
+        for batch_start in range(0, len(game_ids), batch_size):
+            batch = game_ids[batch_start:batch_start + batch_size]
+            delete_stmt = f"DELETE FROM {table_name.upper()} WHERE LEAGUE = %s AND GAME_ID IN ({', '.join(['%s'] * len(batch))})"
+            try:
+                execute_statement(cursor, delete_stmt, (league.upper(), *batch))
+                deleted_records += cursor.rowcount
+                commit(conn)
+            except Exception as e:
+                conn.rollback()
+                print(f'Error occurred deleting {table_name} records of games {batch}:\n{e}')
+                logfile.write(f'Error occurred deleting {table_name} records of games {batch}:\n{e}\n\n')
+    finally:
+        cursor.close()
+        if own_connection:
+            conn.close()
+    return deleted_records
+
+def get_staged_value(db_column: str, df_column: str, staged_columns: list):
+    """Function to build the expression converting a TEXT staging column to its MySQL column: empty fields become NULL and
+       floats written for whole numbers (52.0) lose their fraction. Columns missing from the CSV load as NULL
+       Accepts: `db_column`: String, `df_column`: String, `staged_columns`: List
+       Returns: `staged_value`: String"""
+    if df_column not in staged_columns:
+        return 'NULL'
+    staged_value = f'`{df_column}`'
+    if db_column in whole_number_columns:
+        staged_value = f"IF({staged_value} REGEXP '^-?[0-9]+[.]0+$', SUBSTRING_INDEX({staged_value}, '.', 1), {staged_value})"
+    return f"NULLIF({staged_value}, '')"
+
+def load_csv_file(table_name: str, csv_path: str, logfile: object, conn=None, target_table=None):
+    """Function to bulk load a CSV output into the given table: the file is streamed into a TEXT staging table with LOAD DATA LOCAL INFILE
+       and merged with one `INSERT ... SELECT ... ON DUPLICATE KEY UPDATE`, committed as a single transaction.
+       `target_table` merges into another table with the same columns, such as a shadow table
+       Accepts: `table_name`: String, `csv_path`: String, `logfile`: File Object, `conn`: MySQLConnection Object, `target_table`: String
+       Returns: `staged_records`: Number of CSV rows staged"""
+    table_name = table_name.lower()
+    if target_table is None:
+        target_table = table_name.upper()
+    with open(csv_path, 'r', newline='') as csv_file:
+        staged_columns = next(csv.reader(csv_file))
+    staging_table = f'{table_name.upper()}_STAGING'
+    db_columns = [db_column for db_column, _ in table_columns[table_name]]
+    key_columns = table_primary_keys[table_name]
+    update_columns = [db_column for db_column in db_columns if db_column not in key_columns]
+    staged_values = {db_column: get_staged_value(db_column, df_column, staged_columns) for db_column, df_column in table_columns[table_name]}
+
+    create_stmt = f"CREATE TEMPORARY TABLE {staging_table} ({', '.join(f'`{column}` TEXT' for column in staged_columns)})"
+    load_stmt = (f"LOAD DATA LOCAL INFILE %s INTO TABLE {staging_table} CHARACTER SET utf8mb4 "
+                 f"FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' LINES TERMINATED BY '\\n' IGNORE 1 LINES "
+                 f"({', '.join(f'`{column}`' for column in staged_columns)})")
+    merge_stmt = (f"INSERT INTO {target_table} ({', '.join(db_columns)}) "
+                  f"SELECT {', '.join(staged_values[db_column] for db_column in db_columns)} FROM {staging_table} "
+                  f"WHERE {' AND '.join(f'{staged_values[key_column]} IS NOT NULL' for key_column in key_columns)} "
+                  f"ON DUPLICATE KEY UPDATE {', '.join(f'{db_column} = VALUES({db_column})' for db_column in update_columns)}")
+
+    own_connection = conn is None
+    if own_connection:
+        conn = instantiate_connection()
+    cursor = conn.cursor()
+    start = time.perf_counter()
+    staging_created = False
+    try:
+        execute_statement(cursor, create_stmt)
+        staging_created = True
+        execute_statement(cursor, load_stmt, (os.path.abspath(csv_path),))
+        staged_records = cursor.rowcount
+        execute_statement(cursor, merge_stmt)
+        commit(conn)
+    except Exception as e:
+        conn.rollback()
+        print(f'Error occurred bulk loading {csv_path} into {target_table}:\n{e}')
+        logfile.write(f'Error occurred bulk loading {csv_path} into {target_table}:\n{merge_stmt}\n{e}\n\n')
+        raise
+    finally:
+        # Temporary tables are private to the (pooled) connection, so drop the staging table before the connection is reused
+        if staging_created:
+            execute_statement(cursor, f'DROP TEMPORARY TABLE {staging_table}')
+        cursor.close()
+        if own_connection:
+            conn.close()
+
+    elapsed = time.perf_counter() - start
+    print(f'~~~~ Bulk loaded {staged_records} {table_name} records from {csv_path} into {target_table} in {elapsed:.2f}s')
+    logfile.write(f'~~~~ Bulk loaded {staged_records} {table_name} records from {csv_path} into {target_table} in {elapsed:.2f}s\n')
+    return staged_records
+
+def table_exists(cursor: object, table_name: str):
+    """Function to verify if a table exists in the current database
+       Accepts: `cursor`: MySQLCursor Object, `table_name`: String
+       Returns: `exists`: Boolean"""
+    execute_statement(cursor, 'SELECT COUNT(*) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s', (table_name,))
+    return cursor.fetchone()[0] > 0
+
+def get_secondary_indexes(cursor: object, table_name: str):
+    """Function to read the definitions of every index of a table other than its primary key
+       Accepts: `cursor`: MySQLCursor Object, `table_name`: String
+       Returns: `indexes`: List of (index name, unique, column list) Tuples"""
+    execute_statement(cursor, """SELECT INDEX_NAME, NON_UNIQUE, COLUMN_NAME
+                                   FROM information_schema.STATISTICS
+                                  WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME <> 'PRIMARY'
+                                  ORDER BY INDEX_NAME, SEQ_IN_INDEX""", (table_name,))
+    indexes = {}
+    for index_name, non_unique, column_name in cursor.fetchall():
+        indexes.setdefault(index_name, (index_name, int(non_unique) == 0, []))[2].append(column_name)
+    return list(indexes.values())
+
+def get_foreign_keys(cursor: object, table_name: str):
+    """Function to read the definitions of every foreign key declared on a table
+       Accepts: `cursor`: MySQLCursor Object, `table_name`: String
+       Returns: `foreign_keys`: List of (constraint name, column list, referenced table, referenced column list, update rule, delete rule) Tuples"""
+    execute_statement(cursor, """SELECT K.CONSTRAINT_NAME, K.COLUMN_NAME, K.REFERENCED_TABLE_NAME, K.REFERENCED_COLUMN_NAME, R.UPDATE_RULE, R.DELETE_RULE
+                                   FROM information_schema.KEY_COLUMN_USAGE AS K
+                                   JOIN information_schema.REFERENTIAL_CONSTRAINTS AS R
+                                     ON R.CONSTRAINT_SCHEMA = K.CONSTRAINT_SCHEMA AND R.TABLE_NAME = K.TABLE_NAME AND R.CONSTRAINT_NAME = K.CONSTRAINT_NAME
+                                  WHERE K.TABLE_SCHEMA = DATABASE() AND K.TABLE_NAME = %s AND K.REFERENCED_TABLE_NAME IS NOT NULL
+                                  ORDER BY K.CONSTRAINT_NAME, K.ORDINAL_POSITION""", (table_name,))
+    foreign_keys = {}
+    for constraint_name, column_name, referenced_table, referenced_column, update_rule, delete_rule in cursor.fetchall():
+        foreign_key = foreign_keys.setdefault(constraint_name, (constraint_name, [], referenced_table, [], update_rule, delete_rule))
+        foreign_key[1].append(column_name)
+        foreign_key[3].append(referenced_column)
+    return list(foreign_keys.values())
+
+def get_foreign_key_clause(constraint_name: str, columns: list, referenced_table: str, referenced_columns: list, update_rule: str, delete_rule: str):
+    """Function to build the `ADD CONSTRAINT` clause of a foreign key read by `get_foreign_keys`
+       Accepts: `constraint_name`: String, `columns`: List, `referenced_table`: String, `referenced_columns`: List, `update_rule`: String, `delete_rule`: String
+       Returns: `clause`: String"""
+    return (f"ADD CONSTRAINT `{constraint_name}` FOREIGN KEY ({', '.join(f'`{column}`' for column in columns)}) "
+            f"REFERENCES `{referenced_table}` ({', '.join(f'`{column}`' for column in referenced_columns)}) ON UPDATE {update_rule} ON DELETE {delete_rule}")
+
+def get_base_constraint_name(constraint_name: str):
+    """Function to return the name a foreign key carries outside of a swap, without the `_SHADOW` suffix of shadow table constraints
+       Accepts: `constraint_name`: String
+       Returns: `base_name`: String"""
+    return constraint_name[:-len('_SHADOW')] if constraint_name.endswith('_SHADOW') else constraint_name
+
+def swap_load_csv_files(league: str, csv_paths: dict, expected_counts: dict, logfile: object):
+    """Function to fully reload a league's tables without readers ever seeing a partial load. Each table is rebuilt in a `{TABLE}_SHADOW` copy:
+       the other leagues' rows are copied, the league's CSV output is bulk loaded with the secondary indexes dropped, the indexes are rebuilt and the
+       row counts validated. `CREATE TABLE ... LIKE` does not copy foreign keys, so the live tables' foreign keys are then added to the shadow tables,
+       referencing the shadow copies of swapped tables, which validates the reloaded rows before anything is swapped. Constraint names are unique per
+       schema, so they carry a `_SHADOW` suffix until all shadow tables are swapped in with one atomic `RENAME TABLE`, the previous tables dropped
+       and the original names restored
+       Accepts: `league`: String, `csv_paths`: Dictionary of CSV paths keyed by table name, `expected_counts`: Dictionary of league row counts keyed by table name, `logfile`: File Object
+       Returns: n/a"""
+    league = league.upper()
+    table_names = list(csv_paths.keys())
+    conn = instantiate_connection()
+    cursor = conn.cursor()
+    swapped = False
+    try:
+        with swap_lock:
+            # Shadow games of an earlier failed swap may reference the shadow teams and locations, so drop them first
+            for table_name in sorted(table_names, key=lambda table_name: table_name != 'games'):
+                if table_exists(cursor, f'{table_name.upper()}_SHADOW'):
+                    execute_statement(cursor, f'DROP TABLE {table_name.upper()}_SHADOW')
+            foreign_keys = {table_name: get_foreign_keys(cursor, table_name.upper()) for table_name in table_names}
+
+            for table_name in table_names:
+                live_table, shadow_table = table_name.upper(), f'{table_name.upper()}_SHADOW'
+                execute_statement(cursor, f'CREATE TABLE {shadow_table} LIKE {live_table}')
+
+                # Load without secondary indexes and build them once the rows are in place
+                indexes = get_secondary_indexes(cursor, shadow_table)
+                for index_name, _, _ in indexes:
+                    execute_statement(cursor, f'ALTER TABLE {shadow_table} DROP INDEX `{index_name}`')
+                execute_statement(cursor, f'INSERT INTO {shadow_table} SELECT * FROM {live_table} WHERE LEAGUE <> %s', (league,))
+                other_league_records = cursor.rowcount
+                commit(conn)
+                load_csv_file(table_name, csv_paths[table_name], logfile, conn, target_table=shadow_table)
+                for index_name, unique, index_columns in indexes:
+                    execute_statement(cursor, f"ALTER TABLE {shadow_table} ADD {'UNIQUE ' if unique else ''}INDEX `{index_name}` ({', '.join(f'`{column}`' for column in index_columns)})")
+
+                execute_statement(cursor, f'SELECT SUM(LEAGUE = %s), SUM(LEAGUE <> %s) FROM {shadow_table}', (league, league))
+                league_records, shadow_other_records = [int(count or 0) for count in cursor.fetchone()]
+                if league_records != expected_counts[table_name] or shadow_other_records != other_league_records:
+                    raise ValueError(f'{shadow_table} holds {league_records} {league} and {shadow_other_records} other rows, '
+                                     f'expected {expected_counts[table_name]} and {other_league_records}')
+                print(f'~~~~ Validated {shadow_table}: {league_records} {league} rows, {shadow_other_records} other rows')
+                logfile.write(f'~~~~ Validated {shadow_table}: {league_records} {league} rows, {shadow_other_records} other rows\n')
+
+            # Foreign keys between swapped tables reference the shadow copies, and follow them to the live names on the rename
+            swapped_tables = [table_name.upper() for table_name in table_names]
+            for table_name in table_names:
+                shadow_table = f'{table_name.upper()}_SHADOW'
+                for constraint_name, columns, referenced_table, referenced_columns, update_rule, delete_rule in foreign_keys[table_name]:
+                    base_name = get_base_constraint_name(constraint_name)
+                    shadow_name = f'{base_name}_SHADOW' if constraint_name == base_name else base_name
+                    referenced_table = f'{referenced_table.upper()}_SHADOW' if referenced_table.upper() in swapped_tables else referenced_table
+                    execute_statement(cursor, f'ALTER TABLE {shadow_table} {get_foreign_key_clause(shadow_name, columns, referenced_table, referenced_columns, update_rule, delete_rule)}')
+                if len(foreign_keys[table_name]) > 0:
+                    print(f'~~~~ Added {len(foreign_keys[table_name])} foreign keys to {shadow_table}')
+                    logfile.write(f'~~~~ Added {len(foreign_keys[table_name])} foreign keys to {shadow_table}\n')
+
+            renames = [f'{table_name.upper()} TO {table_name.upper()}_OLD, {table_name.upper()}_SHADOW TO {table_name.upper()}' for table_name in table_names]
+            execute_statement(cursor, f"RENAME TABLE {', '.join(renames)}")
+            swapped = True
+            # Games reference teams and locations, so drop the previous tables in that order
+            for table_name in sorted(table_names, key=lambda table_name: table_name != 'games'):
+                execute_statement(cursor, f'DROP TABLE {table_name.upper()}_OLD')
+
+            # The dropped tables freed the original constraint names. The rows were validated against the same keys on the shadow tables,
+            # so the renamed constraints are re-added without checking them again
+            execute_statement(cursor, 'SET FOREIGN_KEY_CHECKS = 0')
+            try:
+                for table_name in table_names:
+                    for constraint_name, columns, referenced_table, referenced_columns, update_rule, delete_rule in get_foreign_keys(cursor, table_name.upper()):
+                        if constraint_name != get_base_constraint_name(constraint_name):
+                            execute_statement(cursor, f'ALTER TABLE {table_name.upper()} DROP FOREIGN KEY `{constraint_name}`, '
+                                                      f'{get_foreign_key_clause(get_base_constraint_name(constraint_name), columns, referenced_table, referenced_columns, update_rule, delete_rule)}')
+            finally:
+                execute_statement(cursor, 'SET FOREIGN_KEY_CHECKS = 1')
+        print(f'~~~~ Swapped in reloaded {league} tables {[table_name.upper() for table_name in table_names]}')
+        logfile.write(f'~~~~ Swapped in reloaded {league} tables {[table_name.upper() for table_name in table_names]}\n')
+    except Exception as e:
+        outcome = 'reloaded tables were swapped in' if swapped else 'live tables left unchanged'
+        print(f'Error occurred reloading {league} tables, {outcome}:\n{e}')
+        logfile.write(f'Error occurred reloading {league} tables, {outcome}:\n{e}\n\n')
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+def refresh_schedule(league: str, changed_keys: dict, logfile: object, conn=None):
+    """Function to refresh a league's rows of the materialized SCHEDULE table from GAMES, TEAMS and LOCATIONS in one transaction:
+       the games touched by `changed_keys` (every game when None) are re-joined and upserted with a new REFRESHED_AT,
+       and schedule rows whose game is gone are deleted
+       Accepts: `league`: String, `changed_keys`: Dictionary of primary key Tuple Lists keyed by table name, or None, `logfile`: File Object, `conn`: MySQLConnection Object
+       Returns: `removed_records`: Number of deleted schedule rows"""
+    league = league.upper()
+    select_stmt, params, refreshed_keys = get_schedule_refresh_select(league, changed_keys, '%s')
+    update_columns = [schedule_column for schedule_column, _ in schedule_columns if schedule_column not in schedule_primary_keys]
+    refresh_stmt = (f"INSERT INTO SCHEDULE ({', '.join(schedule_column for schedule_column, _ in schedule_columns)}) {select_stmt} "
+                    f"ON DUPLICATE KEY UPDATE {', '.join(f'{schedule_column} = VALUES({schedule_column})' for schedule_column in update_columns)}")
+    remove_stmt = ("DELETE FROM SCHEDULE WHERE LEAGUE = %s AND NOT EXISTS "
+                   "(SELECT 1 FROM GAMES AS G WHERE G.GAME_ID = SCHEDULE.GAME_ID AND G.LEAGUE = SCHEDULE.LEAGUE)")
+
+    own_connection = conn is None
+    if own_connection:
+        conn = instantiate_connection()
+    cursor = conn.cursor()
     try:
+        execute_statement(cursor, refresh_stmt, tuple(params))
+        execute_statement(cursor, remove_stmt, (league,))
+        removed_records = cursor.rowcount
+        commit(conn)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        if own_connection:
+            conn.close()
+
+    print(f"~~~~ Refreshed {league} SCHEDULE rows of {'every game' if refreshed_keys is None else refreshed_keys}, removed {removed_records}")
+    logfile.write(f"~~~~ Refreshed {league} SCHEDULE rows of {'every game' if refreshed_keys is None else refreshed_keys}, removed {removed_records}\n")
+    return removed_records
+
+def fetch_schedule(league: str, conn=None):
+    """Function to read a league's materialized schedule, one indexed single-table read, in game date order
+       Accepts: `league`: String, `conn`: MySQLConnection Object
+       Returns: `schedule_df`: Pandas DataFrame with one column per SCHEDULE column, including REFRESHED_AT"""
+    schedule_column_names = [schedule_column for schedule_column, _ in schedule_columns]
+    own_connection = conn is None
+    if own_connection:
         conn = instantiate_connection()
-        cursor = conn.cursor()
-        cursor.execute(record_exists_query)
-        count = cursor.fetchone()
+    cursor = conn.cursor()
+    try:
+        execute_statement(cursor, f"SELECT {', '.join(schedule_column_names)} FROM SCHEDULE WHERE LEAGUE = %s ORDER BY GAME_YEAR, GAME_MONTH, GAME_DAY, GAME_ID", (league.upper(),))
+        rows = cursor.fetchall()
+    finally:
         cursor.close()
+        if own_connection:
+            conn.close()
+    return pd.DataFrame(rows, columns=schedule_column_names)
+
+def fetch_schedule_refreshed_at(league: str, conn=None):
+    """Function to read when a league's materialized schedule was last refreshed
+       Accepts: `league`: String, `conn`: MySQLConnection Object
+       Returns: `refreshed_at`: Datetime, None if the league has no schedule rows"""
+    own_connection = conn is None
+    if own_connection:
+        conn = instantiate_connection()
+    cursor = conn.cursor()
+    try:
+        execute_statement(cursor, 'SELECT MAX(REFRESHED_AT) FROM SCHEDULE WHERE LEAGUE = %s', (league.upper(),))
+        refreshed_at = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+        if own_connection:
+            conn.close()
+    return refreshed_at
+
+def provision_picks(league: str, logfile: object, game_keys=None, user_id=None, conn=None):
+    """Function to add the missing (user, game, league) pick slots of a league with one anti-join INSERT, for the games of `game_keys`
+       (every game when None) and every user, or only `user_id`
+       Accepts: `league`: String, `logfile`: File Object, `game_keys`: List of GAMES primary key Tuples, `user_id`: Number, `conn`: MySQLConnection Object
+       Returns: `provisioned_picks`: Number of inserted pick slots"""
+    provision_stmt, params = get_provision_picks_insert(league, game_keys, user_id, '%s')
+    if provision_stmt is None:
+        return 0
+
+    own_connection = conn is None
+    if own_connection:
+        conn = instantiate_connection()
+    cursor = conn.cursor()
+    try:
+        execute_statement(cursor, provision_stmt, tuple(params))
+        provisioned_picks = cursor.rowcount
+        commit(conn)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        if own_connection:
+            conn.close()
+
+    print(f'~~~~ Provisioned {provisioned_picks} missing {league.upper()} pick slots')
+    logfile.write(f'~~~~ Provisioned {provisioned_picks} missing {league.upper()} pick slots\n')
+    return provisioned_picks
+
+def run_record_statement(statement: str, params: tuple, conn=None, fetch=False):
+    """Function to run a single prepared statement, committing it when no caller-owned `conn` is given
+       Accepts: `statement`: String, `params`: Tuple, `conn`: MySQLConnection Object, `fetch`: Boolean to return the first result row
+       Returns: `row`: Tuple when `fetch` is set, otherwise None"""
+    own_connection = conn is None
+    if own_connection:
+        conn = instantiate_connection()
+    cursor = conn.cursor(prepared=True)
+    try:
+        execute_statement(cursor, statement, params)
+        row = cursor.fetchone() if fetch else None
+    finally:
+        cursor.close()
+    if own_connection:
+        if not fetch:
+            commit(conn)
         conn.close()
+    return row
 
-        if count[0] > 0:
-            record_exists = True
-        else:
-            record_exists = False
+def record_exists_in_table(table_name: str, record: list, logfile: object, conn=None):
+    """Function to verify if record exists in given table, using `conn` when given instead of a connection of its own
+       Accepts: `table_name`: String, `record`: Pandas Series, `logfile`: Logfile object, `conn`: MySQLConnection Object
+       Returns: `record_exists`: Boolean"""
+    try:
+        params = get_record_params(table_name, record, table_primary_keys[table_name.lower()])
+        count = run_record_statement(get_exists_statement(table_name), params, conn, fetch=True)
+        record_exists = count[0] > 0
     except Exception as e:
         record_exists = False
-        logfile.write(f'Error occurred verifying if record for {record[0]} exists in table:\n{e}\n')
+        logfile.write(f'Error occurred verifying if record for {record.iloc[0]} exists in table:\n{e}\n')
 
     return record_exists
 
 
-def update_record(table_name: str, record: list, logfile: object):
-    """Function to verify if record exists in given table
-       Accepts: `table_name`: String, `record`: List, `logfile`: File Object 
+def update_record(table_name: str, record: list, logfile: object, conn=None):
+    """Function to update a record in the given table. When `conn` is given the statement joins its open transaction and is not committed here
+       Accepts: `table_name`: String, `record`: Pandas Series, `logfile`: File Object, `conn`: MySQLConnection Object
        Returns: n/a"""
-    if table_name.lower() == 'games':
-        update_stmt = f"""UPDATE GAMES
-                            SET AWAY_TEAM = '{record.away_team}',
-                                HOME_TEAM = '{record.home_team}',
-                                LOCATION = {record.location},
-                                TV_COVERAGE = '{record.tv_coverage}',
-                                BETTING_LINE = '{record.betting_line}',
-                                BETTING_LINE_OVER_UNDER = '{record.betting_over_under}',
-                                ATTENDANCE = {int(record.attendance)},
-                                AWAY_WIN_PCT = '{record.away_win_pct}',
-                                HOME_WIN_PCT = '{record.home_win_pct}',
-                                AWAY_QUARTER1 = '{record.away_quarter1}',
-                                AWAY_QUARTER2 = '{record.away_quarter2}',
-                                AWAY_QUARTER3 = '{record.away_quarter3}',
-                                AWAY_QUARTER4 = '{record.away_quarter4}',
-                                AWAY_OVERTIME = '{record.away_overtime}',
-                                AWAY_TOTAL = '{record.away_total}',
-                                HOME_QUARTER1 = '{record.home_quarter1}',
-                                HOME_QUARTER2 = '{record.home_quarter2}',
-                                HOME_QUARTER3 = '{record.home_quarter3}',
-                                HOME_QUARTER4 = '{record.home_quarter4}',
-                                HOME_OVERTIME = '{record.home_overtime}',
-                                HOME_TOTAL = '{record.home_total}',
-                                GAME_TIME = '{record.game_time}',
-                                GAME_DATE = '{record.game_date}',
-                                GAME_MONTH = {int(record.game_month)},
-                                GAME_DAY = {int(record.game_day)},
-                                GAME_YEAR = {int(record.game_year)}
-                            WHERE LEAGUE = '{record.league}'
-                                AND GAME_ID = {int(record.game_id)};"""
-
-    if table_name.lower() == 'teams':
-        update_stmt = f"""UPDATE TEAMS
-                            SET NAME = '{record['name']}',
-                                MASCOT = '{record.mascot}',
-                                LOGO_URL = '{record.logo_url}',
-                                PRIMARY_COLOR = '{record.primary_color}',
-                                SECONDARY_COLOR = '{record.secondary_color}',
-                                ACCENT_COLOR = '{record.accent_color}',
-                                CONFERENCE_NAME = '{record.conference_name}',
-                                CONFERENCE_WINS = {round(record.conference_wins)},
-                                CONFERENCE_LOSSES = {round(record.conference_losses)},
-                                CONFERENCE_TIES = {round(record.conference_ties)},
-                                OVERALL_WINS = {round(record.overall_wins)},
-                                OVERALL_LOSSES = {round(record.overall_losses)},
-                                OVERALL_TIES = {round(record.overall_ties)}
-                            WHERE LEAGUE = '{record.league}'
-                                AND TEAM_ID = '{record.team_id}';"""
-       
-    if table_name.lower() == 'locations':
-        update_stmt = f"""UPDATE LOCATIONS
-                            SET STADIUM = '{record.stadium.replace("'", "")}',
-                                STADIUM_CAPACITY = {int(record.stadium_capacity)},
-                                CITY = '{record.city}',
-                                STATE = '{record.state}',
-                                LATITUDE = '{record.latitude}',
-                                LONGITUDE = '{record.longitude}'
-                            WHERE LEAGUE = '{record.league}'
-                                AND LOCATION_ID = {int(record.location_id)};"""
-        
+    key_columns = table_primary_keys[table_name.lower()]
+    update_columns = [db_column for db_column, _ in table_columns[table_name.lower()] if db_column not in key_columns]
+    update_stmt = get_update_statement(table_name)
     try:
         logfile.write(f'Updating record for {record}\n')
-        conn = instantiate_connection()
-        cursor = conn.cursor()
-        cursor.execute(update_stmt)
-        conn.commit()
-        cursor.close()
-        conn.close()
+        params = get_record_params(table_name, record, update_columns + key_columns)
+        run_record_statement(update_stmt, params, conn)
     except Exception as e:
         print(f'Error occurred with following update statement\n{update_stmt}')
         logfile.write(f'Error occurred with following update statement\n{update_stmt}\n{e}\n\n')
 
 
-def insert_record(table_name: str, record: list, logfile: object):
-    """Function to verify if record exists in given table
-       Accepts: `table_name`: String, `record`: List, `logfile`: File Object 
+def insert_record(table_name: str, record: list, logfile: object, conn=None):
+    """Function to insert a record in the given table. When `conn` is given the statement joins its open transaction and is not committed here
+       Accepts: `table_name`: String, `record`: Pandas Series, `logfile`: File Object, `conn`: MySQLConnection Object
        Returns: n/a"""
-    if table_name.lower() == 'games':
-        insert_stmt = f"""INSERT INTO GAMES (GAME_ID, LEAGUE, AWAY_TEAM, HOME_TEAM, LOCATION, TV_COVERAGE, BETTING_LINE, 
-                                                    BETTING_LINE_OVER_UNDER, ATTENDANCE, AWAY_WIN_PCT, HOME_WIN_PCT, AWAY_QUARTER1, 
-                                                    AWAY_QUARTER2, AWAY_QUARTER3, AWAY_QUARTER4, AWAY_OVERTIME, AWAY_TOTAL,
-                                                    HOME_QUARTER1, HOME_QUARTER2, HOME_QUARTER3, HOME_QUARTER4, HOME_OVERTIME, 
-                                                    HOME_TOTAL, GAME_TIME, GAME_DATE, GAME_MONTH, GAME_DAY, GAME_YEAR)
-                            VALUES ({int(record.game_id)}, '{record.league}', '{record.away_team}', 
-                                    '{record.home_team}', '{record.location}', '{record.tv_coverage}', 
-                                    '{record.betting_line}', '{record.betting_over_under}', 
-                                    {int(record.attendance)}, '{record.away_win_pct}', '{record.home_win_pct}', 
-                                    {int(record.away_quarter1)}, {int(record.away_quarter2)}, {int(record.away_quarter3)}, 
-                                    {int(record.away_quarter4)}, {int(record.away_overtime)}, {int(record.away_total)}, 
-                                    {int(record.home_quarter1)}, {int(record.home_quarter2)}, {int(record.home_quarter3)}, 
-                                    {int(record.home_quarter4)}, {int(record.home_overtime)}, {int(record.home_total)}, 
-                                    '{record.game_time}', '{record.game_date}', {int(record.game_month)}, 
-                                    {int(record.game_day)}, {int(record.game_year)});"""
-    if table_name.lower() == 'teams':
-        insert_stmt = f"""INSERT INTO TEAMS (TEAM_ID, LEAGUE, NAME, MASCOT, PRIMARY_COLOR, SECONDARY_COLOR, ACCENT_COLOR,LOGO_URL, CONFERENCE_NAME, 
-                                                CONFERENCE_WINS, CONFERENCE_LOSSES, CONFERENCE_TIES, OVERALL_WINS, OVERALL_LOSSES, OVERALL_TIES)
-                            VALUES ('{record.team_id}', '{record.league}', '{record['name']}', '{record.mascot}', '{record.primary_color}', '{record.secondary_color}'
-                                    '{record.accent_color}', '{record.logo_url}', '{record.conference_name}', {round(record.conference_wins)},
-                                    {round(record.conference_losses)}, {round(record.conference_ties)}, {round(record.overall_wins)},
-                                    {round(record.overall_losses)}, {round(record.overall_ties)});"""
-    if table_name.lower() == 'locations':
-        insert_stmt = f"""INSERT INTO LOCATIONS (LEAGUE, LOCATION_ID, STADIUM, STADIUM_CAPACITY, CITY, STATE, LATITUDE, LONGITUDE)
-                            VALUES ('{record.league}', {int(record.location_id)}, '{record.stadium.replace("'", "")}', 
-                                    {record.stadium_capacity}, '{record.city}', '{record.state}',
-                                    '{record.latitude}', '{record.longitude}');"""
-
+    db_columns = [db_column for db_column, _ in table_columns[table_name.lower()]]
+    insert_stmt = f"INSERT INTO {table_name.upper()} ({', '.join(db_columns)}) VALUES ({', '.join(['%s'] * len(db_columns))})"
     try:
         logfile.write(f'Inserting record for {record}\n')
-        conn = instantiate_connection()
-        cursor = conn.cursor()
-        cursor.execute(insert_stmt)
-        conn.commit()
-        cursor.close()
-        conn.close()
+        params = get_record_params(table_name, record, db_columns)
+        run_record_statement(insert_stmt, params, conn)
     except Exception as e:
         print(f'Error occurred with following insert statement:\n{insert_stmt}')
         logfile.write(f'Error occurred with following insert statement:\n{insert_stmt}\n{e}\n\n')
-        
\ No newline at end of file
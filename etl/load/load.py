@@ -4,9 +4,50 @@ Author: Gabe Baduqui
 
 Load pickem data from various web sources into desired destinations.
 """
-from math import nan
-import etl.load.db as db
+import importlib, os
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+import etl.publish.schedule as schedule
+import etl.publish.columnar as columnar
 import etl.utils.get_timestamp as ts
+import etl.utils.get_week as wk
+import etl.extract.dead_letter as dl
+from etl.load.common.db_tables import table_primary_keys, get_loadable_records, get_pick_statuses
+from etl.utils.write_outputs import write_outputs
+
+load_modes = ['upsert', 'bulk', 'swap']
+
+# Database backends and the modules implementing them; the selected one is imported on first use
+db_backends = {
+   'mysql': 'etl.load.db',
+   'sqlite': 'etl.load.sqlite_db'
+}
+db_backend = os.environ.get('PICKEM_DB_BACKEND', 'mysql').lower()
+
+# Tables loaded concurrently at each step; games reference teams and locations, so they are loaded after both (and deleted before them)
+load_stages = [['teams', 'locations'], ['games']]
+
+table_keys = {
+   'games': ['league', 'game_id'],
+   'teams': ['league', 'team_id'],
+   'locations': ['league', 'location_id']
+}
+
+def set_db_backend(backend: str):
+   """Function that selects the database backend the load functions write to
+      Accepts `backend`: String, one of `db_backends`
+      Returns: n/a"""
+   global db_backend
+   backend = backend.lower()
+   if backend not in db_backends:
+      raise ValueError(f'Invalid database backend: {backend}')
+   db_backend = backend
+
+def get_db():
+   """Function that returns the module of the selected database backend
+      Accepts: n/a
+      Returns `db`: Module"""
+   return importlib.import_module(db_backends[db_backend])
 
 def instantiate_logfile(league):
     timestamp = ts.get_timestamp()
@@ -21,8 +62,7 @@ def load_csv(df: dict, table_name: str, load_logfile: object):
    print(f'~~~~ Writing {table_name} DataFrame to CSV File ~~')
    load_logfile.write(f'~~~~ Writing {table_name} DataFrame to CSV File ~~\n')
    
-   csv_path = f'./pickem_data/{table_name}.csv'
-   df.to_csv(csv_path, index=False)
+   write_outputs(df, f'./pickem_data/{table_name}', formats=['csv'])
 
 def load_json(df: dict, table_name: str, load_logfile: object):
    """Function that loads data from a given Pandas DataFrame into a JSON object
@@ -31,60 +71,344 @@ def load_json(df: dict, table_name: str, load_logfile: object):
    print(f'~~~~ Writing {table_name} DataFrame to JSON Object ~~')
    load_logfile.write(f'~~~~ Writing {table_name} DataFrame to JSON Object ~~\n')
    
-   json_path = f'./pickem_data/{table_name}.json'
-   df.to_json(json_path, orient='records')
-   
-def load_db(league: str, df: dict, table_name: str, load_logfile: object):
-   """Function that loads data from a given Pandas DataFrame into the MySQL Database
-      Accepts `league`: String, `df`: Pandas DataFrame, `table_name`: String, `load_logfile`: File Object
+   write_outputs(df, f'./pickem_data/{table_name}', formats=['json'])
+
+def load_outputs(df: dict, table_name: str, load_logfile: object):
+   """Function that streams data from a given Pandas DataFrame into its CSV, JSON and NDJSON files in one chunked pass
+      Accepts `df`: Pandas DataFrame, `table_name`: String, `load_logfile`: File Object
       Returns: n/a"""
-   print(f'~~~~ Loading {league} {table_name} data into MySQL Database ~~')
-   load_logfile.write(f'~~~~ Loading {league} {table_name} data into MySQL Database ~~\n')
-   
-   for i in range(len(df)):
-      record = df.iloc[i]
-      if record.league == 'CFB':
-         try:
-            if table_name.lower() == 'games':
-               if record.game_id is not nan:
-                  if db.record_exists_in_table(table_name, record, load_logfile):
-                     db.update_record(table_name, record, load_logfile)
-                  else:
-                     db.insert_record(table_name, record, load_logfile)
-            elif table_name.lower() == 'teams':
-               if record.team_id is not nan:
-                  if db.record_exists_in_table(table_name, record, load_logfile):
-                     db.update_record(table_name, record, load_logfile)
-                  else:
-                     db.insert_record(table_name, record, load_logfile)
-            else:
-               if db.record_exists_in_table(table_name, record, load_logfile):
-                  db.update_record(table_name, record, load_logfile)
-               else:
-                  db.insert_record(table_name, record, load_logfile)
-         except Exception as e:
-            print(f'~~~~ Error occurred loading record {record} into database:\n{e}')
-            load_logfile(f'~~~~ Error occurred loading record {record} into database:\n{e}\n')
-
-
-def full_load(prod: bool, league: str, games_df: dict, teams_df: dict, locations_df: dict):
-   """Function that calls all necessary functions to load all consolidated pickem data, stored in Pandas DataFrames, into the desired desinations
-      Accepts `league`: String, `games_df`: Pandas DataFrame, `teams_df`: Pandas DataFrame, `locations_df`: Pandas DataFrame
+   print(f'~~~~ Writing {table_name} DataFrame to CSV, JSON and NDJSON Files ~~')
+   load_logfile.write(f'~~~~ Writing {table_name} DataFrame to CSV, JSON and NDJSON Files ~~\n')
+
+   write_outputs(df, f'./pickem_data/{table_name}')
+
+def read_output(table_name: str):
+   """Function that reads a previously written CSV output back into a Pandas DataFrame
+      Accepts `table_name`: String
+      Returns `df`: Pandas DataFrame, None if the output does not exist"""
+   csv_path = f'./pickem_data/{table_name}.csv'
+   try:
+      df = pd.read_csv(csv_path)
+   except Exception:
+      df = None
+   return df
+
+def merge_with_output(df: dict, table_name: str, key_columns: list, load_logfile: object):
+   """Function that merges the rows of a partial run into the previously written output, replacing existing rows with the same key
+      Accepts `df`: Pandas DataFrame, `table_name`: String, `key_columns`: List, `load_logfile`: File Object
+      Returns `merged_df`: Pandas DataFrame"""
+   existing_df = read_output(table_name)
+   if existing_df is None or len(existing_df) == 0:
+      return df
+
+   replaced_rows = schedule.build_key_index(existing_df, key_columns).isin(schedule.build_key_index(df, key_columns))
+   merged_df = pd.concat([existing_df[~replaced_rows], df], axis=0, ignore_index=True)
+   print(f'~~~~ Merging {len(df)} rows into {len(existing_df)} existing {table_name} rows ~~')
+   load_logfile.write(f'~~~~ Merging {len(df)} rows into {len(existing_df)} existing {table_name} rows ~~\n')
+   return merged_df
+
+def load_partitions(load_table: object, table_names: list):
+   """Function that loads several tables of a league concurrently, each on its own thread and pooled connection
+      Accepts `load_table`: Function(table name), `table_names`: List
+      Returns `results`: Dictionary of `load_table` results keyed by table name"""
+   with ThreadPoolExecutor(max_workers=len(table_names)) as pool:
+      futures = {table_name: pool.submit(load_table, table_name) for table_name in table_names}
+      results = {table_name: futures[table_name].result() for table_name in table_names}
+   return results
+
+def load_db(league: str, df: dict, table_name: str, load_logfile: object, batch_size=None, find_stale=False):
+   """Function that loads data from a given Pandas DataFrame into the selected database, comparing row fingerprints with the database first
+      so that only new and changed rows are upserted. Rows the database would reject for missing NOT NULL values are counted as rejected.
+      When a batch fails, the fingerprints are read again so that only the rows the database now holds are counted and returned as changed.
+      With `find_stale` the keys the database holds for the league but the DataFrame lacks are returned for deletion
+      Accepts `league`: String, `df`: Pandas DataFrame, `table_name`: String, `load_logfile`: File Object, `batch_size`: Number, defaults to `db.batch_size`, `find_stale`: Boolean
+      Returns `changes`: Dictionary of inserted, updated, unchanged, rejected and failed row counts, `stale_keys`: List of primary key Tuples,
+      `changed_keys`: List of the written primary key Tuples"""
+   db = get_db()
+   print(f'~~~~ Loading {league} {table_name} data into {db.db_name} ~~')
+   load_logfile.write(f'~~~~ Loading {league} {table_name} data into {db.db_name} ~~\n')
+   if batch_size is None:
+      batch_size = db.batch_size
+   metrics_snapshot = db.get_metrics(thread_only=True)
+
+   key_column = table_keys[table_name.lower()][1]
+   records, rejected_keys = get_loadable_records(table_name, df[df[key_column].notna()])
+   changes = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'rejected': len(rejected_keys), 'failed': 0}
+   stale_keys = []
+   changed_keys = []
+   if len(rejected_keys) > 0:
+      print(f'~~~~ Skipping {len(rejected_keys)} {league} {table_name} records missing NOT NULL values: {rejected_keys}')
+      load_logfile.write(f'~~~~ Skipping {len(rejected_keys)} {league} {table_name} records missing NOT NULL values: {rejected_keys}\n')
+
+   try:
+      existing_fingerprints = db.fetch_fingerprints(table_name, league)
+      fingerprints = db.get_frame_fingerprints(table_name, records)
+      latest_rows = ~fingerprints.index.duplicated(keep='last')
+      records, fingerprints = records[latest_rows], fingerprints[latest_rows]
+
+      previous_fingerprints = existing_fingerprints.reindex(fingerprints.index)
+      new_rows = previous_fingerprints.isna().values
+      changed_rows = ~new_rows & (previous_fingerprints.values != fingerprints.values)
+      unchanged_rows = ~new_rows & ~changed_rows
+      if find_stale:
+         stale_keys = list(existing_fingerprints.index.difference(fingerprints.index))
+
+      upserted_records = db.upsert_records(table_name, records[new_rows | changed_rows], load_logfile, batch_size)
+      failed_records = 0
+      if upserted_records < int((new_rows | changed_rows).sum()):
+         # Failed batches were rolled back, so only the rows whose fingerprints the database now holds were written
+         written_rows = db.fetch_fingerprints(table_name, league).reindex(fingerprints.index).values == fingerprints.values
+         failed_records = int(((new_rows | changed_rows) & ~written_rows).sum())
+         new_rows, changed_rows = new_rows & written_rows, changed_rows & written_rows
+      changes.update({'inserted': int(new_rows.sum()), 'updated': int(changed_rows.sum()), 'unchanged': int(unchanged_rows.sum()), 'failed': failed_records})
+      changed_keys = list(fingerprints.index[new_rows | changed_rows])
+   except Exception as e:
+      print(f'~~~~ Error occurred loading {league} {table_name} records into database:\n{e}')
+      load_logfile.write(f'~~~~ Error occurred loading {league} {table_name} records into database:\n{e}\n')
+
+   load_metrics = db.get_metrics_since(metrics_snapshot, thread_only=True)
+   print(f'~~~~ {league} {table_name} DB metrics: {load_metrics}')
+   load_logfile.write(f'~~~~ {league} {table_name} DB metrics: {load_metrics}\n')
+   return changes, stale_keys, changed_keys
+
+# Dead-letter stage of the pages each table is scraped from; rows of pages that are still failing are never pruned
+dead_letter_stages = {'games': 'games', 'teams': 'teams'}
+
+# Tables keyed by game whose rows are deleted together with pruned games, since they have no foreign key to GAMES
+game_record_tables = ['picks', 'pick_results']
+
+def get_prunable_keys(league: str, table_name: str, stale_keys: list, games_df: dict, prune_league: bool):
+   """Function that limits the keys the database holds but a full run did not produce to the ones that may be deleted. By default only games
+      dated within the span of the extracted games are pruned, since teams and locations are shared by games outside the run window.
+      With `prune_league` every stale key of the league is pruned. Rows of pages that are still dead-lettered are never pruned
+      Accepts `league`: String, `table_name`: String, `stale_keys`: List of primary key Tuples, `games_df`: Pandas DataFrame of the extracted games, `prune_league`: Boolean
+      Returns `prunable_keys`: List of primary key Tuples"""
+   table_name = table_name.lower()
+   if len(stale_keys) == 0 or (not prune_league and table_name != 'games'):
+      return []
+
+   id_position = [key_column.lower() for key_column in table_primary_keys[table_name]].index(table_keys[table_name][1])
+   if table_name in dead_letter_stages:
+      failed_keys = dl.get_failed_keys(league, dead_letter_stages[table_name])
+      stale_keys = [key for key in stale_keys if key[id_position] not in failed_keys]
+   if prune_league or len(stale_keys) == 0:
+      return stale_keys
+
+   extracted_dates = wk.get_game_dates(games_df).dropna()
+   if len(extracted_dates) == 0:
+      return []
+   stale_games = get_db().fetch_records('games', league, game_ids=[key[id_position] for key in stale_keys])
+   stale_dates = wk.get_game_dates(stale_games)
+   in_window = (stale_dates >= extracted_dates.min()) & (stale_dates <= extracted_dates.max())
+   window_game_ids = set(schedule.normalize_key_column(stale_games['game_id'][in_window.values]))
+   return [key for key in stale_keys if key[id_position] in window_game_ids]
+
+def prune_db(league: str, table_name: str, stale_keys: list, load_logfile: object):
+   """Function that deletes the rows a full run no longer produced from the selected database, and the picks and pick results of pruned games
+      Accepts `league`: String, `table_name`: String, `stale_keys`: List of primary key Tuples, `load_logfile`: File Object
+      Returns `deleted_records`: Number"""
+   db = get_db()
+   if len(stale_keys) == 0:
+      return 0
+   print(f'~~~~ Deleting {len(stale_keys)} stale {league} {table_name} records from {db.db_name} ~~')
+   load_logfile.write(f'~~~~ Deleting {len(stale_keys)} stale {league} {table_name} records from {db.db_name} ~~\n')
+   try:
+      if table_name == 'games':
+         game_ids = [key[table_primary_keys['games'].index('GAME_ID')] for key in stale_keys]
+         for game_record_table in game_record_tables:
+            deleted_game_records = db.delete_game_records(game_record_table, league, game_ids, load_logfile)
+            print(f'~~~~ Deleted {deleted_game_records} {league} {game_record_table} records of stale games ~~')
+            load_logfile.write(f'~~~~ Deleted {deleted_game_records} {league} {game_record_table} records of stale games ~~\n')
+      deleted_records = db.delete_records(table_name, stale_keys, load_logfile)
+   except Exception as e:
+      deleted_records = 0
+      print(f'~~~~ Error occurred deleting {league} {table_name} records from database:\n{e}')
+      load_logfile.write(f'~~~~ Error occurred deleting {league} {table_name} records from database:\n{e}\n')
+   return deleted_records
+
+def refresh_schedule(league: str, changed_keys: dict, load_logfile: object):
+   """Function that refreshes the league's rows of the materialized SCHEDULE table after its tables were loaded
+      Accepts `league`: String, `changed_keys`: Dictionary of changed and deleted primary key Tuple Lists keyed by table name, None to refresh every game, `load_logfile`: File Object
+      Returns: n/a"""
+   db = get_db()
+   print(f'~~~~ Refreshing {league} schedule in {db.db_name} ~~')
+   load_logfile.write(f'~~~~ Refreshing {league} schedule in {db.db_name} ~~\n')
+   try:
+      db.refresh_schedule(league, changed_keys, load_logfile)
+   except Exception as e:
+      print(f'~~~~ Error occurred refreshing {league} schedule in database:\n{e}')
+      load_logfile.write(f'~~~~ Error occurred refreshing {league} schedule in database:\n{e}\n')
+
+def provision_picks(league: str, game_keys: list, load_logfile: object):
+   """Function that adds the pick slots every user is missing for the league's games after GAMES was loaded
+      Accepts `league`: String, `game_keys`: List of loaded GAMES primary key Tuples, None for every game, `load_logfile`: File Object
+      Returns: n/a"""
+   db = get_db()
+   try:
+      db.provision_picks(league, load_logfile, game_keys)
+   except Exception as e:
+      print(f'~~~~ Error occurred provisioning {league} picks in database:\n{e}')
+      load_logfile.write(f'~~~~ Error occurred provisioning {league} picks in database:\n{e}\n')
+
+def submit_picks(league: str, user_id: int, picks: dict, logfile: object, now=None):
+   """Function that submits a user's picks for many games at once: the picked games are read in one query to validate every pick against
+      its teams and kickoff, and the accepted picks are written in one transaction. Replaces a `CFB_SUBMIT_PICK` call per game
+      Accepts `league`: String, `user_id`: Number, `picks`: Dictionary of picked Team IDs keyed by Game ID, `logfile`: File Object,
+      `now`: Timestamp in Eastern time, defaults to the current time
+      Returns `submitted_picks`: Pandas DataFrame of game_id, team_id and status of every submitted pick, 'error' if the write was rolled back"""
+   db = get_db()
+   league = league.upper()
+   if len(picks) > db.batch_size:
+      raise ValueError(f'Cannot submit more than {db.batch_size} picks at once')
+
+   conn = db.instantiate_connection()
+   try:
+      games_df = db.fetch_records('games', league, game_ids=list(picks.keys()), conn=conn)
+      submitted_picks = get_pick_statuses(picks, games_df, now)
+      accepted = submitted_picks['status'] == 'accepted'
+      if accepted.any():
+         picks_df = pd.DataFrame({'user_id': user_id, 'game_id': submitted_picks.loc[accepted, 'game_id'],
+                                  'league': league, 'team_id': submitted_picks.loc[accepted, 'team_id']})
+         if db.upsert_records('picks', picks_df, logfile, batch_size=len(picks_df), conn=conn) < len(picks_df):
+            submitted_picks.loc[accepted, 'status'] = 'error'
+   finally:
+      conn.close()
+
+   submitted = int((submitted_picks['status'] == 'accepted').sum())
+   print(f'~~~~ Submitted {submitted} of {len(submitted_picks)} {league} picks for user {user_id}')
+   logfile.write(f'~~~~ Submitted {submitted} of {len(submitted_picks)} {league} picks for user {user_id}\n')
+   return submitted_picks
+
+def get_load_input(league: str, df: dict, table_name: str, load_logfile: object):
+   """Function that returns the CSV file a bulk or swap load reads for a table. The CSV output is read as is unless it holds rows without a key
+      or missing NOT NULL values, one of which fails the whole load statement; those rows are then logged and a copy without them is written
+      Accepts `league`: String, `df`: Pandas DataFrame of the written CSV output, `table_name`: String, `load_logfile`: File Object
+      Returns `csv_path`: String, `records`: Pandas DataFrame of the rows in the CSV file"""
+   key_column = table_keys[table_name][1]
+   records, rejected_keys = get_loadable_records(table_name, df[df[key_column].notna()])
+   if len(rejected_keys) > 0:
+      print(f'~~~~ Skipping {len(rejected_keys)} {league} {table_name} records missing NOT NULL values: {rejected_keys}')
+      load_logfile.write(f'~~~~ Skipping {len(rejected_keys)} {league} {table_name} records missing NOT NULL values: {rejected_keys}\n')
+   if len(records) == len(df):
+      return f'./pickem_data/{league.lower()}_{table_name}.csv', records
+   csv_path = f'./pickem_data/{league.lower()}_{table_name}_load.csv'
+   records.to_csv(csv_path, index=False)
+   return csv_path, records
+
+def remove_load_input(csv_path: str):
+   """Function that removes a CSV copy written by `get_load_input`, leaving the CSV outputs in place
+      Accepts `csv_path`: String
+      Returns: n/a"""
+   if csv_path.endswith('_load.csv') and os.path.exists(csv_path):
+      os.remove(csv_path)
+
+def load_db_file(league: str, df: dict, table_name: str, load_logfile: object):
+   """Function that bulk loads the CSV output of a given league and table into the selected database, without the rows it would reject
+      Accepts `league`: String, `df`: Pandas DataFrame of the written CSV output, `table_name`: String, `load_logfile`: File Object
       Returns: n/a"""
+   db = get_db()
+   print(f'~~~~ Bulk loading {league} {table_name} CSV output into {db.db_name} ~~')
+   load_logfile.write(f'~~~~ Bulk loading {league} {table_name} CSV output into {db.db_name} ~~\n')
+   metrics_snapshot = db.get_metrics(thread_only=True)
+
+   csv_path, _ = get_load_input(league, df, table_name, load_logfile)
+   try:
+      db.load_csv_file(table_name, csv_path, load_logfile)
+   except Exception as e:
+      print(f'~~~~ Error occurred bulk loading {league} {table_name} records into database:\n{e}')
+      load_logfile.write(f'~~~~ Error occurred bulk loading {league} {table_name} records into database:\n{e}\n')
+   finally:
+      remove_load_input(csv_path)
+
+   load_metrics = db.get_metrics_since(metrics_snapshot, thread_only=True)
+   print(f'~~~~ {league} {table_name} DB metrics: {load_metrics}')
+   load_logfile.write(f'~~~~ {league} {table_name} DB metrics: {load_metrics}\n')
+
+
+def load_db_swap(league: str, output_frames: dict, load_logfile: object):
+   """Function that fully reloads a league's tables in the selected database from its CSV outputs, without the rows they would reject,
+      swapping the reloaded rows in atomically
+      Accepts `league`: String, `output_frames`: Dictionary of the written Pandas DataFrames keyed by table name, `load_logfile`: File Object
+      Returns: n/a"""
+   db = get_db()
+   print(f'~~~~ Reloading {league} tables into {db.db_name} atomically ~~')
+   load_logfile.write(f'~~~~ Reloading {league} tables into {db.db_name} atomically ~~\n')
+   metrics_snapshot = db.get_metrics(thread_only=True)
+
+   csv_paths = {}
+   expected_counts = {}
+   for table_name in ['teams', 'locations', 'games']:
+      csv_paths[table_name], df = get_load_input(league, output_frames[table_name], table_name, load_logfile)
+      expected_counts[table_name] = len(schedule.build_key_index(df, table_keys[table_name]).unique())
+
+   try:
+      db.swap_load_csv_files(league, csv_paths, expected_counts, load_logfile)
+   except Exception as e:
+      print(f'~~~~ Error occurred reloading {league} records into database:\n{e}')
+      load_logfile.write(f'~~~~ Error occurred reloading {league} records into database:\n{e}\n')
+   finally:
+      for csv_path in csv_paths.values():
+         remove_load_input(csv_path)
+
+   load_metrics = db.get_metrics_since(metrics_snapshot, thread_only=True)
+   print(f'~~~~ {league} reload DB metrics: {load_metrics}')
+   load_logfile.write(f'~~~~ {league} reload DB metrics: {load_metrics}\n')
+
+
+def full_load(prod: bool, league: str, games_df: dict, teams_df: dict, locations_df: dict, partial=False, load_mode='upsert', prune_league=False):
+   """Function that calls all necessary functions to load all consolidated pickem data, stored in Pandas DataFrames, into the desired desinations.
+      The outputs are also written as columnar files partitioned by league and season (see `etl.publish.columnar`).
+      For `partial` runs the file outputs are merged with the previously written rows instead of being replaced.
+      The `bulk` load mode streams the written CSV outputs into the database instead of upserting the DataFrames,
+      and the `swap` load mode fully reloads the league's tables from them through atomically swapped shadow tables.
+      Afterwards every user gets the pick slots missing for the loaded games, and the materialized SCHEDULE table is refreshed,
+      for just the changed games, teams and locations in `upsert` mode.
+      Full `upsert` runs delete the games dated within the extracted games that the run no longer produced; `prune_league` deletes every
+      game, team and location of the league the run did not produce instead (see `get_prunable_keys`).
+      Accepts `league`: String, `games_df`: Pandas DataFrame, `teams_df`: Pandas DataFrame, `locations_df`: Pandas DataFrame, `partial`: Boolean, `load_mode`: String, `prune_league`: Boolean
+      Returns: n/a"""
+   if load_mode not in load_modes:
+      raise ValueError(f'Invalid load mode: {load_mode}')
    load_logfile = instantiate_logfile(league)
    print(f'\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\nBeginning {league.upper()} Load Jobs\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~')
    load_logfile.write(f'\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\nBeginning {league.upper()} Load Jobs\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~')
 
-   load_csv(games_df, f'{league.lower()}_games', load_logfile)
-   load_csv(teams_df, f'{league.lower()}_teams', load_logfile)
-   load_csv(locations_df, f'{league.lower()}_locations', load_logfile)
-   
-   load_json(games_df, f'{league.lower()}_games', load_logfile)
-   load_json(teams_df, f'{league.lower()}_teams', load_logfile)
-   load_json(locations_df, f'{league.lower()}_locations', load_logfile)
+   output_frames = {'games': games_df, 'teams': teams_df, 'locations': locations_df}
+   for table_name, df in output_frames.items():
+      if partial:
+         df = merge_with_output(df, f'{league.lower()}_{table_name}', table_keys[table_name], load_logfile)
+      load_outputs(df, f'{league.lower()}_{table_name}', load_logfile)
+      columnar.write_columnar(df, table_name, load_logfile)
+      output_frames[table_name] = df
 
-   load_db(league, games_df, 'games', load_logfile)
-   load_db(league, teams_df, 'teams', load_logfile)
-   load_db(league, locations_df, 'locations', load_logfile)
+   if load_mode == 'swap':
+      load_db_swap(league, output_frames, load_logfile)
+      provision_picks(league, None, load_logfile)
+      refresh_schedule(league, None, load_logfile)
+   elif load_mode == 'bulk':
+      for table_names in load_stages:
+         load_partitions(lambda table_name: load_db_file(league, output_frames[table_name], table_name, load_logfile), table_names)
+      provision_picks(league, None, load_logfile)
+      refresh_schedule(league, None, load_logfile)
+   else:
+      input_frames = {'games': games_df, 'teams': teams_df, 'locations': locations_df}
+      changes = {}
+      stale_keys = {}
+      changed_keys = {}
+      # Partial runs only hold part of the league, so nothing is deleted for them
+      for table_names in load_stages:
+         results = load_partitions(lambda table_name: load_db(league, input_frames[table_name], table_name, load_logfile, find_stale=not partial), table_names)
+         for table_name, (table_changes, table_stale_keys, table_changed_keys) in results.items():
+            changes[table_name], stale_keys[table_name], changed_keys[table_name] = table_changes, table_stale_keys, table_changed_keys
+      for table_name in stale_keys:
+         stale_keys[table_name] = get_prunable_keys(league, table_name, stale_keys[table_name], games_df, prune_league)
+      for table_names in reversed(load_stages):
+         deleted_records = load_partitions(lambda table_name: prune_db(league, table_name, stale_keys[table_name], load_logfile), table_names)
+         for table_name in table_names:
+            changes[table_name]['deleted'] = deleted_records[table_name]
+      provision_picks(league, changed_keys['games'], load_logfile)
+      refresh_schedule(league, {table_name: changed_keys[table_name] + stale_keys[table_name] for table_name in changed_keys}, load_logfile)
+      print(f'~~~~ {league.upper()} database changes: {changes}')
+      load_logfile.write(f'~~~~ {league.upper()} database changes: {changes}\n')
    print(f'~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\nFinished {league.upper()} Load Jobs\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~')
    load_logfile.write(f'~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\nFinished {league.upper()} Load Jobs\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~')
\ No newline at end of file
@@ -0,0 +1,537 @@
+"""
+Pickem ETL
+Author: Gabe Baduqui
+
+Load pickem data into a local SQLite Database, with the same functions as the `etl.load.db` MySQL backend.
+"""
+import os, sqlite3, threading, time
+import pandas as pd
+from etl.load.common.db_tables import table_columns, table_primary_keys, to_db_value, get_record_values, get_loadable_records, get_frame_fingerprints, schedule_columns, schedule_primary_keys, get_schedule_refresh_select, get_provision_picks_insert
+from etl.load.common.db_metrics import record_metric, get_metrics, get_metrics_since
+
+db_name = 'SQLite Database'
+sqlite_path = os.environ.get('PICKEM_SQLITE_PATH', './pickem_data/pickem.db')
+busy_timeout = 30
+batch_size = 500
+
+schema_lock = threading.Lock()
+swap_lock = threading.Lock()
+# Database files whose schema has already been created by this process
+schema_paths = set()
+
+# The tables, indexes, materialized SCHEDULE, scoring tables and CFB view of `db_scripts`. SQLite only enforces foreign keys on unique parent keys, which TEAMS(TEAM_ID) is not, so none are declared
+schema_statements = [
+    """CREATE TABLE IF NOT EXISTS GAMES (
+        GAME_ID                     INTEGER         NOT NULL,
+        LEAGUE                      VARCHAR(5)      NOT NULL,
+        AWAY_TEAM                   VARCHAR(25)     NULL,
+        HOME_TEAM                   VARCHAR(25)     NULL,
+        LOCATION                    INTEGER         NULL,
+        TV_COVERAGE                 VARCHAR(25)     NULL,
+        BETTING_LINE                VARCHAR(25)     NULL,
+        BETTING_LINE_OVER_UNDER     VARCHAR(25)     NULL,
+        ATTENDANCE                  INTEGER         NULL,
+        AWAY_WIN_PCT                VARCHAR(25)     NULL,
+        HOME_WIN_PCT                VARCHAR(25)     NULL,
+        AWAY_QUARTER1               VARCHAR(25)     NULL,
+        AWAY_QUARTER2               VARCHAR(25)     NULL,
+        AWAY_QUARTER3               VARCHAR(25)     NULL,
+        AWAY_QUARTER4               VARCHAR(25)     NULL,
+        AWAY_OVERTIME               VARCHAR(25)     NULL,
+        AWAY_TOTAL                  VARCHAR(25)     NULL,
+        HOME_QUARTER1               VARCHAR(25)     NULL,
+        HOME_QUARTER2               VARCHAR(25)     NULL,
+        HOME_QUARTER3               VARCHAR(25)     NULL,
+        HOME_QUARTER4               VARCHAR(25)     NULL,
+        HOME_OVERTIME               VARCHAR(25)     NULL,
+        HOME_TOTAL                  VARCHAR(25)     NULL,
+        GAME_TIME                   VARCHAR(25)     NULL,
+        GAME_DATE                   VARCHAR(25)     NULL,
+        GAME_MONTH                  INTEGER         NULL,
+        GAME_DAY                    INTEGER         NULL,
+        GAME_YEAR                   INTEGER         NULL,
+        PRIMARY KEY (GAME_ID, LEAGUE)
+    )""",
+    """CREATE TABLE IF NOT EXISTS TEAMS (
+        TEAM_ID                     VARCHAR(25)     NOT NULL,
+        LEAGUE                      VARCHAR(5)      NOT NULL,
+        NAME                        VARCHAR(50)     NOT NULL,
+        MASCOT                      VARCHAR(50)     NOT NULL,
+        PRIMARY_COLOR               VARCHAR(25)     NULL,
+        SECONDARY_COLOR             VARCHAR(25)     NULL,
+        ACCENT_COLOR                VARCHAR(25)     NULL,
+        LOGO_URL                    VARCHAR(75)     NULL,
+        CONFERENCE_NAME             VARCHAR(50)     NULL,
+        CONFERENCE_WINS             INTEGER         NULL,
+        CONFERENCE_LOSSES           INTEGER         NULL,
+        CONFERENCE_TIES             INTEGER         NULL,
+        OVERALL_WINS                INTEGER         NULL,
+        OVERALL_LOSSES              INTEGER         NULL,
+        OVERALL_TIES                INTEGER         NULL,
+        PRIMARY KEY (TEAM_ID, LEAGUE)
+    )""",
+    """CREATE TABLE IF NOT EXISTS LOCATIONS (
+        LEAGUE                      VARCHAR(5)      NOT NULL,
+        LOCATION_ID                 INTEGER         NOT NULL,
+        STADIUM                     VARCHAR(100)    NOT NULL,
+        STADIUM_CAPACITY            INTEGER         NULL,
+        CITY                        VARCHAR(50)     NULL,
+        STATE                       VARCHAR(50)     NULL,
+        LATITUDE                    VARCHAR(25)     NULL,
+        LONGITUDE                   VARCHAR(25)     NULL,
+        PRIMARY KEY (LEAGUE, LOCATION_ID)
+    )""",
+    """CREATE TABLE IF NOT EXISTS USERS (
+        USER_ID                     INTEGER         PRIMARY KEY AUTOINCREMENT,
+        USERNAME                    VARCHAR(50)     NOT NULL,
+        PW                          VARCHAR(64)     NOT NULL,
+        EMAIL_ADDRESS               VARCHAR(100)    NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS PICKS (
+        USER_ID                     INTEGER         NOT NULL    REFERENCES USERS(USER_ID),
+        GAME_ID                     INTEGER         NOT NULL,
+        LEAGUE                      VARCHAR(5)      NOT NULL,
+        TEAM_ID                     VARCHAR(25)     NULL,
+        PRIMARY KEY (USER_ID, GAME_ID, LEAGUE)
+    )""",
+    'CREATE INDEX IF NOT EXISTS IX_PICKS_LEAGUE_USER_GAME ON PICKS (LEAGUE, USER_ID, GAME_ID)',
+    'CREATE INDEX IF NOT EXISTS IX_GAMES_LEAGUE_DATE ON GAMES (LEAGUE, GAME_YEAR, GAME_MONTH, GAME_DAY)',
+    'CREATE INDEX IF NOT EXISTS IX_USERS_USERNAME ON USERS (USERNAME)',
+    """CREATE TABLE IF NOT EXISTS SCHEDULE (
+        GAME_ID                     INTEGER         NOT NULL,
+        LEAGUE                      VARCHAR(5)      NOT NULL,
+        AWAY_TEAM                   VARCHAR(25)     NULL,
+        AWAY_TEAM_NAME              VARCHAR(50)     NULL,
+        AWAY_TEAM_MASCOT            VARCHAR(50)     NULL,
+        AWAY_LOGO_URL               VARCHAR(75)     NULL,
+        AWAY_CONFERENCE             VARCHAR(50)     NULL,
+        AWAY_CONFERENCE_WINS        INTEGER         NULL,
+        AWAY_CONFERENCE_LOSSES      INTEGER         NULL,
+        AWAY_CONFERENCE_TIES        INTEGER         NULL,
+        AWAY_OVERALL_WINS           INTEGER         NULL,
+        AWAY_OVERALL_LOSSES         INTEGER         NULL,
+        AWAY_OVERALL_TIES           INTEGER         NULL,
+        HOME_TEAM                   VARCHAR(25)     NULL,
+        HOME_TEAM_NAME              VARCHAR(50)     NULL,
+        HOME_TEAM_MASCOT            VARCHAR(50)     NULL,
+        HOME_LOGO_URL               VARCHAR(75)     NULL,
+        HOME_CONFERENCE             VARCHAR(50)     NULL,
+        HOME_CONFERENCE_WINS        INTEGER         NULL,
+        HOME_CONFERENCE_LOSSES      INTEGER         NULL,
+        HOME_CONFERENCE_TIES        INTEGER         NULL,
+        HOME_OVERALL_WINS           INTEGER         NULL,
+        HOME_OVERALL_LOSSES         INTEGER         NULL,
+        HOME_OVERALL_TIES           INTEGER         NULL,
+        LOCATION                    INTEGER         NULL,
+        STADIUM                     VARCHAR(100)    NULL,
+        STADIUM_CAPACITY            INTEGER         NULL,
+        CITY                        VARCHAR(50)     NULL,
+        STATE                       VARCHAR(50)     NULL,
+        LATITUDE                    VARCHAR(25)     NULL,
+        LONGITUDE                   VARCHAR(25)     NULL,
+        TV_COVERAGE                 VARCHAR(25)     NULL,
+        BETTING_LINE                VARCHAR(25)     NULL,
+        BETTING_LINE_OVER_UNDER     VARCHAR(25)     NULL,
+        ATTENDANCE                  INTEGER         NULL,
+        AWAY_WIN_PCT                VARCHAR(25)     NULL,
+        HOME_WIN_PCT                VARCHAR(25)     NULL,
+        AWAY_QUARTER1               VARCHAR(25)     NULL,
+        AWAY_QUARTER2               VARCHAR(25)     NULL,
+        AWAY_QUARTER3               VARCHAR(25)     NULL,
+        AWAY_QUARTER4               VARCHAR(25)     NULL,
+        AWAY_OVERTIME               VARCHAR(25)     NULL,
+        AWAY_TOTAL                  VARCHAR(25)     NULL,
+        HOME_QUARTER1               VARCHAR(25)     NULL,
+        HOME_QUARTER2               VARCHAR(25)     NULL,
+        HOME_QUARTER3               VARCHAR(25)     NULL,
+        HOME_QUARTER4               VARCHAR(25)     NULL,
+        HOME_OVERTIME               VARCHAR(25)     NULL,
+        HOME_TOTAL                  VARCHAR(25)     NULL,
+        GAME_TIME                   VARCHAR(25)     NULL,
+        GAME_DATE                   VARCHAR(25)     NULL,
+        GAME_MONTH                  INTEGER         NULL,
+        GAME_DAY                    INTEGER         NULL,
+        GAME_YEAR                   INTEGER         NULL,
+        REFRESHED_AT                DATETIME        NOT NULL,
+        PRIMARY KEY (LEAGUE, GAME_ID)
+    )""",
+    'CREATE INDEX IF NOT EXISTS IX_SCHEDULE_LEAGUE_DATE ON SCHEDULE (LEAGUE, GAME_YEAR, GAME_MONTH, GAME_DAY)',
+    """CREATE TABLE IF NOT EXISTS PICK_RESULTS (
+        LEAGUE                      VARCHAR(5)      NOT NULL,
+        GAME_ID                     INTEGER         NOT NULL,
+        USER_ID                     INTEGER         NOT NULL,
+        SEASON                      INTEGER         NOT NULL,
+        WEEK                        INTEGER         NOT NULL,
+        GAME_DATE                   DATE            NOT NULL,
+        TEAM_PICKED                 VARCHAR(25)     NULL,
+        WINNER                      VARCHAR(25)     NULL,
+        CORRECT                     INTEGER         NOT NULL,
+        POINTS                      INTEGER         NOT NULL,
+        PRIMARY KEY (LEAGUE, GAME_ID, USER_ID)
+    )""",
+    """CREATE TABLE IF NOT EXISTS LEADERBOARD (
+        LEAGUE                      VARCHAR(5)      NOT NULL,
+        SEASON                      INTEGER         NOT NULL,
+        WEEK                        INTEGER         NOT NULL,
+        USER_ID                     INTEGER         NOT NULL,
+        POINTS                      INTEGER         NOT NULL,
+        CORRECT_PICKS               INTEGER         NOT NULL,
+        SCORED_PICKS                INTEGER         NOT NULL,
+        LEADERBOARD_RANK            INTEGER         NOT NULL,
+        CURRENT_STREAK              INTEGER         NULL,
+        LONGEST_STREAK              INTEGER         NULL,
+        PRIMARY KEY (LEAGUE, SEASON, WEEK, USER_ID)
+    )""",
+    'DROP VIEW IF EXISTS CFB_GET_ALL_DATA_VW',
+    """CREATE VIEW CFB_GET_ALL_DATA_VW AS
+    SELECT
+        P.USER_ID, U.USERNAME, P.GAME_ID, P.TEAM_ID AS TEAM_PICKED,
+        S.AWAY_TEAM, S.AWAY_TEAM_NAME, S.AWAY_TEAM_MASCOT, S.AWAY_LOGO_URL, S.AWAY_CONFERENCE, S.AWAY_CONFERENCE_WINS, S.AWAY_CONFERENCE_LOSSES,
+        S.AWAY_CONFERENCE_TIES, S.AWAY_OVERALL_WINS, S.AWAY_OVERALL_LOSSES, S.AWAY_OVERALL_TIES,
+        S.HOME_TEAM, S.HOME_TEAM_NAME, S.HOME_TEAM_MASCOT, S.HOME_LOGO_URL, S.HOME_CONFERENCE, S.HOME_CONFERENCE_WINS, S.HOME_CONFERENCE_LOSSES,
+        S.HOME_CONFERENCE_TIES, S.HOME_OVERALL_WINS, S.HOME_OVERALL_LOSSES, S.HOME_OVERALL_TIES,
+        S.STADIUM, S.STADIUM_CAPACITY, S.CITY, S.STATE, S.TV_COVERAGE, S.BETTING_LINE, S.BETTING_LINE_OVER_UNDER,
+        S.ATTENDANCE, S.AWAY_WIN_PCT, S.HOME_WIN_PCT,
+        S.AWAY_QUARTER1, S.AWAY_QUARTER2, S.AWAY_QUARTER3, S.AWAY_QUARTER4, S.AWAY_OVERTIME, S.AWAY_TOTAL,
+        S.HOME_QUARTER1, S.HOME_QUARTER2, S.HOME_QUARTER3, S.HOME_QUARTER4, S.HOME_OVERTIME, S.HOME_TOTAL,
+        S.GAME_TIME, S.GAME_DATE, S.GAME_MONTH, S.GAME_DAY, S.GAME_YEAR, S.REFRESHED_AT
+    FROM PICKS AS P
+        INNER JOIN USERS AS U ON P.USER_ID = U.USER_ID
+        LEFT JOIN SCHEDULE AS S ON P.LEAGUE = S.LEAGUE AND P.GAME_ID = S.GAME_ID
+    WHERE P.LEAGUE = 'CFB'"""
+]
+
+def create_schema(conn: object):
+    """Function to create the pickem tables in a SQLite Database if they do not exist yet
+       Accepts: `conn`: SQLite Connection Object
+       Returns: n/a"""
+    for schema_statement in schema_statements:
+        conn.execute(schema_statement)
+    conn.commit()
+
+def instantiate_connection():
+    """Function to open a connection to the SQLite Database at `sqlite_path` in WAL mode, so that readers are never blocked by a load,
+       creating the schema on first use. Every thread opens its own connection
+       Accepts: n/a
+       Returns: `conn`: SQLite Connection Object"""
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(os.path.abspath(sqlite_path)), exist_ok=True)
+    conn = sqlite3.connect(sqlite_path, timeout=busy_timeout)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    with schema_lock:
+        if sqlite_path not in schema_paths:
+            create_schema(conn)
+            schema_paths.add(sqlite_path)
+    record_metric('connect', time.perf_counter() - start)
+    return conn
+
+def execute_statement(cursor: object, statement: str, params=None):
+    """Function to execute a single statement, recording its timing
+       Accepts: `cursor`: SQLite Cursor Object, `statement`: String, `params`: Tuple
+       Returns: n/a"""
+    start = time.perf_counter()
+    cursor.execute(statement, params or ())
+    record_metric('statement', time.perf_counter() - start)
+
+def commit(conn: object):
+    """Function to commit the open transaction of a connection, recording its timing
+       Accepts: `conn`: SQLite Connection Object
+       Returns: n/a"""
+    start = time.perf_counter()
+    conn.commit()
+    record_metric('commit', time.perf_counter() - start)
+
+
+def get_upsert_statement(table_name: str):
+    """Function to build the parameterized `INSERT ... ON CONFLICT DO UPDATE` statement of a given table
+       Accepts: `table_name`: String
+       Returns: `upsert_stmt`: String"""
+    table_name = table_name.lower()
+    db_columns = [db_column for db_column, _ in table_columns[table_name]]
+    key_columns = table_primary_keys[table_name]
+    update_columns = [db_column for db_column in db_columns if db_column not in key_columns]
+    upsert_stmt = (f"INSERT INTO {table_name.upper()} ({', '.join(db_columns)}) VALUES ({', '.join(['?'] * len(db_columns))}) "
+                   f"ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {', '.join(f'{db_column} = excluded.{db_column}' for db_column in update_columns)}")
+    return upsert_stmt
+
+def get_sqlite_record_values(table_name: str, df: dict):
+    """Function to adapt the rows of a DataFrame to the bound parameters of a table's upsert statement. SQLite keeps only 15 significant digits
+       of a REAL bound to a text column, so floats are bound as their full text to keep them equal to their fingerprints
+       Accepts: `table_name`: String, `df`: Pandas DataFrame
+       Returns: `record_values`: List of Tuples"""
+    return [tuple(str(value) if isinstance(value, float) else value for value in record) for record in get_record_values(table_name, df)]
+
+def write_batches(conn: object, statement: str, record_values: list, table_name: str, logfile: object, batch_size=batch_size, commit_batches=True):
+    """Function to execute a statement for every parameter tuple in batches, committing each batch when `commit_batches` is set.
+       SQLite prepares the statement once per batch and re-binds it for every row
+       Accepts: `conn`: SQLite Connection Object, `statement`: String, `record_values`: List of Tuples, `table_name`: String, `logfile`: File Object, `batch_size`: Number, `commit_batches`: Boolean
+       Returns: `written_records`: Number"""
+    written_records = 0
+    cursor = conn.cursor()
+    try:
+        for batch_start in range(0, len(record_values), batch_size):
+            batch = record_values[batch_start:batch_start + batch_size]
+            try:
+                statement_start = time.perf_counter()
+                cursor.executemany(statement, batch)
+                record_metric('statement', time.perf_counter() - statement_start)
+                if commit_batches:
+                    commit(conn)
+                written_records += len(batch)
+            except Exception as e:
+                if not commit_batches:
+                    raise
+                conn.rollback()
+                print(f'Error occurred writing {table_name} records {batch_start} to {batch_start + len(batch) - 1}:\n{e}')
+                logfile.write(f'Error occurred writing {table_name} records {batch_start} to {batch_start + len(batch) - 1}:\n{e}\n\n')
+    finally:
+        cursor.close()
+    return written_records
+
+def upsert_records(table_name: str, df: dict, logfile: object, batch_size=batch_size, conn=None):
+    """Function to insert or update every row of a DataFrame in the given table in batches, committing each batch.
+       Rows missing a primary key or NOT NULL column value are skipped and logged, since one of them would fail its whole batch
+       Accepts: `table_name`: String, `df`: Pandas DataFrame, `logfile`: File Object, `batch_size`: Number, `conn`: SQLite Connection Object
+       Returns: `upserted_records`: Number"""
+    df, rejected_keys = get_loadable_records(table_name, df)
+    if len(rejected_keys) > 0:
+        print(f'~~~~ Skipping {len(rejected_keys)} {table_name} records missing NOT NULL values: {rejected_keys}')
+        logfile.write(f'~~~~ Skipping {len(rejected_keys)} {table_name} records missing NOT NULL values: {rejected_keys}\n')
+    record_values = get_sqlite_record_values(table_name, df)
+    start = time.perf_counter()
+
+    own_connection = conn is None
+    if own_connection:
+        conn = instantiate_connection()
+    try:
+        upserted_records = write_batches(conn, get_upsert_statement(table_name), record_values, table_name, logfile, batch_size)
+    finally:
+        if own_connection:
+            conn.close()
+
+    elapsed = time.perf_counter() - start
+    rows_per_second = round(upserted_records / elapsed) if elapsed > 0 else upserted_records
+    print(f'~~~~ Upserted {upserted_records} of {len(record_values)} {table_name} records in {elapsed:.2f}s ({rows_per_second} rows/sec)')
+    logfile.write(f'~~~~ Upserted {upserted_records} of {len(record_values)} {table_name} records in {elapsed:.2f}s ({rows_per_second} rows/sec)\n')
+    return upserted_records
+
+def fetch_fingerprints(table_name: str, league: str, conn=None):
+    """Function to fetch the primary key and fingerprint of every row a league has in the given table, in one query.
+       SQLite has no MD5, so the rows are fingerprinted in Python exactly like the DataFrame rows
+       Accepts: `table_name`: String, `league`: String, `conn`: SQLite Connection Object
+       Returns: `fingerprints`: Pandas Series of fingerprints indexed by primary key"""
+    return get_frame_fingerprints(table_name, fetch_records(table_name, league, conn=conn))
+
+def fetch_records(table_name: str, league: str, game_ids=None, conn=None):
+    """Function to read a league's rows of the given table, optionally only those of the given Game IDs (read `batch_size` IDs per query)
+       Accepts: `table_name`: String, `league`: String, `game_ids`: List, `conn`: SQLite Connection Object
+       Returns: `df`: Pandas DataFrame with the DataFrame column names of `table_columns`"""
+    table_name = table_name.lower()
+    db_columns = [db_column for db_column, _ in table_columns[table_name]]
+    df_columns = [df_column for _, df_column in table_columns[table_name]]
+    select_stmt = f"SELECT {', '.join(db_columns)} FROM {table_name.upper()} WHERE LEAGUE = ?"
+    if game_ids is None:
+        statements = [(select_stmt, (league.upper(),))]
+    else:
+        game_ids = [str(to_db_value(game_id)) for game_id in game_ids]
+        statements = [(f"{select_stmt} AND GAME_ID IN ({', '.join(['?'] * len(game_ids[batch_start:batch_start + batch_size]))})",
+                       (league.upper(), *game_ids[batch_start:batch_start + batch_size])) for batch_start in range(0, len(game_ids), batch_size)]
+
+    rows = []
+    own_connection = conn is None
+    if own_connection:
+        conn = instantiate_connection()
+    cursor = conn.cursor()
+    try:
+        for statement, params in statements:
+            execute_statement(cursor, statement, params)
+            rows.extend(cursor.fetchall())
+    finally:
+        cursor.close()
+        if own_connection:
+            conn.close()
+    return pd.DataFrame(rows, columns=df_columns, dtype=object)
+
+def delete_records(table_name: str, keys: list, logfile: object, batch_size=batch_size, conn=None):
+    """Function to delete the rows with the given primary keys from the given table in batches, committing each batch
+       Accepts: `table_name`: String, `keys`: List of primary key Tuples, `logfile`: File Object, `batch_size`: Number, `conn`: SQLite Connection Object
+       Returns: `deleted_records`: Number"""
+    key_columns = table_primary_keys[table_name.lower()]
+    delete_stmt = f"DELETE FROM {table_name.upper()} WHERE {' AND '.join(f'{key_column} = ?' for key_column in key_columns)}"
+
+    own_connection = conn is None
+    if own_connection:
+        conn = instantiate_connection()
+    try:
+        deleted_records = write_batches(conn, delete_stmt, [tuple(key) for key in keys], table_name, logfile, batch_size)
+    finally:
+        if own_connection:
+            conn.close()
+    return deleted_records
+
+def delete_game_records(table_name: str, league: str, game_ids: list, logfile: object, batch_size=batch_size, conn=None):
+    """Function to delete every row a league's given games have in the given table (e.g. the PICKS of pruned games) in batches, committing each batch
+       Accepts: `table_name`: String, `league`: String, `game_ids`: List, `logfile`: File Object, `batch_size`: Number, `conn`: SQLite Connection Object
+       Returns: `deleted_records`: Number"""
+    delete_stmt = f"DELETE FROM {table_name.upper()} WHERE LEAGUE = ? AND GAME_ID = ?"
+    record_values = [(league.upper(), str(to_db_value(game_id))) for game_id in game_ids]
+
+    own_connection = conn is None
+    if own_connection:
+        conn = instantiate_connection()
+    try:
+        changes_before = conn.total_changes
+        write_batches(conn, delete_stmt, record_values, table_name, logfile, batch_size)
+        deleted_records = conn.total_changes - changes_before
+    finally:
+        if own_connection:
+            conn.close()
+    return deleted_records
+
+def load_csv_file(table_name: str, csv_path: str, logfile: object, conn=None):
+    """Function to bulk load a CSV output into the given table. SQLite has no LOAD DATA, so the file is parsed with pandas and upserted in batches
+       Accepts: `table_name`: String, `csv_path`: String, `logfile`: File Object, `conn`: SQLite Connection Object
+       Returns: `staged_records`: Number of CSV rows loaded"""
+    start = time.perf_counter()
+    df = pd.read_csv(csv_path)
+    staged_records = upsert_records(table_name, df, logfile, batch_size, conn)
+    elapsed = time.perf_counter() - start
+    print(f'~~~~ Bulk loaded {staged_records} {table_name} records from {csv_path} into {table_name.upper()} in {elapsed:.2f}s')
+    logfile.write(f'~~~~ Bulk loaded {staged_records} {table_name} records from {csv_path} into {table_name.upper()} in {elapsed:.2f}s\n')
+    return staged_records
+
+def swap_load_csv_files(league: str, csv_paths: dict, expected_counts: dict, logfile: object):
+    """Function to fully reload a league's tables from its CSV outputs without readers ever seeing a partial load. SQLite has no RENAME swap
+       across tables, so the league's rows are replaced and the row counts validated inside one write transaction: in WAL mode readers keep
+       seeing the previous rows until it commits, and a failed validation rolls everything back
+       Accepts: `league`: String, `csv_paths`: Dictionary of CSV paths keyed by table name, `expected_counts`: Dictionary of league row counts keyed by table name, `logfile`: File Object
+       Returns: n/a"""
+    league = league.upper()
+    conn = instantiate_connection()
+    cursor = conn.cursor()
+    try:
+        with swap_lock:
+            execute_statement(cursor, 'BEGIN IMMEDIATE')
+            for table_name, csv_path in csv_paths.items():
+                execute_statement(cursor, f'DELETE FROM {table_name.upper()} WHERE LEAGUE = ?', (league,))
+                df = pd.read_csv(csv_path)
+                df = df[df['league'].str.upper() == league]
+                write_batches(conn, get_upsert_statement(table_name), get_sqlite_record_values(table_name, df), table_name, logfile, commit_batches=False)
+
+                execute_statement(cursor, f'SELECT COUNT(*) FROM {table_name.upper()} WHERE LEAGUE = ?', (league,))
+                league_records = cursor.fetchone()[0]
+                if league_records != expected_counts[table_name]:
+                    raise ValueError(f'{table_name.upper()} holds {league_records} {league} rows, expected {expected_counts[table_name]}')
+                print(f'~~~~ Validated {table_name.upper()}: {league_records} {league} rows')
+                logfile.write(f'~~~~ Validated {table_name.upper()}: {league_records} {league} rows\n')
+            commit(conn)
+        print(f'~~~~ Swapped in reloaded {league} tables {[table_name.upper() for table_name in csv_paths]}')
+        logfile.write(f'~~~~ Swapped in reloaded {league} tables {[table_name.upper() for table_name in csv_paths]}\n')
+    except Exception as e:
+        conn.rollback()
+        print(f'Error occurred reloading {league} tables, live tables left unchanged:\n{e}')
+        logfile.write(f'Error occurred reloading {league} tables, live tables left unchanged:\n{e}\n\n')
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+def refresh_schedule(league: str, changed_keys: dict, logfile: object, conn=None):
+    """Function to refresh a league's rows of the materialized SCHEDULE table from GAMES, TEAMS and LOCATIONS in one transaction:
+       the games touched by `changed_keys` (every game when None) are re-joined and upserted with a new REFRESHED_AT,
+       and schedule rows whose game is gone are deleted
+       Accepts: `league`: String, `changed_keys`: Dictionary of primary key Tuple Lists keyed by table name, or None, `logfile`: File Object, `conn`: SQLite Connection Object
+       Returns: `removed_records`: Number of deleted schedule rows"""
+    league = league.upper()
+    select_stmt, params, refreshed_keys = get_schedule_refresh_select(league, changed_keys, '?')
+    update_columns = [schedule_column for schedule_column, _ in schedule_columns if schedule_column not in schedule_primary_keys]
+    refresh_stmt = (f"INSERT INTO SCHEDULE ({', '.join(schedule_column for schedule_column, _ in schedule_columns)}) {select_stmt} "
+                    f"ON CONFLICT ({', '.join(schedule_primary_keys)}) DO UPDATE SET {', '.join(f'{schedule_column} = excluded.{schedule_column}' for schedule_column in update_columns)}")
+    remove_stmt = ("DELETE FROM SCHEDULE WHERE LEAGUE = ? AND NOT EXISTS "
+                   "(SELECT 1 FROM GAMES AS G WHERE G.GAME_ID = SCHEDULE.GAME_ID AND G.LEAGUE = SCHEDULE.LEAGUE)")
+
+    own_connection = conn is None
+    if own_connection:
+        conn = instantiate_connection()
+    cursor = conn.cursor()
+    try:
+        execute_statement(cursor, refresh_stmt, tuple(params))
+        execute_statement(cursor, remove_stmt, (league,))
+        removed_records = cursor.rowcount
+        commit(conn)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        if own_connection:
+            conn.close()
+
+    print(f"~~~~ Refreshed {league} SCHEDULE rows of {'every game' if refreshed_keys is None else refreshed_keys}, removed {removed_records}")
+    logfile.write(f"~~~~ Refreshed {league} SCHEDULE rows of {'every game' if refreshed_keys is None else refreshed_keys}, removed {removed_records}\n")
+    return removed_records
+
+def fetch_schedule(league: str, conn=None):
+    """Function to read a league's materialized schedule, one indexed single-table read, in game date order
+       Accepts: `league`: String, `conn`: SQLite Connection Object
+       Returns: `schedule_df`: Pandas DataFrame with one column per SCHEDULE column, including REFRESHED_AT"""
+    schedule_column_names = [schedule_column for schedule_column, _ in schedule_columns]
+    own_connection = conn is None
+    if own_connection:
+        conn = instantiate_connection()
+    cursor = conn.cursor()
+    try:
+        execute_statement(cursor, f"SELECT {', '.join(schedule_column_names)} FROM SCHEDULE WHERE LEAGUE = ? ORDER BY GAME_YEAR, GAME_MONTH, GAME_DAY, GAME_ID", (league.upper(),))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+        if own_connection:
+            conn.close()
+    return pd.DataFrame(rows, columns=schedule_column_names)
+
+def fetch_schedule_refreshed_at(league: str, conn=None):
+    """Function to read when a league's materialized schedule was last refreshed
+       Accepts: `league`: String, `conn`: SQLite Connection Object
+       Returns: `refreshed_at`: String UTC timestamp, None if the league has no schedule rows"""
+    own_connection = conn is None
+    if own_connection:
+        conn = instantiate_connection()
+    cursor = conn.cursor()
+    try:
+        execute_statement(cursor, 'SELECT MAX(REFRESHED_AT) FROM SCHEDULE WHERE LEAGUE = ?', (league.upper(),))
+        refreshed_at = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+        if own_connection:
+            conn.close()
+    return refreshed_at
+
+def provision_picks(league: str, logfile: object, game_keys=None, user_id=None, conn=None):
+    """Function to add the missing (user, game, league) pick slots of a league with one anti-join INSERT, for the games of `game_keys`
+       (every game when None) and every user, or only `user_id`
+       Accepts: `league`: String, `logfile`: File Object, `game_keys`: List of GAMES primary key Tuples, `user_id`: Number, `conn`: SQLite Connection Object
+       Returns: `provisioned_picks`: Number of inserted pick slots"""
+    provision_stmt, params = get_provision_picks_insert(league, game_keys, user_id, '?')
+    if provision_stmt is None:
+        return 0
+
+    own_connection = conn is None
+    if own_connection:
+        conn = instantiate_connection()
+    cursor = conn.cursor()
+    try:
+        execute_statement(cursor, provision_stmt, tuple(params))
+        provisioned_picks = cursor.rowcount
+        commit(conn)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        if own_connection:
+            conn.close()
+
+    print(f'~~~~ Provisioned {provisioned_picks} missing {league.upper()} pick slots')
+    logfile.write(f'~~~~ Provisioned {provisioned_picks} missing {league.upper()} pick slots\n')
+    return provisioned_picks
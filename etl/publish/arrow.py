@@ -0,0 +1,17 @@
+"""
+Pickem ETL
+Author: Gabe Baduqui
+
+Optional pyarrow imports shared by the columnar outputs and the all_schedule snapshot. Without pyarrow every name is None and
+those outputs are skipped, so only CSV and JSON are written.
+"""
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+except ImportError:
+    pa = pc = feather = None
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
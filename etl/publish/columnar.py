@@ -0,0 +1,159 @@
+"""
+Pickem ETL
+Author: Gabe Baduqui
+
+Write the games, teams, locations and all_schedule outputs as typed, compressed Parquet files partitioned by league and season
+(Arrow IPC files where the Parquet writer is unavailable), and read them back.
+"""
+import glob, os, shutil
+import pandas as pd
+import etl.publish.schedule as schedule
+import etl.utils.get_week as wk
+from etl.load.common.db_tables import table_columns, whole_number_columns, to_db_value
+from etl.publish.arrow import pa, feather, pq
+
+columnar_dir = './pickem_data/columnar'
+compression = 'zstd'
+
+# Team ID columns are VARCHAR, abbreviations like 'kc' for NFL, MLB and NBA teams. `whole_number_columns` lists them so the numeric
+# CFB IDs read back from CSV as 52.0 are normalized, but the columnar schema keeps them as text
+team_id_columns = {'TEAM_ID', 'AWAY_TEAM', 'HOME_TEAM', 'TEAM_PICKED', 'WINNER'}
+integer_columns = whole_number_columns - team_id_columns
+
+# Database columns holding fractional numbers; every other column not in `integer_columns` is text
+decimal_columns = {'BETTING_LINE', 'BETTING_LINE_OVER_UNDER', 'AWAY_WIN_PCT', 'HOME_WIN_PCT', 'LATITUDE', 'LONGITUDE'}
+
+# Partition directory of rows without a complete game date, and of tables without game dates
+unknown_season = 'none'
+
+def get_columnar_format():
+    """Function that returns the columnar file format available to this install
+       Accepts: n/a
+       Returns `columnar_format`: String 'parquet' or 'arrow', None without pyarrow"""
+    if pa is None:
+        return None
+    return 'parquet' if pq is not None else 'arrow'
+
+def get_column_types():
+    """Function that returns the Arrow type of every known output column, following the database column types.
+       The team columns of all_schedule take the types of the team columns they were denormalized from
+       Accepts: n/a
+       Returns `column_types`: Dictionary of Arrow types keyed by DataFrame column"""
+    column_types = {}
+    for columns in table_columns.values():
+        for db_column, df_column in columns:
+            if db_column in integer_columns:
+                column_types[df_column] = pa.int64()
+            elif db_column in decimal_columns:
+                column_types[df_column] = pa.float64()
+            else:
+                column_types.setdefault(df_column, pa.string())
+    for team_column, schedule_column in {**schedule.away_team_columns, **schedule.home_team_columns}.items():
+        column_types[schedule_column] = column_types[team_column]
+    return column_types
+
+def get_typed_table(df: dict, column_types: dict):
+    """Function that converts a DataFrame to an Arrow table of the typed schema, so whole numbers written as 52.0 or '52' become
+       integers and text columns never hold numbers. Unknown columns are stored as text
+       Accepts `df`: Pandas DataFrame, `column_types`: Dictionary from `get_column_types`
+       Returns `table`: Arrow Table"""
+    arrays = {}
+    for column in df.columns:
+        column_type = column_types.get(column, pa.string())
+        if pa.types.is_integer(column_type):
+            values = pd.to_numeric(df[column], errors='coerce')
+            arrays[column] = pa.array(values.round().astype('Int64'), type=column_type, from_pandas=True)
+        elif pa.types.is_floating(column_type):
+            arrays[column] = pa.array(pd.to_numeric(df[column], errors='coerce'), type=column_type, from_pandas=True)
+        else:
+            values = [to_db_value(value) for value in df[column]]
+            arrays[column] = pa.array([None if value is None else str(value) for value in values], type=column_type)
+    return pa.table(arrays)
+
+def get_partition_seasons(df: dict):
+    """Function that returns the season partition of every row, `unknown_season` for rows without a complete game date
+       Accepts `df`: Pandas DataFrame
+       Returns `seasons`: Pandas Series of Strings"""
+    if not {'game_year', 'game_month', 'game_day'}.issubset(df.columns):
+        return pd.Series(unknown_season, index=df.index)
+    seasons = wk.get_seasons(df['league'], wk.get_game_dates(df))
+    return seasons.astype(str).where(seasons.notna(), unknown_season)
+
+def write_partition(table: object, partition_path: str, columnar_format: str):
+    """Function that writes one partition of an output in the given columnar format
+       Accepts `table`: Arrow Table, `partition_path`: String path without extension, `columnar_format`: String
+       Returns: n/a"""
+    os.makedirs(os.path.dirname(partition_path), exist_ok=True)
+    if columnar_format == 'parquet':
+        pq.write_table(table, f'{partition_path}.parquet', compression=compression)
+    else:
+        feather.write_feather(table, f'{partition_path}.arrow', compression=compression)
+
+def replace_directory(staged_dir: str, target_dir: str):
+    """Function that moves a fully written staging directory into place, so readers see either the old or the new partitions of a league
+       Accepts `staged_dir`: String, `target_dir`: String
+       Returns: n/a"""
+    replaced_dir = f'{target_dir}.replaced'
+    shutil.rmtree(replaced_dir, ignore_errors=True)
+    if os.path.exists(target_dir):
+        os.rename(target_dir, replaced_dir)
+    os.rename(staged_dir, target_dir)
+    shutil.rmtree(replaced_dir, ignore_errors=True)
+
+def write_columnar(df: dict, table_name: str, logfile=None, data_dir=columnar_dir):
+    """Function that writes an output as one compressed columnar file per league and season under `{data_dir}/{table_name}/league=X/season=Y`,
+       replacing every partition of the leagues in the DataFrame. Skipped when pyarrow is not installed
+       Accepts `df`: Pandas DataFrame, `table_name`: String, `logfile`: File Object, `data_dir`: String
+       Returns `partitions`: Number of written partitions, None if skipped"""
+    columnar_format = get_columnar_format()
+    if columnar_format is None:
+        print(f'~~~~ Skipping columnar {table_name} output, pyarrow is not installed ~~')
+        if logfile is not None:
+            logfile.write(f'~~~~ Skipping columnar {table_name} output, pyarrow is not installed ~~\n')
+        return None
+    print(f'~~~~ Writing {table_name} DataFrame to {columnar_format.capitalize()} Files ~~')
+    if logfile is not None:
+        logfile.write(f'~~~~ Writing {table_name} DataFrame to {columnar_format.capitalize()} Files ~~\n')
+
+    df = df.reset_index(drop=True)
+    table = get_typed_table(df, get_column_types())
+    leagues = df['league'].astype(str).str.upper()
+    seasons = get_partition_seasons(df)
+    partitions = 0
+    for league in leagues.unique():
+        league_dir = f'{data_dir}/{table_name}/league={league}'
+        staged_dir = f'{league_dir}.staged'
+        shutil.rmtree(staged_dir, ignore_errors=True)
+        league_rows = leagues == league
+        for season in seasons[league_rows].unique():
+            partition_rows = (league_rows & (seasons == season)).to_numpy().nonzero()[0]
+            write_partition(table.take(partition_rows), f'{staged_dir}/season={season}/part-0', columnar_format)
+            partitions += 1
+        replace_directory(staged_dir, league_dir)
+    return partitions
+
+def read_columnar(table_name: str, leagues=None, seasons=None, columns=None, data_dir=columnar_dir):
+    """Function that reads a columnar output back with its typed schema, pruning partitions by league and season before reading
+       and only reading the requested columns
+       Accepts `table_name`: String, `leagues`: List, `seasons`: List, `columns`: List, `data_dir`: String
+       Returns `df`: Pandas DataFrame with nullable integer and string columns, None if no partition matches"""
+    if pa is None:
+        return None
+    leagues = None if leagues is None else {str(league).upper() for league in leagues}
+    seasons = None if seasons is None else {str(season) for season in seasons}
+
+    tables = []
+    for partition_path in sorted(glob.glob(f'{data_dir}/{table_name}/league=*/season=*/part-*')):
+        league = os.path.basename(os.path.dirname(os.path.dirname(partition_path))).split('=', 1)[1]
+        season = os.path.basename(os.path.dirname(partition_path)).split('=', 1)[1]
+        if (leagues is not None and league not in leagues) or (seasons is not None and season not in seasons):
+            continue
+        if partition_path.endswith('.parquet') and pq is not None:
+            tables.append(pq.read_table(partition_path, columns=columns))
+        elif partition_path.endswith('.arrow'):
+            tables.append(feather.read_table(partition_path, columns=columns, memory_map=True))
+    if len(tables) == 0:
+        return None
+
+    table = pa.concat_tables(tables, promote_options='default')
+    return table.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype(), pa.string(): pd.StringDtype()}.get)
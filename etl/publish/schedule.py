@@ -0,0 +1,174 @@
+"""
+Pickem ETL
+Author: Gabe Baduqui
+
+Denormalize games, teams and locations of all leagues into the published `all_schedule` data set, rebuilding only the rows that changed.
+"""
+import os, pickle
+import pandas as pd
+import etl.publish.columnar as columnar
+import etl.publish.snapshot as snapshot
+import etl.publish.shards as shards
+from etl.utils.write_outputs import write_outputs
+
+schedule_state_file = 'all_schedule_state.pkl'
+
+game_keys = ['league', 'game_id']
+team_keys = ['league', 'team_id']
+location_keys = ['league', 'location_id']
+
+away_team_columns = {'name': 'away_team_name', 'mascot': 'away_team_mascot', 'logo_url': 'away_team_logo', 'conference_name': 'away_team_conference',
+                     'conference_wins': 'away_team_conference_wins', 'conference_losses': 'away_team_conference_losses', 'conference_ties': 'away_team_conference_ties',
+                     'overall_wins': 'away_team_overall_wins', 'overall_losses': 'away_team_overall_losses', 'overall_ties': 'away_team_overall_ties'}
+home_team_columns = {'name': 'home_team_name', 'mascot': 'home_team_mascot', 'logo_url': 'home_team_logo', 'conference_name': 'home_team_conference',
+                     'conference_wins': 'home_team_conference_wins', 'conference_losses': 'home_team_conference_losses', 'conference_ties': 'home_team_conference_ties',
+                     'overall_wins': 'home_team_overall_wins', 'overall_losses': 'home_team_overall_losses', 'overall_ties': 'home_team_overall_ties'}
+
+def normalize_key_column(key_column: object):
+    """Function that converts a key column to strings so that e.g. 52, 52.0 and '52' all address the same row
+       Accepts `key_column`: Pandas Series
+       Returns `normalized_keys`: Pandas Series"""
+    numeric_keys = pd.to_numeric(key_column, errors='coerce')
+    whole_numbers = numeric_keys.notna() & (numeric_keys % 1 == 0)
+    normalized_keys = key_column.astype(str).str.strip()
+    normalized_keys[whole_numbers] = numeric_keys[whole_numbers].astype('int64').astype(str)
+    return normalized_keys
+
+def build_key_index(df: dict, key_columns: list):
+    """Function that builds a (league, id) MultiIndex from the given key columns of a DataFrame
+       Accepts `df`: Pandas DataFrame, `key_columns`: List
+       Returns `key_index`: Pandas MultiIndex"""
+    return pd.MultiIndex.from_arrays([df[key_columns[0]].astype(str), normalize_key_column(df[key_columns[1]])], names=['league', 'key'])
+
+def build_lookup(df: dict, key_columns: list):
+    """Function that builds a lookup table indexed on (league, id), keeping the first row of any duplicated key
+       Accepts `df`: Pandas DataFrame, `key_columns`: List
+       Returns `lookup`: Pandas DataFrame"""
+    lookup = df.copy()
+    lookup.index = build_key_index(df, key_columns)
+    lookup = lookup[~lookup.index.duplicated(keep='first')]
+    return lookup
+
+def get_fingerprints(df: dict, key_columns: list):
+    """Function that hashes every row of a DataFrame, indexed on (league, id), to detect changed rows between runs
+       Accepts `df`: Pandas DataFrame, `key_columns`: List
+       Returns `fingerprints`: Pandas Series"""
+    fingerprints = pd.util.hash_pandas_object(df.astype(str), index=False)
+    fingerprints.index = build_key_index(df, key_columns)
+    fingerprints = fingerprints[~fingerprints.index.duplicated(keep='first')]
+    return fingerprints
+
+def get_changed_keys(previous_fingerprints: object, current_fingerprints: object):
+    """Function that returns the keys that were added, removed or whose row fingerprint changed
+       Accepts `previous_fingerprints`: Pandas Series, `current_fingerprints`: Pandas Series
+       Returns `changed_keys`: Set"""
+    aligned = previous_fingerprints.reindex(current_fingerprints.index)
+    changed_keys = set(current_fingerprints.index[aligned.isna() | (aligned != current_fingerprints)])
+    changed_keys.update(previous_fingerprints.index.difference(current_fingerprints.index))
+    return changed_keys
+
+def denormalize_games(games_df: dict, team_lookup: dict, location_lookup: dict):
+    """Function that joins the given games to their away team, home team and location through the keyed lookup tables
+       Accepts `games_df`: Pandas DataFrame, `team_lookup`: Pandas DataFrame, `location_lookup`: Pandas DataFrame
+       Returns `schedule_df`: Pandas DataFrame"""
+    games_df = games_df.reset_index(drop=True)
+    leagues = games_df['league'].astype(str)
+    team_columns = [column for column in team_lookup.columns if column not in team_keys]
+    location_columns = [column for column in location_lookup.columns if column != 'league']
+
+    away_index = pd.MultiIndex.from_arrays([leagues, normalize_key_column(games_df['away_team'])])
+    away_df = team_lookup.reindex(away_index)[team_columns].reset_index(drop=True)
+    away_df = away_df.rename(columns={column: away_team_columns.get(column, f'{column}_x') for column in team_columns})
+
+    home_index = pd.MultiIndex.from_arrays([leagues, normalize_key_column(games_df['home_team'])])
+    home_df = team_lookup.reindex(home_index)[team_columns].reset_index(drop=True)
+    home_df = home_df.rename(columns={column: home_team_columns.get(column, f'{column}_y') for column in team_columns})
+
+    location_index = pd.MultiIndex.from_arrays([leagues, normalize_key_column(games_df['location'])])
+    location_df = location_lookup.reindex(location_index)[location_columns].reset_index(drop=True)
+
+    schedule_df = pd.concat([games_df, away_df, home_df, location_df], axis=1)
+    return schedule_df
+
+def read_schedule_state(data_dir: str):
+    """Function that reads the schedule and input fingerprints persisted by the previous publish
+       Accepts `data_dir`: String
+       Returns `schedule_state`: Dictionary, None if no previous state exists"""
+    try:
+        with open(f'{data_dir}/{schedule_state_file}', 'rb') as state_file:
+            schedule_state = pickle.load(state_file)
+    except Exception:
+        schedule_state = None
+    return schedule_state
+
+def write_schedule_state(schedule_state: dict, data_dir: str):
+    """Function that persists the published schedule and input fingerprints for the next incremental publish
+       Accepts `schedule_state`: Dictionary, `data_dir`: String
+       Returns: n/a"""
+    state_path = f'{data_dir}/{schedule_state_file}'
+    with open(f'{state_path}.tmp', 'wb') as state_file:
+        pickle.dump(schedule_state, state_file)
+    os.replace(f'{state_path}.tmp', state_path)
+
+def build_schedule(all_games: dict, all_teams: dict, all_locations: dict, schedule_state=None):
+    """Function that builds the denormalized schedule, re-joining only the games whose own row, teams or location changed since `schedule_state`
+       Accepts `all_games`: Pandas DataFrame, `all_teams`: Pandas DataFrame, `all_locations`: Pandas DataFrame, `schedule_state`: Dictionary
+       Returns `all_schedule`: Pandas DataFrame, `schedule_state`: Dictionary, `rebuilt_games`: Number"""
+    all_games = all_games.reset_index(drop=True)
+    team_lookup = build_lookup(all_teams, team_keys)
+    location_lookup = build_lookup(all_locations, location_keys)
+    fingerprints = {
+        'games': get_fingerprints(all_games, game_keys),
+        'teams': get_fingerprints(all_teams, team_keys),
+        'locations': get_fingerprints(all_locations, location_keys)
+    }
+    game_index = build_key_index(all_games, game_keys)
+
+    if schedule_state is None:
+        all_schedule = denormalize_games(all_games, team_lookup, location_lookup)
+        rebuilt_games = len(all_games)
+    else:
+        changed_games = get_changed_keys(schedule_state['fingerprints']['games'], fingerprints['games'])
+        changed_teams = get_changed_keys(schedule_state['fingerprints']['teams'], fingerprints['teams'])
+        changed_locations = get_changed_keys(schedule_state['fingerprints']['locations'], fingerprints['locations'])
+
+        leagues = all_games['league'].astype(str)
+        away_index = pd.MultiIndex.from_arrays([leagues, normalize_key_column(all_games['away_team'])])
+        home_index = pd.MultiIndex.from_arrays([leagues, normalize_key_column(all_games['home_team'])])
+        location_index = pd.MultiIndex.from_arrays([leagues, normalize_key_column(all_games['location'])])
+        previous_schedule = schedule_state['schedule']
+
+        rebuild_mask = (game_index.isin(list(changed_games)) | away_index.isin(list(changed_teams)) |
+                        home_index.isin(list(changed_teams)) | location_index.isin(list(changed_locations)) |
+                        ~game_index.isin(previous_schedule.index))
+        rebuilt_rows = denormalize_games(all_games[rebuild_mask], team_lookup, location_lookup)
+        rebuilt_rows.index = game_index[rebuild_mask]
+
+        # Keep every unaffected row as previously published and splice the re-joined rows in, in the current game order
+        unchanged_rows = previous_schedule[previous_schedule.index.isin(game_index[~rebuild_mask])]
+        all_schedule = pd.concat([unchanged_rows, rebuilt_rows], axis=0)
+        all_schedule = all_schedule[~all_schedule.index.duplicated(keep='last')].reindex(game_index)
+        all_schedule = all_schedule.reset_index(drop=True)
+        rebuilt_games = int(rebuild_mask.sum())
+
+    indexed_schedule = all_schedule.copy()
+    indexed_schedule.index = game_index
+    schedule_state = {'fingerprints': fingerprints, 'schedule': indexed_schedule}
+    return all_schedule, schedule_state, rebuilt_games
+
+def publish_schedule(all_games: dict, all_teams: dict, all_locations: dict, data_dir='./pickem_data', incremental=True):
+    """Function that builds the `all_schedule` data set, incrementally when a previous publish exists, and writes it to CSV, JSON, NDJSON
+       and columnar files partitioned by league and season, plus the memory-mappable `all_schedule.arrow` snapshot
+       and the per week, date and team JSON shards
+       Accepts `all_games`: Pandas DataFrame, `all_teams`: Pandas DataFrame, `all_locations`: Pandas DataFrame, `data_dir`: String, `incremental`: Boolean
+       Returns `all_schedule`: Pandas DataFrame"""
+    schedule_state = read_schedule_state(data_dir) if incremental else None
+    all_schedule, schedule_state, rebuilt_games = build_schedule(all_games, all_teams, all_locations, schedule_state)
+    print(f'~~ Rebuilt {rebuilt_games} of {len(all_schedule)} all_schedule rows')
+
+    write_outputs(all_schedule, f'{data_dir}/all_schedule')
+    columnar.write_columnar(all_schedule, 'all_schedule', data_dir=f'{data_dir}/columnar')
+    snapshot.write_snapshot(all_schedule, data_dir)
+    shards.publish_shards(all_schedule, data_dir)
+    write_schedule_state(schedule_state, data_dir)
+    return all_schedule
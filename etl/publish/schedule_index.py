@@ -0,0 +1,234 @@
+"""
+Pickem ETL
+Author: Gabe Baduqui
+
+In-memory index over the all_schedule data set for date range, team, location and week lookups that do not scan the whole schedule.
+"""
+import bisect
+from datetime import date
+import pandas as pd
+import etl.publish.schedule as schedule
+import etl.utils.get_week as wk
+
+def get_record_date(record: dict):
+    """Function that returns the game date of an all_schedule record from its `game_year`, `game_month` and `game_day`
+       Accepts `record`: Dictionary
+       Returns `game_date`: Date, None where the date is incomplete"""
+    try:
+        return date(int(float(record['game_year'])), int(float(record['game_month'])), int(float(record['game_day'])))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def get_key(value: object):
+    """Function that normalizes a key value like `schedule.normalize_key_column` does for a whole column, e.g. 52.0 and '52' to '52'
+       Accepts `value`: String or Number
+       Returns `key`: String, None if the value is missing"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    try:
+        number = float(value)
+        if number.is_integer():
+            return str(int(number))
+    except (TypeError, ValueError, OverflowError):
+        pass
+    return str(value).strip()
+
+class ScheduleIndex:
+    """Index of all_schedule records keyed by (league, game_id), with a sorted date array for bisect range queries,
+       posting lists of the games of every (league, team) and (league, location), and the games of every league season week.
+       Weeks follow `etl.utils.get_week`: week 1 of a season is the week of its earliest indexed game"""
+
+    def __init__(self, all_schedule: dict):
+        """Function that builds the index from an all_schedule DataFrame in one pass, keeping the first row of any duplicated game
+           Accepts `all_schedule`: Pandas DataFrame
+           Returns: n/a"""
+        self.games = {}
+        self.game_dates = {}
+        self.dates = []
+        self.date_keys = []
+        self.team_games = {}
+        self.location_games = {}
+        self.week_games = {}
+        self.season_starts = {}
+        self.game_weeks = {}
+
+        all_schedule = all_schedule[~schedule.build_key_index(all_schedule, schedule.game_keys).duplicated(keep='first')].reset_index(drop=True)
+        records = all_schedule.astype(object).where(all_schedule.notna(), None).to_dict('records')
+        game_ids = schedule.normalize_key_column(all_schedule['game_id'])
+        leagues = all_schedule['league'].astype(str).str.upper()
+        game_dates = wk.get_game_dates(all_schedule)
+        seasons = wk.get_seasons(all_schedule['league'], game_dates)
+        weeks = wk.get_weeks(all_schedule['league'], seasons, game_dates)
+
+        dated_games = []
+        for position, record in enumerate(records):
+            game_key = (leagues[position], game_ids[position])
+            self.games[game_key] = record
+            self.add_postings(game_key, record)
+            if pd.notna(game_dates[position]):
+                game_date = game_dates[position].date()
+                dated_games.append((game_date.isoformat(), game_key))
+                self.game_dates[game_key] = game_date.isoformat()
+                season = int(seasons[position])
+                season_key = (game_key[0], season)
+                self.season_starts[season_key] = min(self.season_starts.get(season_key, game_date), game_date)
+                self.add_week(game_key, (game_key[0], season, int(weeks[position])))
+        dated_games.sort()
+        self.dates = [game_date for game_date, _ in dated_games]
+        self.date_keys = [game_key for _, game_key in dated_games]
+
+    @classmethod
+    def from_outputs(cls, data_dir='./pickem_data'):
+        """Function that builds the index from the published `all_schedule.csv`
+           Accepts `data_dir`: String
+           Returns `schedule_index`: ScheduleIndex"""
+        return cls(pd.read_csv(f'{data_dir}/all_schedule.csv'))
+
+    def __len__(self):
+        return len(self.games)
+
+    def add_postings(self, game_key: tuple, record: dict):
+        """Function that adds a game to the posting lists of its teams and location
+           Accepts `game_key`: Tuple, `record`: Dictionary
+           Returns: n/a"""
+        for team_column in ['away_team', 'home_team']:
+            team_id = get_key(record.get(team_column))
+            if team_id is not None:
+                self.team_games.setdefault((game_key[0], team_id), set()).add(game_key)
+        location_id = get_key(record.get('location'))
+        if location_id is not None:
+            self.location_games.setdefault((game_key[0], location_id), set()).add(game_key)
+
+    def add_week(self, game_key: tuple, week_key: tuple):
+        """Function that adds a game to the bucket of its league season week
+           Accepts `game_key`: Tuple, `week_key`: Tuple of (league, season, week)
+           Returns: n/a"""
+        self.week_games.setdefault(week_key, set()).add(game_key)
+        self.game_weeks[game_key] = week_key
+
+    def remove_from(self, postings: dict, posting_key: tuple, game_key: tuple):
+        """Function that removes a game from one posting list, dropping the list once empty
+           Accepts `postings`: Dictionary of Sets, `posting_key`: Tuple, `game_key`: Tuple
+           Returns: n/a"""
+        posting = postings.get(posting_key)
+        if posting is not None:
+            posting.discard(game_key)
+            if len(posting) == 0:
+                del postings[posting_key]
+
+    def rebuild_season_weeks(self, season_key: tuple):
+        """Function that re-buckets every game of a league season, needed when a game moves the season's first week
+           Accepts `season_key`: Tuple of (league, season)
+           Returns: n/a"""
+        league, season = season_key
+        season_games = [game_key for week_key, week_games in self.week_games.items() if week_key[:2] == season_key for game_key in week_games]
+        for week_key in [week_key for week_key in self.week_games if week_key[:2] == season_key]:
+            del self.week_games[week_key]
+        season_dates = [get_record_date(self.games[game_key]) for game_key in season_games]
+        if len(season_games) == 0:
+            self.season_starts.pop(season_key, None)
+            return
+        self.season_starts[season_key] = min(season_dates)
+        for game_key, game_date in zip(season_games, season_dates):
+            self.add_week(game_key, (league, season, wk.get_week(game_date, self.season_starts[season_key])))
+
+    def remove_game(self, league: str, game_id: object):
+        """Function that removes a game from the index and all of its posting lists, date entry and week bucket
+           Accepts `league`: String, `game_id`: String or Number
+           Returns `record`: Dictionary of the removed game, None if it was not indexed"""
+        game_key = (league.upper(), get_key(game_id))
+        record = self.games.pop(game_key, None)
+        if record is None:
+            return None
+        for team_column in ['away_team', 'home_team']:
+            self.remove_from(self.team_games, (game_key[0], get_key(record.get(team_column))), game_key)
+        self.remove_from(self.location_games, (game_key[0], get_key(record.get('location'))), game_key)
+
+        game_date = get_record_date(record)
+        self.game_dates.pop(game_key, None)
+        if game_date is not None:
+            position = bisect.bisect_left(self.dates, game_date.isoformat())
+            while self.date_keys[position] != game_key:
+                position += 1
+            del self.dates[position]
+            del self.date_keys[position]
+        week_key = self.game_weeks.pop(game_key, None)
+        if week_key is not None:
+            self.remove_from(self.week_games, week_key, game_key)
+            season_key = week_key[:2]
+            if game_date == self.season_starts.get(season_key):
+                self.rebuild_season_weeks(season_key)
+        return record
+
+    def upsert_game(self, record: dict):
+        """Function that adds a game to the index or replaces the indexed game with the same league and Game ID, in place
+           Accepts `record`: Dictionary of all_schedule columns
+           Returns: n/a"""
+        record = {column: (None if not isinstance(value, str) and pd.isna(value) else value) for column, value in record.items()}
+        league = str(record['league']).upper()
+        self.remove_game(league, record['game_id'])
+        game_key = (league, get_key(record['game_id']))
+        self.games[game_key] = record
+        self.add_postings(game_key, record)
+
+        game_date = get_record_date(record)
+        if game_date is None:
+            return
+        self.game_dates[game_key] = game_date.isoformat()
+        position = bisect.bisect_right(self.dates, game_date.isoformat())
+        self.dates.insert(position, game_date.isoformat())
+        self.date_keys.insert(position, game_key)
+        season_key = (league, wk.get_season(league, game_date))
+        if season_key in self.season_starts and game_date >= self.season_starts[season_key]:
+            self.add_week(game_key, (*season_key, wk.get_week(game_date, self.season_starts[season_key])))
+        else:
+            self.add_week(game_key, (*season_key, 1))
+            self.rebuild_season_weeks(season_key)
+
+    def get_records(self, game_keys: object, league=None):
+        """Function that returns the records of the given games in game date order, optionally of one league
+           Accepts `game_keys`: Iterable of Tuples, `league`: String
+           Returns `records`: List of Dictionaries"""
+        league = None if league is None else league.upper()
+        game_keys = [game_key for game_key in game_keys if league is None or game_key[0] == league]
+        game_keys.sort(key=lambda game_key: (self.game_dates.get(game_key, date.max.isoformat()), game_key))
+        return [self.games[game_key] for game_key in game_keys]
+
+    def get_game(self, league: str, game_id: object):
+        """Function that returns the record of one game
+           Accepts `league`: String, `game_id`: String or Number
+           Returns `record`: Dictionary, None if the game is not indexed"""
+        return self.games.get((league.upper(), get_key(game_id)))
+
+    def get_games_between(self, first_date: object, last_date: object, league=None):
+        """Function that returns the games from the first through the last date, found by bisecting the sorted date array
+           Accepts `first_date`: Date or ISO String, `last_date`: Date or ISO String, `league`: String
+           Returns `records`: List of Dictionaries in game date order"""
+        first_position = bisect.bisect_left(self.dates, str(first_date))
+        last_position = bisect.bisect_right(self.dates, str(last_date))
+        league = None if league is None else league.upper()
+        return [self.games[game_key] for game_key in self.date_keys[first_position:last_position] if league is None or game_key[0] == league]
+
+    def get_games_on(self, game_date: object, league=None):
+        """Function that returns the games of one date
+           Accepts `game_date`: Date or ISO String, `league`: String
+           Returns `records`: List of Dictionaries"""
+        return self.get_games_between(game_date, game_date, league)
+
+    def get_team_games(self, league: str, team_id: object):
+        """Function that returns the home and away games of a team
+           Accepts `league`: String, `team_id`: String or Number
+           Returns `records`: List of Dictionaries in game date order"""
+        return self.get_records(self.team_games.get((league.upper(), get_key(team_id)), ()))
+
+    def get_location_games(self, league: str, location_id: object):
+        """Function that returns the games played at a location
+           Accepts `league`: String, `location_id`: String or Number
+           Returns `records`: List of Dictionaries in game date order"""
+        return self.get_records(self.location_games.get((league.upper(), get_key(location_id)), ()))
+
+    def get_week_games(self, league: str, season: int, week: int):
+        """Function that returns the games of a league season week
+           Accepts `league`: String, `season`: Number, `week`: Number
+           Returns `records`: List of Dictionaries in game date order"""
+        return self.get_records(self.week_games.get((league.upper(), int(season), int(week)), ()))
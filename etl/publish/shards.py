@@ -0,0 +1,92 @@
+"""
+Pickem ETL
+Author: Gabe Baduqui
+
+Split the all_schedule data set into small JSON shards per league week, game date and team, with gzip variants and a manifest of
+content hashes, rewriting only the shards whose content changed.
+"""
+import gzip, hashlib, json, os
+from datetime import datetime
+import pandas as pd
+import etl.publish.schedule as schedule
+import etl.utils.get_week as wk
+
+manifest_file = 'manifest.json'
+
+def get_shard_rows(all_schedule: dict):
+    """Function that returns the shard paths every all_schedule row belongs to, one per league week, game date and (home or away) team.
+       Rows without a complete game date only go into their team shards
+       Accepts `all_schedule`: Pandas DataFrame
+       Returns `shard_rows`: Dictionary of row position Lists keyed by shard path"""
+    leagues = all_schedule['league'].astype(str).str.lower()
+    game_dates = wk.get_game_dates(all_schedule)
+    seasons = wk.get_seasons(all_schedule['league'], game_dates)
+    weeks = wk.get_weeks(all_schedule['league'], seasons, game_dates)
+    shard_keys = pd.DataFrame({
+        'week': leagues + '/week/' + seasons.astype(str) + '-' + weeks.astype(str).str.zfill(2) + '.json',
+        'date': leagues + '/date/' + game_dates.dt.strftime('%Y-%m-%d') + '.json',
+        'away': leagues + '/team/' + schedule.normalize_key_column(all_schedule['away_team']) + '.json',
+        'home': leagues + '/team/' + schedule.normalize_key_column(all_schedule['home_team']) + '.json'
+    })
+    shard_keys.loc[game_dates.isna().values, ['week', 'date']] = None
+    shard_keys.loc[all_schedule['away_team'].isna().values, 'away'] = None
+    shard_keys.loc[all_schedule['home_team'].isna().values, 'home'] = None
+
+    shard_rows = {}
+    for position, row_shards in enumerate(shard_keys.itertuples(index=False)):
+        for shard_path in dict.fromkeys(row_shards):
+            if shard_path is not None:
+                shard_rows.setdefault(shard_path, []).append(position)
+    return shard_rows
+
+def read_manifest(shards_dir: str):
+    """Function that reads the manifest of the previously published shards
+       Accepts `shards_dir`: String
+       Returns `manifest`: Dictionary, empty if no shards were published"""
+    try:
+        with open(f'{shards_dir}/{manifest_file}', 'r') as manifest_json:
+            return json.load(manifest_json)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def write_file(path: str, content: bytes):
+    """Function that writes a file through a temporary file renamed into place, so clients never read a partial shard
+       Accepts `path`: String, `content`: Bytes
+       Returns: n/a"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f'{path}.tmp', 'wb') as tmp_file:
+        tmp_file.write(content)
+    os.replace(f'{path}.tmp', path)
+
+def publish_shards(all_schedule: dict, data_dir='./pickem_data'):
+    """Function that publishes the all_schedule shards under `{data_dir}/shards`, each as JSON and pre-compressed `.json.gz`.
+       Every row is serialized once, shards whose hash matches the previous manifest are skipped and shards that no longer exist are removed
+       Accepts `all_schedule`: Pandas DataFrame, `data_dir`: String
+       Returns `manifest`: Dictionary of shard hashes, sizes and row counts keyed by shard path"""
+    shards_dir = f'{data_dir}/shards'
+    all_schedule = all_schedule.reset_index(drop=True)
+    previous_shards = read_manifest(shards_dir).get('shards', {})
+    row_json = all_schedule.to_json(orient='records', lines=True).splitlines() if len(all_schedule) > 0 else []
+
+    shards = {}
+    written_shards = 0
+    for shard_path, positions in sorted(get_shard_rows(all_schedule).items()):
+        content = f"[{','.join(row_json[position] for position in positions)}]".encode('utf-8')
+        content_hash = hashlib.sha256(content).hexdigest()
+        shards[shard_path] = {'sha256': content_hash, 'bytes': len(content), 'rows': len(positions)}
+        if previous_shards.get(shard_path, {}).get('sha256') == content_hash and os.path.exists(f'{shards_dir}/{shard_path}.gz'):
+            continue
+        write_file(f'{shards_dir}/{shard_path}', content)
+        write_file(f'{shards_dir}/{shard_path}.gz', gzip.compress(content, mtime=0))
+        written_shards += 1
+
+    removed_shards = [shard_path for shard_path in previous_shards if shard_path not in shards]
+    for shard_path in removed_shards:
+        for path in [f'{shards_dir}/{shard_path}', f'{shards_dir}/{shard_path}.gz']:
+            if os.path.exists(path):
+                os.remove(path)
+
+    manifest = {'published_at': datetime.now().isoformat(timespec='seconds'), 'shards': shards}
+    write_file(f'{shards_dir}/{manifest_file}', json.dumps(manifest, indent=1).encode('utf-8'))
+    print(f'~~ Wrote {written_shards} of {len(shards)} all_schedule shards, removed {len(removed_shards)}')
+    return manifest
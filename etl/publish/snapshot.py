@@ -0,0 +1,97 @@
+"""
+Pickem ETL
+Author: Gabe Baduqui
+
+Publish the all_schedule data set as an uncompressed Arrow IPC (Feather) snapshot and read it through a memory map, so consumers
+get typed columns without parsing JSON and every process reading the snapshot shares the same pages.
+"""
+import os, threading
+import etl.publish.columnar as columnar
+import etl.publish.schedule_index as schedule_index
+from etl.publish.arrow import pa, pc, feather
+
+snapshot_file = 'all_schedule.arrow'
+
+# Mapped snapshots keyed by path, reused until the file is republished
+snapshot_cache = {}
+snapshot_lock = threading.Lock()
+
+def write_snapshot(all_schedule: dict, data_dir='./pickem_data'):
+    """Function that writes the all_schedule snapshot with the typed columnar schema. The file is left uncompressed so it can be
+       memory-mapped without a copy, and is renamed into place once complete so readers never map a partial file
+       Accepts `all_schedule`: Pandas DataFrame, `data_dir`: String
+       Returns `snapshot_path`: String, None if pyarrow is not installed"""
+    if pa is None:
+        print('~~~~ Skipping all_schedule snapshot, pyarrow is not installed ~~')
+        return None
+    snapshot_path = f'{data_dir}/{snapshot_file}'
+    table = columnar.get_typed_table(all_schedule.reset_index(drop=True), columnar.get_column_types())
+    feather.write_feather(table, f'{snapshot_path}.tmp', compression='uncompressed')
+    os.replace(f'{snapshot_path}.tmp', snapshot_path)
+    print(f'~~~~ Wrote {len(all_schedule)} row all_schedule snapshot to {snapshot_path} ~~')
+    return snapshot_path
+
+def read_snapshot(data_dir='./pickem_data'):
+    """Function that memory-maps the all_schedule snapshot. The columns reference the mapped file instead of process memory,
+       and the mapped table is cached until a newer snapshot is published
+       Accepts `data_dir`: String
+       Returns `snapshot`: Arrow Table, None if no snapshot was published"""
+    if pa is None:
+        return None
+    snapshot_path = f'{data_dir}/{snapshot_file}'
+    try:
+        published_at = os.stat(snapshot_path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    with snapshot_lock:
+        cached = snapshot_cache.get(snapshot_path)
+        if cached is None or cached[0] != published_at:
+            with pa.memory_map(snapshot_path, 'r') as source:
+                cached = (published_at, pa.ipc.open_file(source).read_all())
+            snapshot_cache[snapshot_path] = cached
+    return cached[1]
+
+def get_column(snapshot: object, column: str):
+    """Function that returns a snapshot column as a NumPy array, without a copy for numeric columns that hold no nulls
+       Accepts `snapshot`: Arrow Table, `column`: String
+       Returns `values`: NumPy Array"""
+    chunked_column = snapshot.column(column)
+    if chunked_column.num_chunks == 1 and chunked_column.null_count == 0 and pa.types.is_primitive(chunked_column.type):
+        return chunked_column.chunk(0).to_numpy(zero_copy_only=True)
+    return chunked_column.to_numpy()
+
+def get_key_set(snapshot: object, column: str, keys: list):
+    """Function that returns the value set matching keys against a snapshot column, normalized like the schedule keys (e.g. 52.0 to '52')
+       and typed like the column, so text team IDs such as 'kc' are compared as text and integer IDs as integers
+       Accepts `snapshot`: Arrow Table, `column`: String, `keys`: List
+       Returns `value_set`: Arrow Array"""
+    column_type = snapshot.schema.field(column).type
+    keys = [schedule_index.get_key(key) for key in keys]
+    if pa.types.is_integer(column_type):
+        keys = [int(key) for key in keys if key is not None and key.lstrip('-').isdigit()]
+    return pa.array([key for key in keys if key is not None], type=column_type)
+
+def filter_snapshot(snapshot: object, leagues=None, team_ids=None, location_ids=None, game_ids=None, columns=None):
+    """Function that returns the snapshot rows of the given leagues, teams (home or away), locations and games, all optional, and only
+       the requested columns. Selecting columns alone keeps referencing the mapped file
+       Accepts `snapshot`: Arrow Table, `leagues`: List, `team_ids`: List, `location_ids`: List, `game_ids`: List, `columns`: List
+       Returns `view`: Arrow Table"""
+    conditions = []
+    if leagues is not None:
+        conditions.append(pc.is_in(snapshot.column('league'), value_set=pa.array([str(league).upper() for league in leagues])))
+    if team_ids is not None:
+        conditions.append(pc.or_(pc.is_in(snapshot.column('away_team'), value_set=get_key_set(snapshot, 'away_team', team_ids)),
+                                 pc.is_in(snapshot.column('home_team'), value_set=get_key_set(snapshot, 'home_team', team_ids))))
+    if location_ids is not None:
+        conditions.append(pc.is_in(snapshot.column('location'), value_set=get_key_set(snapshot, 'location', location_ids)))
+    if game_ids is not None:
+        conditions.append(pc.is_in(snapshot.column('game_id'), value_set=get_key_set(snapshot, 'game_id', game_ids)))
+
+    view = snapshot.select(columns) if columns is not None else snapshot
+    if len(conditions) > 0:
+        mask = conditions[0]
+        for condition in conditions[1:]:
+            mask = pc.and_(mask, condition)
+        view = view.filter(mask)
+    return view
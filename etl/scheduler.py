@@ -0,0 +1,137 @@
+"""
+Pickem ETL
+Author: Gabe Baduqui
+
+Run the per-league extract, transform and load pipelines concurrently under a shared network budget.
+"""
+import json, os, threading, time
+import etl.etl as x
+import etl.extract.extract as ext
+import etl.transform.transform as trf
+import etl.load.load as load
+import etl.score.score as score
+import etl.utils.request_budget as net
+import etl.utils.get_all_dates_in_range as all_dates
+from concurrent.futures import ThreadPoolExecutor
+
+stage_timings_path = './pickem_logs/league_stage_timings.json'
+
+# Rough number of games found per scraped schedule page (one week for football, one day otherwise)
+estimated_games_per_page = {
+    'CFB': 57,
+    'NFL': 15,
+    'MLB': 14,
+    'NBA': 6
+}
+
+def get_schedule_page_count(run_window: dict):
+    """Function that returns the number of schedule pages a given run window scrapes
+       Accepts `run_window`: Dictionary
+       Returns `page_count`: Number"""
+    if 'game_ids' in run_window:
+        page_count = 0
+    elif 'weeks' in run_window:
+        page_count = run_window['weeks'] - run_window.get('first_week', 1) + 1
+    else:
+        page_count = len(all_dates.date_range(run_window['schedule_window_begin'], run_window['schedule_window_end']))
+    return page_count
+
+def read_stage_timings():
+    """Function that reads the per-league stage durations recorded by the previous run
+       Accepts: n/a
+       Returns `stage_timings`: Dictionary"""
+    try:
+        with open(stage_timings_path, 'r') as timings_file:
+            stage_timings = json.load(timings_file)
+    except Exception:
+        stage_timings = {}
+    return stage_timings
+
+def write_stage_timings(stage_timings: dict):
+    """Function that persists the per-league stage durations of the current run
+       Accepts `stage_timings`: Dictionary
+       Returns: n/a"""
+    try:
+        os.makedirs(os.path.dirname(stage_timings_path), exist_ok=True)
+        with open(stage_timings_path, 'w') as timings_file:
+            json.dump(stage_timings, timings_file, indent=4)
+    except Exception as e:
+        print(f'~~~~ Could not write stage timings: {e}')
+
+def estimate_cost(league: str, run_window: dict, partial: bool, stage_timings: dict):
+    """Function that estimates the wall-clock cost of a league's pipeline, preferring the durations measured on the previous full run
+       Accepts `league`: String, `run_window`: Dictionary, `partial`: Boolean, `stage_timings`: Dictionary
+       Returns `cost`: Number"""
+    if league in stage_timings and not partial:
+        cost = sum(stage_timings[league].values())
+    else:
+        # One request per schedule page and game page, plus the per-game pass over locations
+        page_count = get_schedule_page_count(run_window)
+        game_count = len(run_window['game_ids']) if 'game_ids' in run_window else page_count * estimated_games_per_page.get(league, 1)
+        cost = page_count + (2 * game_count)
+    return cost
+
+def run_league_pipeline(prod: bool, league: str, run_window: dict, partial: bool, load_slots: object, stage_timings: dict, load_mode='upsert', prune_league=False):
+    """Function that runs the extract, transform, load and score stages for a single league, recording how long each stage took
+       Accepts `prod`: Boolean, `league`: String, `run_window`: Dictionary, `partial`: Boolean, `load_slots`: Semaphore Object, `stage_timings`: Dictionary, `load_mode`: String, `prune_league`: Boolean
+       Returns `games`: Pandas DataFrame, `teams`: Pandas DataFrame, `locations`: Pandas DataFrame"""
+    timings = {}
+
+    # Extract (network bound, throttled by the shared request budget)
+    stage_start = time.perf_counter()
+    known_locations = load.read_output(f'{league.lower()}_locations') if partial else None
+    games_raw, teams_raw, locations_raw = ext.full_extract(league, known_locations=known_locations, **run_window)
+    timings['extract'] = round(time.perf_counter() - stage_start, 3)
+
+    # Transform (CPU bound)
+    stage_start = time.perf_counter()
+    games, teams, locations = trf.full_transform(league, games_raw, teams_raw, locations_raw, run_window.get('game_ids'))
+    timings['transform'] = round(time.perf_counter() - stage_start, 3)
+
+    # Load and score (database bound, limited to `load_slots` leagues at once)
+    with load_slots:
+        stage_start = time.perf_counter()
+        load.full_load(prod, league, games, teams, locations, partial, load_mode, prune_league)
+        timings['load'] = round(time.perf_counter() - stage_start, 3)
+
+        stage_start = time.perf_counter()
+        score.score_league(league)
+        timings['score'] = round(time.perf_counter() - stage_start, 3)
+
+    if not partial:
+        stage_timings[league] = timings
+    print(f'~~ Finished {league} pipeline: {timings}')
+    return games, teams, locations
+
+def run_leagues(prod: bool, leagues: list, season=None, weeks=None, dates=None, game_ids=None, max_concurrent_requests=8, max_concurrent_loads=None, max_workers=None, load_mode='upsert', prune_league=False):
+    """Function that runs the pipelines of all given leagues concurrently, starting the most expensive leagues first.
+       `season`, `weeks` and `dates` apply to every league (see `etl.get_run_window`); `game_ids` is a Dictionary of Game ID lists keyed by league.
+       Accepts `prod`: Boolean, `leagues`: List, `season`: Number, `weeks`: Tuple, `dates`: Tuple, `game_ids`: Dictionary, `max_concurrent_requests`: Number, `max_concurrent_loads`: Number, `max_workers`: Number, `load_mode`: String, `prune_league`: Boolean
+       Returns `results`: Dictionary of (games, teams, locations) tuples keyed by league"""
+    leagues = [league.upper() for league in leagues]
+    invalid_leagues = [league for league in leagues if league not in x.default_run_windows]
+    if len(invalid_leagues) > 0:
+        raise ValueError(f'Invalid League(s): {invalid_leagues}')
+    if game_ids is None:
+        game_ids = {}
+    run_windows = {league: x.get_run_window(league, season, weeks, dates, game_ids.get(league)) for league in leagues}
+    partial_runs = {league: x.is_partial_run(league, weeks, dates, game_ids.get(league)) for league in leagues}
+
+    net.set_max_concurrent_requests(max_concurrent_requests)
+    # Leagues load into separate rows over separate pooled connections, so by default every league may load at once
+    if max_concurrent_loads is None:
+        max_concurrent_loads = len(leagues)
+    load_slots = threading.BoundedSemaphore(max_concurrent_loads)
+    previous_timings = read_stage_timings()
+    ordered_leagues = sorted(leagues, key=lambda league: estimate_cost(league, run_windows[league], partial_runs[league], previous_timings), reverse=True)
+    print(f'~~ Scheduling leagues by estimated cost: {ordered_leagues}')
+
+    stage_timings = dict(previous_timings)
+    if max_workers is None:
+        max_workers = len(ordered_leagues)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {league: pool.submit(run_league_pipeline, prod, league, run_windows[league], partial_runs[league], load_slots, stage_timings, load_mode, prune_league) for league in ordered_leagues}
+        results = {league: futures[league].result() for league in leagues}
+
+    write_stage_timings(stage_timings)
+    return results
@@ -0,0 +1,151 @@
+"""
+Pickem ETL
+Author: Gabe Baduqui
+
+Score picks against final games and rank users per week and season in a persisted leaderboard, scoring only the games that became final since the last run.
+"""
+from datetime import date
+import numpy as np
+import pandas as pd
+import etl.load.load as load
+import etl.publish.schedule as schedule
+import etl.utils.get_week as wk
+import etl.utils.get_timestamp as ts
+
+points_per_pick = 1
+
+# Leaderboard rows with this week hold the season totals
+season_week = 0
+
+result_columns = ['league', 'game_id', 'user_id', 'season', 'week', 'game_date', 'team_picked', 'winner', 'correct', 'points']
+
+def instantiate_logfile(league):
+    timestamp = ts.get_timestamp()
+    score_logfile_path = f'./pickem_logs/{league.upper()}_score_{timestamp}.log'
+    score_logfile = open(score_logfile_path, 'a')
+    return score_logfile
+
+def normalize_team_column(team_column: object):
+    """Function that normalizes a column of team IDs like the schedule keys, keeping missing picks and winners as None
+       Accepts `team_column`: Pandas Series
+       Returns `normalized_teams`: Pandas Series"""
+    return schedule.normalize_key_column(team_column).where(team_column.notna(), None)
+
+def get_final_games(games_df: dict, as_of=None):
+    """Function that returns the games that are final as of a date, with their season, week and winning team. A game counts as final
+       once its date has passed and it has a nonzero total score; tied games have no winner. Seasons and weeks come from all given games
+       Accepts `games_df`: Pandas DataFrame, `as_of`: Date, defaults to today
+       Returns `final_games`: Pandas DataFrame of league, game_id, season, week, game_date and winner"""
+    as_of = pd.Timestamp(as_of if as_of is not None else date.today())
+    games_df = games_df[games_df['game_id'].notna()].reset_index(drop=True)
+    game_dates = wk.get_game_dates(games_df)
+    seasons = wk.get_seasons(games_df['league'], game_dates)
+    weeks = wk.get_weeks(games_df['league'], seasons, game_dates)
+    away_totals = pd.to_numeric(games_df['away_total'], errors='coerce')
+    home_totals = pd.to_numeric(games_df['home_total'], errors='coerce')
+
+    final_rows = (game_dates < as_of) & away_totals.notna() & home_totals.notna() & ((away_totals + home_totals) > 0)
+    away_teams = normalize_team_column(games_df['away_team'])
+    home_teams = normalize_team_column(games_df['home_team'])
+    winners = np.where(away_totals > home_totals, away_teams, np.where(home_totals > away_totals, home_teams, None))
+
+    final_games = pd.DataFrame({'league': games_df['league'].astype(str).str.upper(), 'game_id': schedule.normalize_key_column(games_df['game_id']),
+                                'season': seasons, 'week': weeks, 'game_date': game_dates.dt.strftime('%Y-%m-%d'), 'winner': winners})
+    return final_games[final_rows.values].reset_index(drop=True)
+
+def score_picks(picks_df: dict, final_games: dict):
+    """Function that scores picks against final games in one vectorized join: a pick of the winning team earns `points_per_pick`,
+       a missing pick or a pick of a tied game earns nothing
+       Accepts `picks_df`: Pandas DataFrame of league, game_id, user_id and team_id, `final_games`: Pandas DataFrame from `get_final_games`
+       Returns `pick_results`: Pandas DataFrame with the columns of `result_columns`"""
+    picks = pd.DataFrame({'league': picks_df['league'].astype(str).str.upper(), 'game_id': schedule.normalize_key_column(picks_df['game_id']),
+                          'user_id': pd.to_numeric(picks_df['user_id']), 'team_picked': normalize_team_column(picks_df['team_id'])})
+    pick_results = picks.merge(final_games, on=['league', 'game_id'], how='inner')
+    pick_results['correct'] = (pick_results['team_picked'].notna() & (pick_results['team_picked'] == pick_results['winner'])).astype(int)
+    pick_results['points'] = pick_results['correct'] * points_per_pick
+    return pick_results[result_columns]
+
+def get_streaks(pick_results: dict):
+    """Function that returns every user's current and longest run of correct picks per league and season, in game date order.
+       Games a user did not pick neither extend nor break a streak
+       Accepts `pick_results`: Pandas DataFrame
+       Returns `streaks`: Pandas DataFrame of current_streak and longest_streak indexed by league, season and user_id"""
+    user_keys = ['league', 'season', 'user_id']
+    picked = pick_results[pick_results['team_picked'].notna()].sort_values(user_keys + ['game_date', 'game_id'])
+    new_user = (picked[user_keys] != picked[user_keys].shift()).any(axis=1)
+    run_ids = (new_user | (picked['correct'] != picked['correct'].shift())).cumsum()
+    run_lengths = picked.groupby(run_ids).cumcount() + 1
+    correct_run_lengths = run_lengths.where(picked['correct'] == 1, 0)
+
+    user_groups = correct_run_lengths.groupby([picked[key] for key in user_keys])
+    streaks = pd.DataFrame({'current_streak': user_groups.last(), 'longest_streak': user_groups.max()})
+    return streaks
+
+def rank_points(totals: dict, group_keys: list):
+    """Function that ranks users by points within each group, tied users sharing the best rank
+       Accepts `totals`: Pandas DataFrame, `group_keys`: List
+       Returns `ranks`: Pandas Series"""
+    return totals.groupby(group_keys)['points'].rank(method='min', ascending=False).astype(int)
+
+def build_leaderboard(pick_results: dict):
+    """Function that aggregates pick results into per-week and per-season points, ranks and (season) streaks for every user.
+       Season totals are stored under week `season_week`
+       Accepts `pick_results`: Pandas DataFrame
+       Returns `leaderboard`: Pandas DataFrame with the leaderboard columns"""
+    pick_results = pick_results.assign(picked=pick_results['team_picked'].notna().astype(int))
+    aggregations = {'points': ('points', 'sum'), 'correct_picks': ('correct', 'sum'), 'scored_picks': ('picked', 'sum')}
+
+    week_totals = pick_results.groupby(['league', 'season', 'week', 'user_id'], as_index=False).agg(**aggregations)
+    week_totals['leaderboard_rank'] = rank_points(week_totals, ['league', 'season', 'week'])
+
+    season_totals = pick_results.groupby(['league', 'season', 'user_id'], as_index=False).agg(**aggregations)
+    season_totals['week'] = season_week
+    season_totals['leaderboard_rank'] = rank_points(season_totals, ['league', 'season'])
+    season_totals = season_totals.join(get_streaks(pick_results), on=['league', 'season', 'user_id'])
+    season_totals[['current_streak', 'longest_streak']] = season_totals[['current_streak', 'longest_streak']].fillna(0).astype(int)
+
+    leaderboard = pd.concat([season_totals, week_totals], axis=0, ignore_index=True)
+    leaderboard = leaderboard.sort_values(['league', 'season', 'week', 'leaderboard_rank', 'user_id']).reset_index(drop=True)
+    return leaderboard[['league', 'season', 'week', 'user_id', 'points', 'correct_picks', 'scored_picks', 'leaderboard_rank', 'current_streak', 'longest_streak']]
+
+def score_league(league: str, as_of=None):
+    """Function that scores the picks of a league's games that became final since the last run, persists them to PICK_RESULTS, and rebuilds
+       the leaderboard of the affected seasons into LEADERBOARD and the `{league}_leaderboard` CSV output
+       Accepts `league`: String, `as_of`: Date, defaults to today
+       Returns `leaderboard`: Pandas DataFrame, None if no game became final"""
+    league = league.upper()
+    db = load.get_db()
+    score_logfile = instantiate_logfile(league)
+    print(f'\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\nBeginning {league} Scoring Jobs\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~')
+    score_logfile.write(f'\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\nBeginning {league} Scoring Jobs\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\n')
+
+    leaderboard = None
+    try:
+        final_games = get_final_games(db.fetch_records('games', league), as_of)
+        scored_results = db.fetch_records('pick_results', league)
+        scored_games = set(schedule.normalize_key_column(scored_results['game_id'])) if len(scored_results) > 0 else set()
+        new_final_games = final_games[~final_games['game_id'].isin(scored_games)]
+        print(f'~~~~ {len(new_final_games)} of {len(final_games)} final {league} games are newly final')
+        score_logfile.write(f'~~~~ {len(new_final_games)} of {len(final_games)} final {league} games are newly final\n')
+
+        if len(new_final_games) > 0:
+            picks = db.fetch_records('picks', league, game_ids=list(new_final_games['game_id']))
+            new_results = score_picks(picks, new_final_games)
+            db.upsert_records('pick_results', new_results, score_logfile)
+
+            # The first scoring run has no scored results yet, and concatenating an empty frame is deprecated by pandas
+            result_frames = [df for df in [scored_results.reindex(columns=result_columns), new_results] if len(df) > 0]
+            pick_results = pd.concat(result_frames, axis=0, ignore_index=True) if len(result_frames) > 0 else new_results.reindex(columns=result_columns)
+            pick_results[['user_id', 'season', 'week', 'correct', 'points']] = pick_results[['user_id', 'season', 'week', 'correct', 'points']].astype(int)
+            leaderboard = build_leaderboard(pick_results)
+            affected_seasons = set(new_final_games['season'])
+            db.upsert_records('leaderboard', leaderboard[leaderboard['season'].isin(affected_seasons)], score_logfile)
+            load.load_csv(leaderboard, f'{league.lower()}_leaderboard', score_logfile)
+    except Exception as e:
+        print(f'~~~~ Error occurred scoring {league} picks:\n{e}')
+        score_logfile.write(f'~~~~ Error occurred scoring {league} picks:\n{e}\n')
+
+    print(f'~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\nFinished {league} Scoring Jobs\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~')
+    score_logfile.write(f'~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\nFinished {league} Scoring Jobs\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\n')
+    score_logfile.close()
+    return leaderboard
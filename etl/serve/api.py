@@ -0,0 +1,205 @@
+"""
+Pickem ETL
+Author: Gabe Baduqui
+
+Read-only HTTP API over the published ETL outputs. Schedule, team, location and leaderboard queries are answered from an in-memory
+ScheduleIndex, and rendered responses are cached with ETags derived from the output versions, so both are dropped once a load publishes.
+Run from the repository root:
+    python -m etl.serve.api --port 8050
+"""
+import argparse, hashlib, json, os, threading
+import pandas as pd
+from flask import Flask, Response, request
+from etl.publish.schedule_index import ScheduleIndex, get_key
+
+leagues = ['CFB', 'NFL', 'MLB', 'NBA']
+max_cached_responses = 1024
+
+def get_source_paths(data_dir: str):
+    """Function that returns the output files the API serves, whose versions identify a publish
+       Accepts `data_dir`: String
+       Returns `source_paths`: List of file paths"""
+    source_paths = [f'{data_dir}/all_schedule.csv']
+    for league in leagues:
+        source_paths += [f'{data_dir}/{league.lower()}_{table_name}.csv' for table_name in ['teams', 'locations', 'leaderboard']]
+    return source_paths
+
+def get_data_version(data_dir: str):
+    """Function that returns the version of the published outputs from the size and modification time of every source file.
+       Loads write their outputs through renames, so any load or publish changes the version
+       Accepts `data_dir`: String
+       Returns `data_version`: String"""
+    version_parts = []
+    for source_path in get_source_paths(data_dir):
+        try:
+            source_stat = os.stat(source_path)
+            version_parts.append(f'{os.path.basename(source_path)}:{source_stat.st_mtime_ns}:{source_stat.st_size}')
+        except FileNotFoundError:
+            continue
+    return hashlib.sha1('|'.join(version_parts).encode('utf-8')).hexdigest()[:16]
+
+def read_league_outputs(data_dir: str, table_name: str):
+    """Function that reads and concatenates the CSV outputs of every league for a table
+       Accepts `data_dir`: String, `table_name`: String
+       Returns `df`: Pandas DataFrame, empty if no league has the output"""
+    frames = []
+    for league in leagues:
+        try:
+            df = pd.read_csv(f'{data_dir}/{league.lower()}_{table_name}.csv')
+        except (FileNotFoundError, pd.errors.EmptyDataError):
+            continue
+        # Concatenating an output that holds only its header is deprecated by pandas
+        if len(df) > 0:
+            frames.append(df)
+    return pd.concat(frames, axis=0, ignore_index=True) if len(frames) > 0 else pd.DataFrame()
+
+def get_records(df: dict):
+    """Function that converts a DataFrame to JSON-ready records, missing values becoming None
+       Accepts `df`: Pandas DataFrame
+       Returns `records`: List of Dictionaries"""
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+def get_invalid_arguments(names: list):
+    """Function that returns the query arguments of the current request among `names` that are given but are not integers
+       Accepts `names`: List
+       Returns `invalid_arguments`: List"""
+    return [name for name in names if name in request.args and request.args.get(name, type=int) is None]
+
+def bad_request(invalid_arguments: list):
+    """Function that builds the 400 response of a request with invalid query arguments
+       Accepts `invalid_arguments`: List
+       Returns `response`: Flask Response"""
+    return Response(json.dumps({'error': f"query arguments must be integers: {', '.join(invalid_arguments)}"}), status=400, mimetype='application/json')
+
+def build_lookup(records: list, key_column: str):
+    """Function that indexes records on (league, key) like the schedule keys
+       Accepts `records`: List of Dictionaries, `key_column`: String
+       Returns `lookup`: Dictionary of records keyed by (league, key) Tuple"""
+    lookup = {}
+    for record in records:
+        lookup.setdefault((str(record.get('league')).upper(), get_key(record.get(key_column))), record)
+    return lookup
+
+def load_api_data(data_dir: str):
+    """Function that reads the published outputs into the in-memory index and lookups served by the API
+       Accepts `data_dir`: String
+       Returns `api_data`: Dictionary"""
+    try:
+        schedule_index = ScheduleIndex(pd.read_csv(f'{data_dir}/all_schedule.csv'))
+    except FileNotFoundError:
+        schedule_index = None
+    leaderboard = read_league_outputs(data_dir, 'leaderboard')
+    return {'schedule_index': schedule_index,
+            'teams': build_lookup(get_records(read_league_outputs(data_dir, 'teams')), 'team_id'),
+            'locations': build_lookup(get_records(read_league_outputs(data_dir, 'locations')), 'location_id'),
+            'leaderboard': leaderboard}
+
+def create_app(data_dir='./pickem_data'):
+    """Function that creates the Flask app serving the outputs of `data_dir`. Every request compares the output version with the loaded one,
+       reloading the index and clearing the response cache after a publish, and answers repeated requests from the cache or with 304 Not Modified
+       Accepts `data_dir`: String
+       Returns `app`: Flask Object"""
+    app = Flask(__name__)
+    state = {'version': None, 'data': None, 'responses': {}}
+    state_lock = threading.Lock()
+
+    def get_state():
+        data_version = get_data_version(data_dir)
+        with state_lock:
+            if state['version'] != data_version:
+                state['data'] = load_api_data(data_dir)
+                state['responses'] = {}
+                state['version'] = data_version
+            return state['version'], state['data'], state['responses']
+
+    def cached_response(render: object):
+        data_version, api_data, responses = get_state()
+        etag = hashlib.sha1(f'{data_version}|{request.full_path}'.encode('utf-8')).hexdigest()[:20]
+        if etag in request.if_none_match:
+            return Response(status=304, headers={'ETag': f'"{etag}"'})
+        body = responses.get(etag)
+        if body is None:
+            payload = render(api_data)
+            if payload is None:
+                return Response(json.dumps({'error': 'not found'}), status=404, mimetype='application/json')
+            body = json.dumps(payload, default=str)
+            with state_lock:
+                if len(responses) >= max_cached_responses:
+                    responses.clear()
+                responses[etag] = body
+        return Response(body, mimetype='application/json', headers={'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'})
+
+    @app.get('/schedule/<league>')
+    def get_schedule(league: str):
+        def render(api_data: dict):
+            schedule_index = api_data['schedule_index']
+            if schedule_index is None:
+                return None
+            arguments = request.args
+            if 'team' in arguments:
+                return schedule_index.get_team_games(league, arguments['team'])
+            if 'location' in arguments:
+                return schedule_index.get_location_games(league, arguments['location'])
+            if 'season' in arguments and 'week' in arguments:
+                return schedule_index.get_week_games(league, arguments.get('season', type=int), arguments.get('week', type=int))
+            if 'date' in arguments:
+                return schedule_index.get_games_on(arguments['date'], league)
+            return schedule_index.get_games_between(arguments.get('start', ''), arguments.get('end', '9999-12-31'), league)
+        invalid_arguments = get_invalid_arguments(['season', 'week'])
+        if len(invalid_arguments) > 0:
+            return bad_request(invalid_arguments)
+        return cached_response(render)
+
+    @app.get('/games/<league>/<game_id>')
+    def get_game(league: str, game_id: str):
+        return cached_response(lambda api_data: api_data['schedule_index'].get_game(league, game_id) if api_data['schedule_index'] is not None else None)
+
+    @app.get('/teams/<league>/<team_id>')
+    def get_team(league: str, team_id: str):
+        def render(api_data: dict):
+            team = api_data['teams'].get((league.upper(), get_key(team_id)))
+            if team is None:
+                return None
+            games = api_data['schedule_index'].get_team_games(league, team_id) if api_data['schedule_index'] is not None else []
+            return {**team, 'games': games}
+        return cached_response(render)
+
+    @app.get('/locations/<league>/<location_id>')
+    def get_location(league: str, location_id: str):
+        def render(api_data: dict):
+            location = api_data['locations'].get((league.upper(), get_key(location_id)))
+            if location is None:
+                return None
+            games = api_data['schedule_index'].get_location_games(league, location_id) if api_data['schedule_index'] is not None else []
+            return {**location, 'games': games}
+        return cached_response(render)
+
+    @app.get('/leaderboard/<league>')
+    def get_leaderboard(league: str):
+        def render(api_data: dict):
+            leaderboard = api_data['leaderboard']
+            if len(leaderboard) == 0:
+                return None
+            leaderboard = leaderboard[leaderboard['league'].astype(str).str.upper() == league.upper()]
+            if 'season' in request.args:
+                leaderboard = leaderboard[leaderboard['season'] == request.args.get('season', type=int)]
+            leaderboard = leaderboard[leaderboard['week'] == request.args.get('week', default=0, type=int)]
+            return get_records(leaderboard.sort_values(['season', 'leaderboard_rank', 'user_id']))
+        invalid_arguments = get_invalid_arguments(['season', 'week'])
+        if len(invalid_arguments) > 0:
+            return bad_request(invalid_arguments)
+        return cached_response(render)
+
+    return app
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the published pickem outputs over a read-only HTTP API.')
+    parser.add_argument('--data-dir', default='./pickem_data', help='Directory of the ETL outputs')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on')
+    parser.add_argument('--port', type=int, default=8050, help='Port to listen on')
+    args = parser.parse_args(argv)
+    create_app(args.data_dir).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,8 @@ Author: Gabe Baduqui
 
 Cleanse, format and prepare Games data
 """
+import pandas as pd
+import etl.utils.get_location_id as loc_id
 from math import nan
 
 def transform_box_score(box_score_raw: dict, transform_logfile: object):
@@ -52,17 +54,16 @@ def transform_box_score(box_score_raw: dict, transform_logfile: object):
     transform_logfile.write(f'{quarter1}, {quarter2}, {quarter3}, {quarter4}, {overtime}, {total}\n')
     return quarter1, quarter2, quarter3, quarter4, overtime, total
 
-def transform_location(location_raw: str, locations_df: dict, transform_logfile: object):
-    """Function that trims trailing space characters from game location
-       Accepts `locations_raw`: String, `locations_df`: Pandas DataFrame, `transform_logfile`: File Object
-       Returns `location_transformed`: Number"""
-    transform_logfile.write(f'Transforming location {location_raw} -> ')
-    try:
-      location_transformed = locations_df.loc[locations_df['stadium'] == location_raw, 'location_id'].item()
-      transform_logfile.write(f'{location_transformed}\n')
-    except Exception as e:
+def transform_location(stadium: str, location_name: str, transform_logfile: object):
+    """Function that derives the location ID of a game from its stadium and `City, State` location name
+       Accepts `stadium`: String, `location_name`: String, `transform_logfile`: File Object
+       Returns `location_transformed`: Number, 0 when the game has no stadium or location"""
+    transform_logfile.write(f'Transforming location {stadium}, {location_name} -> ')
+    if pd.isna(stadium) or pd.isna(location_name):
       location_transformed = 0
-      transform_logfile.write(f'{e}\n')
+    else:
+      location_transformed = loc_id.get_location_id_from_name(stadium, location_name)
+    transform_logfile.write(f'{location_transformed}\n')
     
     return location_transformed
 
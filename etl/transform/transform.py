@@ -55,7 +55,7 @@ def transform_games(league:str, games_df: dict, locations_df: dict, transform_lo
             games_df.loc[idx, 'home_total'] = home_total
 
         # Location
-        games_df.loc[idx, 'location'] = tf_games.transform_location(stadium, locations_df, transform_logfile)
+        games_df.loc[idx, 'location'] = tf_games.transform_location(stadium, games_df.loc[idx, 'location'], transform_logfile)
 
         # Winning Percentages
         if games_df.loc[idx, 'away_win_pct'] is None:
@@ -103,9 +103,6 @@ def transform_teams(league: str, teams_df: dict, transform_logfile: object):
             teams_df.loc[idx, 'name'] = ''
             teams_df.loc[idx, 'mascot'] = ''
             teams_df.loc[idx, 'logo_url'] = ''
-        else:
-            teams_df.loc[idx, 'name'] = teams_df.loc[idx, 'name'].replace('\'', '')
-            teams_df.loc[idx, 'mascot'] = teams_df.loc[idx, 'mascot'].replace('\'', '')
 
         # Conference Name
         teams_df.loc[idx, 'conference_name'] = tf_teams.transform_conference_name(conference_name, transform_logfile)
@@ -155,20 +152,27 @@ def transform_locations(league: str, locations_df: dict, transform_logfile: obje
         stadium = locations_df.loc[idx, 'stadium']
         stadium_capacity = locations_df.loc[idx, 'stadium_capacity']
         
-        locations_df.loc[idx, 'stadium'] = stadium.replace('\'', '').rstrip()
+        locations_df.loc[idx, 'stadium'] = stadium.rstrip()
         locations_df.loc[idx, 'stadium_capacity'] = tf_locations.transform_stadium_capacity(stadium_capacity, transform_logfile)
     
     return locations_df
 
 
-def full_transform(league: str, games_raw: dict, teams_raw: dict, locations_raw: dict):
-    """Function that calls all necessary functions to apply necessary data transformations to pickem data frames
-      Accepts `league`: String, `games_df`: Pandas DataFrame, `teams_df`: Pandas DataFrame, `locations_df`: Pandas DataFrame
+def full_transform(league: str, games_raw: dict, teams_raw: dict, locations_raw: dict, game_ids=None):
+    """Function that calls all necessary functions to apply necessary data transformations to pickem data frames.
+      When `game_ids` are given, only those games are transformed.
+      Accepts `league`: String, `games_df`: Pandas DataFrame, `teams_df`: Pandas DataFrame, `locations_df`: Pandas DataFrame, `game_ids`: List
       Returns `games_df`: Pandas DataFrame, `schools_df`: Pandas DataFrame, `locations_df`: Pandas DataFrame"""
     transform_logfile = instantiate_logfile(league)
     print('\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\nBeginning Full Transform Jobs\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\n')
     transform_logfile.write('\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\nBeginning Full Transform Jobs\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\n')
 
+    if game_ids is not None:
+        requested_game_ids = [str(game_id) for game_id in game_ids]
+        games_raw = games_raw[games_raw['game_id'].astype(str).isin(requested_game_ids)].reset_index(drop=True)
+        print(f'~~ Restricting transform to {len(games_raw)} requested games')
+        transform_logfile.write(f'\n~~ Restricting transform to {len(games_raw)} requested games\n')
+
     print('~~ Transforming games data...')
     transform_logfile.write('\n~~ Transforming games data...')
     games_df = transform_games(league, games_raw, locations_raw, transform_logfile)
@@ -0,0 +1,35 @@
+"""
+Pickem ETL
+Author: Gabe Baduqui
+
+Return a stable location ID derived from a location's stadium, city and state
+"""
+import hashlib, re, unicodedata
+
+def normalize_location_part(location_part: str):
+    """Function that normalizes part of a location for hashing: accents, case, punctuation and repeated whitespace are ignored
+       Accepts `location_part`: String
+       Returns `normalized_part`: String"""
+    if location_part is None or location_part != location_part:
+        return ''
+    normalized_part = unicodedata.normalize('NFKD', str(location_part)).encode('ascii', 'ignore').decode('ascii').lower()
+    normalized_part = re.sub(r'[^a-z0-9]+', ' ', normalized_part)
+    return normalized_part.strip()
+
+def get_location_id(stadium: str, city: str, state: str):
+    """Function that derives a location ID from the normalized stadium, city and state, so that the same location keeps
+       the same ID across runs, game orderings and leagues. IDs are positive 31-bit integers that fit a MySQL INT column
+       Accepts `stadium`: String, `city`: String, `state`: String
+       Returns `location_id`: Number"""
+    location_key = '|'.join(normalize_location_part(location_part) for location_part in [stadium, city, state])
+    location_id = int(hashlib.md5(location_key.encode('utf-8')).hexdigest()[:8], 16) & 0x7FFFFFFF
+    return location_id
+
+def get_location_id_from_name(stadium: str, location_name: str):
+    """Function that derives the location ID of a stadium from a scraped `City, State` location name
+       Accepts `stadium`: String, `location_name`: String
+       Returns `location_id`: Number"""
+    location_parts = str(location_name).split(', ')
+    city = location_parts[0]
+    state = location_parts[1] if len(location_parts) > 1 else None
+    return get_location_id(stadium, city, state)
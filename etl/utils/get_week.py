@@ -0,0 +1,78 @@
+"""
+Pickem ETL
+Author: Gabe Baduqui
+
+Return the season, season week and kickoff of games from their game dates and times
+"""
+from datetime import timedelta
+import pandas as pd
+
+# Month each league's season starts in; games of earlier months (e.g. January bowl games) belong to the previous year's season
+season_start_months = {
+    'CFB': 8,
+    'NFL': 8,
+    'NBA': 9,
+    'MLB': 1
+}
+
+# Pick'em weeks run Tuesday through Monday, so a football weekend and its Monday night game share a week
+week_start_weekday = 1
+
+# Game times are scraped in Eastern time, e.g. '7:30 PM', or 'TBD' before kickoff is announced
+kickoff_timezone = 'America/New_York'
+kickoff_time_format = '%I:%M %p'
+
+def get_season(league: str, game_date: object):
+    """Function that returns the season a game date belongs to, named after the year the season starts in
+       Accepts `league`: String, `game_date`: Date
+       Returns `season`: Number"""
+    return game_date.year if game_date.month >= season_start_months.get(league.upper(), 1) else game_date.year - 1
+
+def get_week_start(game_date: object):
+    """Function that returns the first day of the pick'em week a date falls in
+       Accepts `game_date`: Date
+       Returns `week_start`: Date"""
+    return game_date - timedelta(days=(game_date.weekday() - week_start_weekday) % 7)
+
+def get_week(game_date: object, season_start: object):
+    """Function that returns the week of a season a date falls in, week 1 being the week of the season's first game
+       Accepts `game_date`: Date, `season_start`: Date of the season's first game
+       Returns `week`: Number"""
+    return ((get_week_start(game_date) - get_week_start(season_start)).days // 7) + 1
+
+def get_game_dates(games_df: dict):
+    """Function that builds the game dates of a games DataFrame from its `game_year`, `game_month` and `game_day` columns
+       Accepts `games_df`: Pandas DataFrame
+       Returns `game_dates`: Pandas Series of Timestamps, NaT where the date is incomplete"""
+    date_parts = pd.DataFrame({'year': pd.to_numeric(games_df['game_year'], errors='coerce'),
+                               'month': pd.to_numeric(games_df['game_month'], errors='coerce'),
+                               'day': pd.to_numeric(games_df['game_day'], errors='coerce')})
+    return pd.to_datetime(date_parts, errors='coerce')
+
+def get_seasons(leagues: object, game_dates: object):
+    """Function that returns the season of every game, the vectorized form of `get_season`
+       Accepts `leagues`: Pandas Series, `game_dates`: Pandas Series of Timestamps
+       Returns `seasons`: Pandas Series"""
+    start_months = leagues.astype(str).str.upper().map(season_start_months).fillna(1)
+    seasons = game_dates.dt.year - (game_dates.dt.month < start_months).astype(int)
+    return seasons.astype('Int64')
+
+def get_weeks(leagues: object, seasons: object, game_dates: object):
+    """Function that returns the season week of every game, the vectorized form of `get_week`. Each season starts with the earliest
+       of the given games, so all games of a season must be passed together
+       Accepts `leagues`: Pandas Series, `seasons`: Pandas Series, `game_dates`: Pandas Series of Timestamps
+       Returns `weeks`: Pandas Series"""
+    week_starts = game_dates - pd.to_timedelta((game_dates.dt.weekday - week_start_weekday) % 7, unit='D')
+    season_keys = [leagues.astype(str).str.upper(), seasons]
+    season_week_starts = week_starts.groupby(season_keys).transform('min')
+    weeks = ((week_starts - season_week_starts).dt.days // 7) + 1
+    return weeks.astype('Int64')
+
+def get_kickoffs(games_df: dict):
+    """Function that builds the kickoffs of a games DataFrame from its game dates and `game_time` column, in `kickoff_timezone` local time.
+       A game without an announced time kicks off at the start of its game date
+       Accepts `games_df`: Pandas DataFrame
+       Returns `kickoffs`: Pandas Series of Timestamps, NaT where the date is incomplete"""
+    game_times = pd.to_datetime(games_df['game_time'].astype(str).str.strip(), format=kickoff_time_format, errors='coerce')
+    time_offsets = (game_times - game_times.dt.normalize()).fillna(pd.Timedelta(0))
+    return get_game_dates(games_df) + time_offsets
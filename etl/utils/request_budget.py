@@ -0,0 +1,27 @@
+"""
+Pickem ETL
+Author: Gabe Baduqui
+
+Shared HTTP GET wrapper that limits the number of in-flight requests across all concurrently running extract jobs.
+"""
+import requests, threading
+
+max_concurrent_requests = 8
+request_slots = threading.BoundedSemaphore(max_concurrent_requests)
+
+def set_max_concurrent_requests(max_requests: int):
+    """Function that resizes the global network concurrency budget shared by all leagues
+       Accepts `max_requests`: Number
+       Returns: n/a"""
+    global max_concurrent_requests
+    global request_slots
+    max_concurrent_requests = max(1, int(max_requests))
+    request_slots = threading.BoundedSemaphore(max_concurrent_requests)
+
+def get(url: str, **kwargs):
+    """Function that makes a GET request once a slot in the global network concurrency budget is available
+       Accepts `url`: String, `kwargs`: Keyword arguments passed through to `requests.get`
+       Returns `response`: Response Object"""
+    with request_slots:
+        response = requests.get(url, **kwargs)
+    return response
@@ -0,0 +1,49 @@
+"""
+Pickem ETL
+Author: Gabe Baduqui
+
+Stream a DataFrame into its CSV, JSON and newline-delimited JSON outputs in one chunked pass, renaming each file into place once complete.
+"""
+import os
+
+chunk_size = 1000
+
+output_formats = ['csv', 'json', 'ndjson']
+
+def write_outputs(df: dict, output_path: str, formats=output_formats, chunk_size=chunk_size):
+    """Function that writes a DataFrame to `{output_path}.csv`, `.json` (an array of records) and `.ndjson` (one record per line)
+       by serializing `chunk_size` rows at a time, so only one chunk is ever held as text. The outputs match `to_csv(index=False)`
+       and `to_json(orient='records')` byte for byte, and are written to temporary files renamed into place once every chunk is written
+       Accepts `df`: Pandas DataFrame, `output_path`: String path without extension, `formats`: List, `chunk_size`: Number
+       Returns `output_paths`: List of written file paths"""
+    output_files = {output_format: open(f'{output_path}.{output_format}.tmp', 'w', newline='') for output_format in formats}
+    try:
+        if 'json' in output_files:
+            output_files['json'].write('[')
+        if len(df) == 0 and 'csv' in output_files:
+            df.to_csv(output_files['csv'], index=False)
+        for chunk_start in range(0, len(df), chunk_size):
+            chunk = df.iloc[chunk_start:chunk_start + chunk_size]
+            if 'csv' in output_files:
+                chunk.to_csv(output_files['csv'], index=False, header=chunk_start == 0)
+            if 'json' in output_files or 'ndjson' in output_files:
+                # Record lines never hold a raw newline, since JSON escapes newlines inside strings
+                record_lines = chunk.to_json(orient='records', lines=True).rstrip('\n')
+                if 'ndjson' in output_files:
+                    output_files['ndjson'].write(f'{record_lines}\n')
+                if 'json' in output_files:
+                    output_files['json'].write((',' if chunk_start > 0 else '') + record_lines.replace('\n', ','))
+        if 'json' in output_files:
+            output_files['json'].write(']')
+    except Exception:
+        for output_format, output_file in output_files.items():
+            output_file.close()
+            os.remove(f'{output_path}.{output_format}.tmp')
+        raise
+
+    output_paths = []
+    for output_format, output_file in output_files.items():
+        output_file.close()
+        os.replace(f'{output_path}.{output_format}.tmp', f'{output_path}.{output_format}')
+        output_paths.append(f'{output_path}.{output_format}')
+    return output_paths
@@ -0,0 +1,45 @@
+"""
+Pickem ETL
+Author: Gabe Baduqui
+
+Tests for extracting a league whose game page could not be fetched.
+"""
+import io, sys, time, types
+import pytest
+import requests
+
+# Team color codes are scraped when the module is imported, which needs the network
+sys.modules.setdefault('etl.extract.common.scrape_team_color_codes', types.ModuleType('etl.extract.common.scrape_team_color_codes'))
+
+import etl.extract.extract as ext
+import etl.extract.dead_letter as dl
+
+scraped_game = {'game_id': '401', 'league': 'NFL', 'away_team': 'kc', 'home_team': 'bal', 'stadium': 'M&T Bank Stadium',
+                'location': 'Baltimore, MD', 'stadium_capacity': 71008}
+
+@pytest.fixture
+def failed_page(monkeypatch, tmp_path):
+    def get_game_data(league, game_id, logfile):
+        if game_id == '402':
+            raise requests.ConnectionError('Connection refused')
+        return dict(scraped_game)
+
+    geocoded = []
+    monkeypatch.setattr(dl, 'dead_letter_dir', str(tmp_path))
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+    monkeypatch.setattr(ext.game, 'get_game_data', get_game_data)
+    monkeypatch.setattr(ext.geo, 'get_location_data', lambda league, location_id, stadium, capacity, location_name, logfile: geocoded.append(stadium) or {'location_id': location_id, 'stadium': stadium})
+    return geocoded
+
+def test_failed_game_page_has_no_stadium(failed_page):
+    games_df = ext.extract_games('NFL', ['401', '402'], io.StringIO())
+    failed_game = games_df[games_df['game_id'] == '402'].iloc[0]
+    assert failed_game['league'] == 'NFL'
+    assert failed_game[['away_team', 'home_team', 'stadium', 'location', 'stadium_capacity']].isna().all()
+    assert dl.get_failed_keys('NFL', 'games') == {'402'}
+
+def test_failed_game_page_is_not_geocoded(failed_page):
+    games_df = ext.extract_games('NFL', ['401', '402'], io.StringIO())
+    locations_df = ext.extract_locations('NFL', games_df['stadium'].tolist(), games_df['location'].tolist(), games_df['stadium_capacity'].tolist(), io.StringIO())
+    assert failed_page == ['M&T Bank Stadium']
+    assert len(locations_df) == 1